@@ -274,25 +274,11 @@ class agilent436A(ivi.Driver, pwrmeter.Base, pwrmeter.ZeroCorrection, pwrmeter.M
         if self._driver_operation_simulate:
             return
         
-        it = 0
-        while True:
-            val = self._ask("Z1T")
-            if (int(val[4:8]) < 2):
-                break
-            time.sleep(0.5)
-            it += 1
-            if it > 20:
-                return
-        
-        it = 0
-        while True:
-            val = self._ask("9+AI")
-            if val[0] < 'T':
-                break
-            time.sleep(0.5)
-            it += 1
-            if it > 10:
-                return
+        try:
+            self._ask_until("Z1T", lambda val: int(val[4:8]) < 2, 10, (0.05, 0.5))
+            self._ask_until("9+AI", lambda val: val[0] < 'T', 5, (0.05, 0.5))
+        except ivi.MaxTimeoutExceededException:
+            return
         
         self._channel_zero_state[index] = 'complete'
     
@@ -321,14 +321,12 @@ class agilent437B(ivi.Driver, pwrmeter.Base, pwrmeter.ManualRange,
 
         self._write("CS")
         self._write("ZE")
-        it = 0
-        while True:
-            val = self._read_stb()
-            if val & 2:
-                break
-            if val & 8 or it > 20:
-                return
-            time.sleep(0.5)
+        try:
+            val = self._wait_for_stb(2 | 8, 10, (0.05, 0.5))
+        except ivi.MaxTimeoutExceededException:
+            return
+        if not val & 2:
+            return
         
         self._channel_zero_state[index] = 'complete'
     
@@ -343,14 +341,12 @@ class agilent437B(ivi.Driver, pwrmeter.Base, pwrmeter.ManualRange,
 
         self._write("CS")
         self._write("CLEN")
-        it = 0
-        while True:
-            val = self._read_stb()
-            if val & 2:
-                break
-            if val & 8 or it > 20:
-                return
-            time.sleep(0.5)
+        try:
+            val = self._wait_for_stb(2 | 8, 10, (0.05, 0.5))
+        except ivi.MaxTimeoutExceededException:
+            return
+        if not val & 2:
+            return
 
         self._channel_calibration_state[index] = 'complete'
 
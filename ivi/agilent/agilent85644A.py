@@ -223,7 +223,7 @@ class agilent85644A(ivi.Driver, scpi.common.Memory):
         if not self._driver_operation_simulate:
             self._write("*TST?")
             # wait for test to complete
-            time.sleep(30)
+            self._wait_for_response(30)
             code = int(self._read())
             if code != 0:
                 message = "Self test failed"
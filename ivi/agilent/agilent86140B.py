@@ -27,6 +27,7 @@ THE SOFTWARE.
 from .. import ivi
 from .. import extra
 from .. import scpi
+import numpy as np
 import time
 
 AmplitudeUnitsMapping = {'dBm' : 'dbm',
@@ -39,6 +40,10 @@ ScreenshotImageFormatMapping = {
         'pcl': 'pcl',
         'cgm': 'cgm',
         'gif': 'gif'}
+# trace data is always transferred in this format and decoded as this type;
+# the format is only sent when the trace_data_format cache is not valid
+TraceDataFormat = 'real,64'
+TraceDataType = '>f8'
 
 class agilent86140B(ivi.Driver, extra.common.Screenshot, scpi.common.Memory):
     "Agilent 86140B Series Optical Spectrum Analyzer Driver"
@@ -50,7 +55,7 @@ class agilent86140B(ivi.Driver, extra.common.Screenshot, scpi.common.Memory):
         
         self._memory_size = 10
         
-        self._trace_count = 1
+        self._trace_count = 6
         
         self._level_amplitude_units = 'dBm'
         self._acquisition_detector_type = 'sample'
@@ -330,6 +335,17 @@ class agilent86140B(ivi.Driver, extra.common.Screenshot, scpi.common.Memory):
                        This function does not check the instrument status. The user calls the
                        Error Query function at the conclusion of the sequence to check the
                        instrument status.
+                       
+                       The trace is returned as a TraceYT object with the wavelength as the x
+                       axis.
+                       """)
+        self._add_method('acquisition.fetch_traces',
+                       self._acquisition_fetch_traces,
+                       """
+                       Returns several traces from a previously initiated acquisition in a
+                       single exchange with the instrument.  trace_list is a list of trace names
+                       or indices, by default all traces (tra to trf) are returned.  Returns a
+                       list of TraceYT objects as returned by Fetch Y Trace.
                        """)
         self._add_method('acquisition.initiate',
                        self._acquisition_initiate,
@@ -476,7 +492,7 @@ class agilent86140B(ivi.Driver, extra.common.Screenshot, scpi.common.Memory):
         self._write("hcopy:device:language \"%s\"" % format)
         self._write("hcopy:data?")
         
-        time.sleep(25)
+        self._wait_for_response(25)
         
         return self._read_ieee_block()
     
@@ -731,21 +747,39 @@ class agilent86140B(ivi.Driver, extra.common.Screenshot, scpi.common.Memory):
             self._set_sweep_coupling_sweep_time(sweep_time)
     
     def _trace_fetch_y(self, index):
-        index = ivi.get_index(self._trace_name, index)
-        name = self._trace_name[index]
+        return self._acquisition_fetch_traces([index])[0]
+    
+    def _acquisition_fetch_traces(self, trace_list=None):
+        if trace_list is None:
+            trace_list = self._trace_name
+        index_list = [ivi.get_index(self._trace_name, i) for i in trace_list]
         
         if self._driver_operation_simulate:
-            return list()
+            return [ivi.TraceYT() for i in index_list]
+        
+        if not self._get_cache_valid('trace_data_format'):
+            self._write('format:data %s' % TraceDataFormat)
+            self._set_cache_valid(True, 'trace_data_format')
+        
+        start = self._get_wavelength_start()
+        stop = self._get_wavelength_stop()
         
-        self._write('format:data ascii')
-        l = self._ask('trace:data:y? %s' % name)
+        # query all traces in one message, the responses are read back to back
+        self._write(';:'.join('trace:data:y? %s' % self._trace_name[i] for i in index_list))
         
-        data = list()
+        traces = list()
+        for i in index_list:
+            trace = ivi.TraceYT()
+            trace.y_increment = 1
+            trace.y_raw = np.frombuffer(self._read_ieee_block(), TraceDataType).astype(float)
+            trace.x_origin = start
+            if len(trace.y_raw) > 1:
+                trace.x_increment = (stop - start) / (len(trace.y_raw) - 1)
+            traces.append(trace)
         
-        for p in l.split(','):
-            data.append(float(p))
+        self._read_raw() # flush buffer
         
-        return data
+        return traces
     
     def _acquisition_initiate(self):
         if not self._driver_operation_simulate:
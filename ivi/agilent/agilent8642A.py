@@ -174,6 +174,9 @@ class agilent8642A(ivi.Driver, rfsiggen.Base, rfsiggen.ModulateAM,
         
         self._frequency_low = 10e3
         self._frequency_high = 1050e6
+        
+        # settled state is read with a serial poll, so poll often
+        self._rf_settle_poll_interval = (0.001, 0.01)
     
     def _initialize(self, resource = None, id_query = False, reset = False, **keywargs):
         "Opens an I/O session to the instrument."
@@ -308,12 +311,6 @@ class agilent8642A(ivi.Driver, rfsiggen.Base, rfsiggen.ModulateAM,
             return self._read_stb() & (1 << 4) != 0
         return True
     
-    def _rf_wait_until_settled(self, maximum_time):
-        t = 0
-        while not self._rf_is_settled() and t < maximum_time:
-            time.sleep(0.01)
-            t = t + 0.01
-    
     def _get_analog_modulation_am_enabled(self):
         return self._analog_modulation_am_enabled
     
@@ -80,6 +80,8 @@ class agilent9000(agilentBaseInfiniium):
         self._vertical_divisions = 8
 
         self._display_color_grade = False
+        self._waveform_streaming = True
+        self._display_screenshot_image_format_mapping = ScreenshotImageFormatMapping
 
         self._identity_description = "Agilent Infiniium 9000A series IVI oscilloscope driver"
         self._identity_supported_instrument_models = ['MSO9104A', 'MSO9064A']
@@ -296,58 +298,3 @@ class agilent9000(agilentBaseInfiniium):
             self._write(":%s:display:scale %e" % (self._channel_name[index], value))
         self._channel_display_scale[index] = value
         self._set_cache_valid(index=index)
-
-    def _measurement_fetch_waveform(self, index):
-        index = ivi.get_index(self._channel_name, index)
-
-        if self._driver_operation_simulate:
-            return list()
-
-        if sys.byteorder == 'little':
-            self._write(":waveform:byteorder lsbfirst")
-        else:
-            self._write(":waveform:byteorder msbfirst")
-        self._write(":waveform:format word")
-        self._write(":waveform:streaming on")
-        self._write(":waveform:source %s" % self._channel_name[index])
-
-        # Read preamble
-
-        pre = self._ask(":waveform:preamble?").split(',')
-
-        format = int(pre[0])
-        type = int(pre[1])
-        points = int(pre[2])
-        count = int(pre[3])
-        xincrement = float(pre[4])
-        xorigin = float(pre[5])
-        xreference = int(float(pre[6]))
-        yincrement = float(pre[7])
-        yorigin = float(pre[8])
-        yreference = int(float(pre[9]))
-
-        # if type == 1:
-        #     raise scope.InvalidAcquisitionTypeException()
-
-        if format != 2:
-            raise UnexpectedResponseException()
-
-        # Read waveform data
-        raw_data = self._ask_for_ieee_block(":waveform:data?")
-
-        # Split out points and convert to time and voltage pairs
-        y_data = array.array('h', raw_data[0:points*2])
-
-        data = [(((i - xreference) * xincrement) + xorigin, float('nan') if y == 31232 else ((y - yreference) * yincrement) + yorigin) for i, y in enumerate(y_data)]
-
-        return data
-
-    def _measurement_read_waveform(self, index, maximum_time):
-        return self._measurement_fetch_waveform(index)
-
-    def _measurement_initiate(self):
-        if not self._driver_operation_simulate:
-            self._write(":acquire:complete 100")
-            self._write(":digitize")
-            self._set_cache_valid(False, 'trigger_continuous')
-
@@ -56,6 +56,9 @@ class agilentBase8340(rfsiggen.Base, rfsiggen.ModulateAM, rfsiggen.ModulateFM,
 
         self._memory_size = 8
 
+        # settled state is read with a serial poll, so poll often
+        self._rf_settle_poll_interval = (0.001, 0.01)
+
         self._add_property('sweep.frequency_sweep.center',
                         self._get_sweep_frequency_sweep_center,
                         self._set_sweep_frequency_sweep_center)
@@ -225,12 +228,6 @@ class agilentBase8340(rfsiggen.Base, rfsiggen.ModulateAM, rfsiggen.ModulateFM,
             return self._read_stb() & (1 << 4) != 0
         return True
 
-    def _rf_wait_until_settled(self, maximum_time):
-        t = 0
-        while not self._rf_is_settled() and t < maximum_time:
-            time.sleep(0.01)
-            t = t + 0.01
-
     def _get_analog_modulation_am_enabled(self):
         #if not self._driver_operation_simulate and not self._get_cache_valid():
         #    self._analog_modulation_am_enabled = bool(int(self._ask("OPAM")))
@@ -24,10 +24,8 @@ THE SOFTWARE.
 
 """
 
-import array
 import io
 import struct
-import sys
 import time
 
 import numpy as np
@@ -52,6 +50,11 @@ VerticalScale = set(['linear', 'logarithmic'])
 ALCSourceMapping = {'internal': 'int',
                     'external': 'ext'}
 PowerMode = set(['fixed', 'sweep'])
+ScreenshotImageFormatMapping = {
+        'bmp': 'bmp',
+        'bmp24': 'bmp',
+        'png': 'png',
+        'png24': 'png'}
 
 class agilentBase8590(ivi.Driver, specan.Base,
                 extra.common.SerialNumber, extra.common.Memory, extra.common.Title, extra.common.SystemSetup, extra.common.Screenshot):
@@ -145,6 +148,13 @@ class agilentBase8590(ivi.Driver, specan.Base,
         self._add_property('alc.source',
                         self._get_alc_source,
                         self._set_alc_source)
+        self._add_method('acquisition.fetch_traces',
+                        self._acquisition_fetch_traces,
+                        ivi.Doc("""
+                        Returns traces A, B and C from a previously initiated acquisition,
+                        queried in a single exchange with the instrument, as a numpy array of
+                        shape (3, n) in the units of the Amplitude Units attribute.
+                        """))
 
         self._init_traces()
     
@@ -242,8 +252,7 @@ class agilentBase8590(ivi.Driver, specan.Base,
         if not self._driver_operation_simulate:
             self._write("CNF?")
             # wait for test to complete
-            time.sleep(40)
-            # TODO any way to check status?
+            self._wait_for_response(40)
             code = int(self._read())
             if code != 0:
                 message = "Self test failed"
@@ -312,17 +321,15 @@ class agilentBase8590(ivi.Driver, specan.Base,
         if self._driver_operation_simulate:
             return b''
         
-        #if format not in ScreenshotImageFormatMapping:
-        #    raise ivi.ValueNotSupportedException()
+        if format not in ScreenshotImageFormatMapping:
+            raise ivi.ValueNotSupportedException()
         
-        #format = ScreenshotImageFormatMapping[format]
+        format = ScreenshotImageFormatMapping[format]
         
         self._write("PRNPRT 0")
         self._write("PRINT 1")
         
-        rtl = io.BytesIO(self._read_raw())
-
-        img = hprtl.parse_hprtl(rtl)
+        img = hprtl.parse_hprtl(self._read_raw())
 
         # rescale to get white background
         # presuming background of (90, 88, 85)
@@ -330,9 +337,10 @@ class agilentBase8590(ivi.Driver, specan.Base,
         np.multiply(img[:,:,1], 255/88, out=img[:,:,1], casting='unsafe')
         np.multiply(img[:,:,2], 255/85, out=img[:,:,2], casting='unsafe')
 
-        bmp = hprtl.generate_bmp(img)
+        if format == 'png':
+            return hprtl.generate_png(img)
 
-        return bmp
+        return hprtl.generate_bmp(img)
     
     def _memory_save(self, index):
         index = int(index)
@@ -738,7 +746,7 @@ class agilentBase8590(ivi.Driver, specan.Base,
     
     def _get_acquisition_vertical_scale(self):
         if not self._driver_operation_simulate and not self._get_cache_valid():
-            self._acquisition_vertical_scale = 'logarithmic' if (self._ask("lg?") != '0') else 'linear'
+            self._acquisition_vertical_scale = 'logarithmic' if float(self._ask("lg?")) > 0 else 'linear'
             self._set_cache_valid()
         return self._acquisition_vertical_scale
 
@@ -789,39 +797,16 @@ class agilentBase8590(ivi.Driver, specan.Base,
     def _acquisition_status(self):
         return 'unknown'
     
-    def _trace_fetch_y(self, index):
-        index = ivi.get_index(self._trace_name, index)
-
-        if self._driver_operation_simulate:
-            return ivi.TraceY()
+    def _trace_setup_transfer(self):
+        # binary word transfer format, only needs to be sent once per session
+        if not self._get_cache_valid('trace_transfer_format'):
+            self._write('tdf a; mds w;')
+            self._set_cache_valid(True, 'trace_transfer_format')
 
-        cmd = ''
-
-        if index == 0:
-            cmd = 'tra?'
-        elif index == 1:
-            cmd = 'trb?'
-        elif index == 2:
-            cmd = 'trc?'
-        else:
-            return None
+    def _trace_scale(self, trace):
+        ref_level = self._get_level_reference()
 
-        log_scale = float(self._ask("lg?"))
-        ref_level = float(self._ask("rl?"))
-
-        self._write('tdf a; mds w;')
-        self._write(cmd)
-
-        buf = self._read_raw(4)
-        if buf[0:2] != b'#A':
-            return None
-
-        cnt = struct.unpack(">H", buf[2:4])[0]
-        buf = self._read_raw(cnt)
-
-        trace = ivi.TraceY()
-
-        if log_scale > 0:
+        if self._get_acquisition_vertical_scale() == 'logarithmic':
             # log scale
             trace.y_increment = 0.01
             trace.y_origin = ref_level
@@ -832,13 +817,57 @@ class agilentBase8590(ivi.Driver, specan.Base,
             trace.y_origin = 0
             trace.y_reference = 0
 
-        trace.y_raw = array.array('h', buf)
+        return trace
+
+    def _read_trace_block(self):
+        buf = self._read_raw(4)
+        if buf[0:2] != b'#A':
+            raise ivi.UnexpectedResponseException()
+
+        cnt = struct.unpack(">H", buf[2:4])[0]
+        return np.frombuffer(self._read_raw(cnt), '>i2')
+
+    def _trace_fetch_y(self, index):
+        index = ivi.get_index(self._trace_name, index)
+
+        if self._driver_operation_simulate:
+            return ivi.TraceYT()
 
-        if sys.byteorder == 'little':
-            trace.y_raw.byteswap()
+        trace = self._trace_scale(ivi.TraceYT())
+        start = self._get_frequency_start()
+        stop = self._get_frequency_stop()
+
+        self._trace_setup_transfer()
+        self._write('%s?' % self._trace_name[index])
+
+        trace.y_raw = self._read_trace_block().astype(np.int16)
+
+        # frequency axis
+        trace.x_origin = start
+        if len(trace.y_raw) > 1:
+            trace.x_increment = (stop - start) / (len(trace.y_raw) - 1)
 
         return trace
 
+    def _acquisition_fetch_traces(self):
+        if self._driver_operation_simulate:
+            return np.zeros((3, 0))
+
+        trace = self._trace_scale(ivi.TraceY())
+
+        self._trace_setup_transfer()
+        self._write('tra?; trb?; trc?;')
+
+        data = [self._read_trace_block() for i in range(3)]
+        if len(set(len(d) for d in data)) != 1:
+            raise ivi.UnexpectedResponseException()
+
+        y = np.array(data, dtype=float)
+        y -= trace.y_reference
+        y *= trace.y_increment
+        y += trace.y_origin
+        return y
+
     def _acquisition_initiate(self):
         pass
     
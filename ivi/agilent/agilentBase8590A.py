@@ -43,24 +43,23 @@ class agilentBase8590A(agilentBase8590):
         if self._driver_operation_simulate:
             return b''
 
-        #if format not in ScreenshotImageFormatMapping:
-        #    raise ivi.ValueNotSupportedException()
+        if format not in ScreenshotImageFormatMapping:
+            raise ivi.ValueNotSupportedException()
 
-        #format = ScreenshotImageFormatMapping[format]
+        format = ScreenshotImageFormatMapping[format]
 
         self._write("PRINT 1")
 
-        rtl = io.BytesIO(self._read_raw())
-
-        img = hprtl.parse_hprtl(rtl)
+        img = hprtl.parse_hprtl(self._read_raw())
 
         # rescale to get white background
         # presuming background of (90, 88, 85)
-        img[:,:,0] *= 255/90
-        img[:,:,1] *= 255/88
-        img[:,:,2] *= 255/85
+        np.multiply(img[:,:,0], 255/90, out=img[:,:,0], casting='unsafe')
+        np.multiply(img[:,:,1], 255/88, out=img[:,:,1], casting='unsafe')
+        np.multiply(img[:,:,2], 255/85, out=img[:,:,2], casting='unsafe')
 
-        bmp = hprtl.generate_bmp(img)
+        if format == 'png':
+            return hprtl.generate_png(img)
 
-        return bmp
+        return hprtl.generate_bmp(img)
 
@@ -24,6 +24,8 @@ THE SOFTWARE.
 
 """
 
+import numpy as np
+
 from .. import ivi
 from .. import rfsiggen
 from .. import extra
@@ -41,6 +43,21 @@ LFGeneratorWaveformMapping = {
     'noise': 'nois',
     'dc': 'dc'
     }
+# the ESG has no analog ramp, sweeps run as step sweeps
+SweepModeMapping = {
+    'none': ('cw', 'fix', None),
+    'frequency_sweep': ('list', 'fix', 'step'),
+    'power_sweep': ('cw', 'list', 'step'),
+    'frequency_step': ('list', 'fix', 'step'),
+    'power_step': ('cw', 'list', 'step'),
+    'list': ('list', 'list', 'list')
+    }
+TriggerSourceMapping = {
+    'immediate': 'imm',
+    'internal': 'imm',
+    'external': 'ext',
+    'software': 'bus'
+    }
 
 class agilentBaseESG(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common.Reset,
                      scpi.common.SelfTest,
@@ -48,7 +65,7 @@ class agilentBaseESG(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common
                      rfsiggen.ModulateFM, rfsiggen.ModulatePM, rfsiggen.AnalogModulationSource,
                      rfsiggen.ModulatePulse, rfsiggen.LFGenerator, rfsiggen.LFGeneratorOutput,
                      rfsiggen.Sweep, rfsiggen.FrequencyStep, rfsiggen.PowerStep, rfsiggen.List,
-                     extra.common.Memory, ivi.Driver):
+                     rfsiggen.SoftwareTrigger, extra.common.Memory, ivi.Driver):
     "Agilent ESG series IVI RF signal generator driver"
 
     def __init__(self, *args, **kwargs):
@@ -68,6 +85,12 @@ class agilentBaseESG(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common
         self._rf_level_reference_enabled = False
         self._sweep_frequency_step_points = 2
         self._sweep_power_step_points = 2
+        self._sweep_list_lists = dict()
+        self._sweep_list_loaded = None
+        self._sweep_list_max_points = 1601
+
+        # *OPC? returns once frequency and level changes have settled
+        self._rf_settle_method = 'opc'
 
         self._frequency_low = 250e3
         self._frequency_high = 4e9
@@ -315,12 +338,6 @@ class agilentBaseESG(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common
             return int(self._ask("status:questionable:power:condition?")) & (1 << 1) == 0
         return True
 
-    def _rf_wait_until_settled(self, maximum_time):
-        t = 0
-        while not self._rf_is_settled() and t < maximum_time:
-            time.sleep(0.01)
-            t = t + 0.01
-
     def _get_analog_modulation_am_enabled(self):
         if not self._driver_operation_simulate and not self._get_cache_valid():
             self._analog_modulation_am_enabled = bool(int(self._ask("am:state?")))
@@ -568,14 +585,38 @@ class agilentBaseESG(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common
         return self._sweep_mode
 
     def _set_sweep_mode(self, value):
-        value = int(value)
+        if value not in SweepModeMapping:
+            raise ivi.ValueNotSupportedException()
+        freq_mode, pow_mode, list_type = SweepModeMapping[value]
+        if value == 'list':
+            # only step the parameters the selected list defines
+            lst = self._sweep_list_lists.get(self._sweep_list_selected_list)
+            if lst is None:
+                raise rfsiggen.FrequencyListUnknownException()
+            self._sweep_list_load(self._sweep_list_selected_list)
+            if lst['frequency'] is None:
+                freq_mode = 'cw'
+            if lst['power'] is None:
+                pow_mode = 'fix'
+        if not self._driver_operation_simulate:
+            cmd = ["frequency:mode %s" % freq_mode, "power:mode %s" % pow_mode]
+            if list_type is not None:
+                cmd.insert(0, "list:type %s" % list_type)
+            self._write(';:'.join(cmd))
         self._sweep_mode = value
+        self._set_cache_valid(False, 'rf_frequency')
+        self._set_cache_valid(False, 'rf_level')
 
     def _get_sweep_trigger_source(self):
         return self._sweep_trigger_source
 
     def _set_sweep_trigger_source(self, value):
-        value = str(value)
+        if value not in TriggerSourceMapping:
+            raise ivi.ValueNotSupportedException()
+        if not self._driver_operation_simulate:
+            self._write("trigger:source %s" % TriggerSourceMapping[value])
+            if self._sweep_list_single_step_enabled:
+                self._write("list:trigger:source %s" % TriggerSourceMapping[value])
         self._sweep_trigger_source = value
 
     def _get_sweep_frequency_step_start(self):
@@ -749,13 +790,24 @@ class agilentBaseESG(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common
 
     def _set_sweep_list_selected_list(self, value):
         value = str(value)
+        if value not in self._sweep_list_lists:
+            raise rfsiggen.FrequencyListUnknownException()
         self._sweep_list_selected_list = value
+        if self._sweep_mode == 'list':
+            self._set_sweep_mode('list')
+        else:
+            self._sweep_list_load(value)
 
     def _get_sweep_list_single_step_enabled(self):
         return self._sweep_list_single_step_enabled
 
     def _set_sweep_list_single_step_enabled(self, value):
         value = bool(value)
+        if not self._driver_operation_simulate:
+            # single step advances one point per trigger, otherwise the
+            # trigger starts the list and points advance after the dwell time
+            src = TriggerSourceMapping.get(self._sweep_trigger_source, 'imm') if value else 'imm'
+            self._write("list:trigger:source %s" % src)
         self._sweep_list_single_step_enabled = value
 
     def _get_sweep_list_dwell(self):
@@ -763,20 +815,83 @@ class agilentBaseESG(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common
 
     def _set_sweep_list_dwell(self, value):
         value = float(value)
+        lst = self._sweep_list_lists.get(self._sweep_list_loaded)
+        if not self._driver_operation_simulate and lst is not None and lst['dwell'] is None:
+            self._write("list:dwell %e" % value)
         self._sweep_list_dwell = value
 
-    def _sweep_list_create_frequency(self, name, frequency):
-        pass
-
-    def _sweep_list_create_power(self, name, power):
-        pass
-
-    def _sweep_list_create_frequency_power(self, name, frequency, power):
-        pass
+    def _sweep_list_format(self, values):
+        return ','.join(np.char.mod('%.15g', values))
+
+    def _sweep_list_add(self, name, frequency=None, power=None, dwell=None):
+        name = str(name)
+        lst = dict()
+        n = None
+        for key, values in (('frequency', frequency), ('power', power), ('dwell', dwell)):
+            if values is not None:
+                values = np.array(values, dtype=float).ravel()
+                if n is None:
+                    n = len(values)
+                if len(values) != n or n == 0 or n > self._sweep_list_max_points:
+                    raise ivi.OutOfRangeException()
+                values.flags.writeable = False
+            lst[key] = values
+        if frequency is not None:
+            if lst['frequency'].min() < self._frequency_low or lst['frequency'].max() > self._frequency_high:
+                raise ivi.OutOfRangeException()
+        old = self._sweep_list_lists.get(name)
+        if old is not None and all((old[k] is None and lst[k] is None) or
+                (old[k] is not None and lst[k] is not None and np.array_equal(old[k], lst[k]))
+                for k in lst):
+            # unchanged, keep the copy already on the instrument
+            return
+        self._sweep_list_lists[name] = lst
+        if self._sweep_list_loaded == name:
+            self._sweep_list_loaded = None
+            if self._sweep_list_selected_list == name:
+                self._sweep_list_load(name)
+
+    def _sweep_list_load(self, name):
+        "Upload a named list to the instrument, unless it is already loaded"
+        if self._sweep_list_loaded == name and self._get_cache_valid('sweep_list_loaded'):
+            return
+        lst = self._sweep_list_lists[name]
+        if not self._driver_operation_simulate:
+            # the whole list goes out in one message
+            cmd = list()
+            if lst['frequency'] is not None:
+                cmd.append("list:frequency %s" % self._sweep_list_format(lst['frequency']))
+            if lst['power'] is not None:
+                cmd.append("list:power %s" % self._sweep_list_format(lst['power']))
+            if lst['dwell'] is not None:
+                cmd.append("list:dwell %s" % self._sweep_list_format(lst['dwell']))
+            else:
+                cmd.append("list:dwell %e" % self._sweep_list_dwell)
+            self._write(';:'.join(cmd))
+        self._sweep_list_loaded = name
+        self._set_cache_valid(True, 'sweep_list_loaded')
+
+    def _sweep_list_create_frequency(self, name, frequency, dwell=None):
+        self._sweep_list_add(name, frequency=frequency, dwell=dwell)
+
+    def _sweep_list_create_power(self, name, power, dwell=None):
+        self._sweep_list_add(name, power=power, dwell=dwell)
+
+    def _sweep_list_create_frequency_power(self, name, frequency, power, dwell=None):
+        if frequency is None or power is None:
+            raise ivi.ValueNotSupportedException()
+        self._sweep_list_add(name, frequency=frequency, power=power, dwell=dwell)
 
     def _sweep_list_clear_all(self):
-        pass
+        self._sweep_list_lists = dict()
+        self._sweep_list_loaded = None
+        self._sweep_list_selected_list = ''
 
     def _sweep_list_reset(self):
-        pass
+        if not self._driver_operation_simulate and self._sweep_mode == 'list':
+            self._write("initiate")
+
+    def _send_software_trigger(self):
+        if not self._driver_operation_simulate:
+            self._write("*trg")
 
@@ -29,6 +29,7 @@ import struct
 import numpy as np
 
 from .. import ivi
+from .. import fgen
 from .. import rfsiggen
 
 from .agilentBaseESG import *
@@ -51,6 +52,8 @@ class agilentBaseESGD(agilentBaseESG, rfsiggen.ModulateIQ, rfsiggen.IQImpairment
         self._digital_modulation_arb_waveform_quantum = 2
         self._digital_modulation_arb_waveform_size_min = 16
         self._digital_modulation_arb_waveform_size_max = 10240
+        self._digital_modulation_arb_chunk_size = 65536
+        self._digital_modulation_arb_pending = dict()
 
         self._identity_description = "Agilent ESG-D series IVI RF signal generator driver"
         self._identity_supported_instrument_models = list(['E4430B', 'E4431B', 'E4432B', 'E4433B',
@@ -247,62 +250,84 @@ class agilentBaseESGD(agilentBaseESG, rfsiggen.ModulateIQ, rfsiggen.IQImpairment
             raise ivi.ValueNotSupportedException()
         self._digital_modulation_arb_external_trigger_slope = value
 
-    def _digital_modulation_arb_write_waveform(self, name, idata, qdata, more_data_pending=False):
-        yi = None
-        yq = None
-
-        if type(idata) == list and type(idata[0]) == float:
-            # list
-            yi = np.array(idata)
-        elif type(idata) == np.ndarray and len(idata.shape) == 1:
-            # 1D array
-            yi = idata
-        elif type(idata) == np.ndarray and len(idata.shape) == 2 and idata.shape[0] == 1:
-            # 2D array, hieght 1
-            yi = idata[0]
-        elif type(idata) == np.ndarray and len(idata.shape) == 2 and idata.shape[1] == 1:
-            # 2D array, width 1
-            yi = idata[:,0]
+    def _digital_modulation_arb_signal(self, data):
+        x, y = fgen.get_waveform(data)
+        return y
+
+    def _digital_modulation_arb_iq(self, idata, qdata):
+        if qdata is None:
+            # complex samples
+            idata = np.asarray(idata)
+            yi, yq = idata.real, idata.imag
         else:
-            xi, yi = ivi.get_sig(idata)
-
-        if type(qdata) == list and type(qdata[0]) == float:
-            # list
-            yq = np.array(qdata)
-        elif type(qdata) == np.ndarray and len(qdata.shape) == 1:
-            # 1D array
-            yq = qdata
-        elif type(qdata) == np.ndarray and len(qdata.shape) == 2 and qdata.shape[0] == 1:
-            # 2D array, hieght 1
-            yq = qdata[0]
-        elif type(qdata) == np.ndarray and len(qdata.shape) == 2 and qdata.shape[1] == 1:
-            # 2D array, width 1
-            yq = qdata[:,0]
+            yi = self._digital_modulation_arb_signal(idata)
+            yq = self._digital_modulation_arb_signal(qdata)
+        if len(yi) != len(yq):
+            raise ivi.ValueNotSupportedException()
+        return yi, yq
+
+    def _digital_modulation_arb_segments(self, idata, qdata):
+        "Split I and Q data into pairs of chunks"
+        if hasattr(idata, '__next__') or hasattr(idata, 'next'):
+            # iterator of segments: (i, q) pairs, complex arrays, or a
+            # second iterator of q segments
+            if qdata is None:
+                segments = (seg if isinstance(seg, tuple) else (seg, None) for seg in idata)
+            else:
+                segments = zip(idata, qdata)
         else:
-            xq, yq = ivi.get_sig(qdata)
+            segments = [(idata, qdata)]
+
+        n = self._digital_modulation_arb_chunk_size
+        for idata, qdata in segments:
+            yi, yq = self._digital_modulation_arb_iq(idata, qdata)
+            for k in range(0, len(yi), n):
+                yield yi[k:k+n], yq[k:k+n]
+
+    def _digital_modulation_arb_encode(self, y, prefix):
+        # clip on [-1,1], rescale to [0,1] and scale to 14 bits
+        return fgen.build_waveform_block(y, prefix, bits=14)
+
+    def _digital_modulation_arb_write_waveform(self, name, idata, qdata=None, more_data_pending=False):
+        # Waveforms are written in chunks, each appended to the I and Q files
+        # on the instrument.  Chunks are encoded in a separate thread while
+        # the previous chunk is transferred, and at most a few chunks are
+        # held in memory, so idata can be a memmap or a generator of
+        # segments of any total length.  With more_data_pending set, later
+        # calls with the same name append to the waveform.
+        name = str(name)
+        count = self._digital_modulation_arb_pending.pop(name, 0)
+
+        if not (hasattr(idata, '__next__') or hasattr(idata, 'next')):
+            # check complete waveforms before sending anything
+            idata, qdata = self._digital_modulation_arb_iq(idata, qdata)
+            if not more_data_pending and (count + len(idata)) % self._digital_modulation_arb_waveform_quantum != 0:
+                raise ivi.ValueNotSupportedException()
+
+        def encoder():
+            # encode straight into the IEEE blocks, the first chunk
+            # creates the files and later chunks append
+            total = count
+            for yi, yq in self._digital_modulation_arb_segments(idata, qdata):
+                cmd = 'mmemory:data:append' if total > 0 else 'mmemory:data'
+                yield (len(yi), self._digital_modulation_arb_encode(yi, '%s "ARBI:%s", ' % (cmd, name)),
+                        self._digital_modulation_arb_encode(yq, '%s "ARBQ:%s", ' % (cmd, name)))
+                total += len(yi)
+
+        blocks = ivi.iter_threaded(encoder(), 2)
+        try:
+            for n, i_block, q_block in blocks:
+                if not self._driver_operation_simulate:
+                    self._write_raw(i_block)
+                    self._write_raw(q_block)
+                count += n
+        finally:
+            blocks.close()
 
         if more_data_pending:
-            # TODO: implement this flag
-            raise ivi.ValueNotSupportedException()
-
-        if len(yi) != len(yq):
+            self._digital_modulation_arb_pending[name] = count
+        elif count % self._digital_modulation_arb_waveform_quantum != 0:
             raise ivi.ValueNotSupportedException()
-        if len(yi) % self._digital_modulation_arb_waveform_quantum != 0:
-            raise ivi.ValueNotSupportedException()
-
-        # clip on [-1,1] and rescale to [0,1]
-        yic = (yi.clip(-1, 1)+1)/2
-        yqc = (yq.clip(-1, 1)+1)/2
-
-        # scale to 14 bits
-        yib = np.rint(yic * ((1 << 14)-1)).astype(int) & 0x00003fff
-        yqb = np.rint(yqc * ((1 << 14)-1)).astype(int) & 0x00003fff
-
-        raw_i_data = yib.astype('>i2').tobytes()
-        raw_q_data = yqb.astype('>i2').tobytes()
-
-        self._write_ieee_block(raw_i_data, 'mmemory:data "ARBI:%s", ' % name)
-        self._write_ieee_block(raw_q_data, 'mmemory:data "ARBQ:%s", ' % name)
 
     def _digital_modulation_arb_clear_all_waveforms(self):
         pass
@@ -26,11 +26,15 @@ THE SOFTWARE.
 
 from .agilentBaseScope import *
 
+import numpy as np
+
 class agilentBaseInfiniiVision(agilentBaseScope):
     "Agilent InfiniiVision series IVI oscilloscope driver"
     
     def __init__(self, *args, **kwargs):
         self.__dict__.setdefault('_instrument_id', '')
+        self._measurement_loop_count = 0
+        self._measurement_loop_rate = 0.0
         
         super(agilentBaseInfiniiVision, self).__init__(*args, **kwargs)
         
@@ -51,6 +55,107 @@ class agilentBaseInfiniiVision(agilentBaseScope):
                 'DSO7034B','DSO7052B','DSO7054B','DSO7104B','MSO7012B','MSO7014B','MSO7032B',
                 'MSO7034B','MSO7052B','MSO7054B','MSO7104B']
 
+        self._add_method('measurement.read_waveform_loop',
+                        self._measurement_read_waveform_loop,
+                        ivi.Doc("""
+                        Repeatedly acquires and transfers waveforms at the highest rate the
+                        instrument allows. Takes a channel or a list of channels, the number of
+                        acquisitions (None to acquire until the caller stops iterating) and an
+                        optional max_points to decimate the records in the instrument. Returns a
+                        generator that yields a list of TraceYT objects, one per channel, for
+                        each acquisition.
+
+                        The waveform transfer is configured and the preamble is read only once.
+                        Each acquisition then costs a single :digitize and one block transfer
+                        per channel. With overlap enabled, the next acquisition is started
+                        before the traces of the current one are yielded, so host-side
+                        processing of a result runs while the instrument acquires the next one.
+
+                        The number of acquisitions and the achieved rate are available in
+                        measurement.loop_count and measurement.loop_rate.
+                        """))
+        self._add_property('measurement.loop_count',
+                        self._get_measurement_loop_count,
+                        None,
+                        None,
+                        ivi.Doc("""
+                        Returns the number of acquisitions completed by the last or current
+                        measurement.read_waveform_loop.
+                        """))
+        self._add_property('measurement.loop_rate',
+                        self._get_measurement_loop_rate,
+                        None,
+                        None,
+                        ivi.Doc("""
+                        Returns the achieved rate of the last or current
+                        measurement.read_waveform_loop in acquisitions per second.
+                        """))
+
         self._init_channels()
     
+    def _get_measurement_loop_count(self):
+        return self._measurement_loop_count
+    
+    def _get_measurement_loop_rate(self):
+        return self._measurement_loop_rate
+    
+    def _measurement_read_waveform_loop(self, channels, count=None, max_points=None, overlap=True):
+        if type(channels) not in (list, tuple):
+            channels = [channels]
+        index_list = [ivi.get_index(self._channel_name, ch) for ch in channels]
+
+        self._measurement_loop_count = 0
+        self._measurement_loop_rate = 0.0
+
+        if self._driver_operation_simulate:
+            return iter([])
+
+        # configure transfer once
+        points = self._measurement_waveform_configure(max_points)
+        self._write(":acquire:complete 100")
+        self._set_cache_valid(False, 'trigger_continuous')
+
+        return self._measurement_waveform_loop(index_list, count, points, overlap)
+    
+    def _measurement_waveform_loop(self, index_list, count, points, overlap):
+        cmd_list = [":waveform:source %s;:waveform:data?" % self._channel_name[i] for i in index_list]
+        pre_list = [None] * len(index_list)
+        pending = False
+        start_time = time.time()
+
+        try:
+            while count is None or self._measurement_loop_count < count:
+                if not pending:
+                    self._write(":digitize;" + cmd_list[0])
+
+                raw_list = list()
+                for k in range(len(index_list)):
+                    if k > 0:
+                        self._write(cmd_list[k])
+                    raw_list.append(self._read_raw())
+                    pending = False
+                    if pre_list[k] is None:
+                        pre_list[k] = self._ask_for_waveform_preamble((index_list[k], points), ":waveform:preamble?")
+
+                self._measurement_loop_count += 1
+
+                # start next acquisition while this one is converted and processed
+                if overlap and (count is None or self._measurement_loop_count < count):
+                    self._write(":digitize;" + cmd_list[0])
+                    pending = True
+
+                traces = list()
+                for pre, raw_data in zip(pre_list, raw_list):
+                    trace, n = self._measurement_waveform_trace(pre)
+                    trace.y_raw = np.frombuffer(ivi.decode_ieee_block(memoryview(raw_data)), dtype=np.uint16, count=n)
+                    traces.append(trace)
+
+                self._measurement_loop_rate = self._measurement_loop_count / (time.time() - start_time)
+
+                yield traces
+        finally:
+            # discard response to acquisition still in flight
+            if pending:
+                self._read_raw()
+    
     
@@ -87,6 +87,10 @@ class agilentBaseInfiniium(agilentBaseScope):
         self._display_screenshot_image_format_mapping = ScreenshotImageFormatMapping
         self._display_color_grade = False
 
+        # model specific waveform transfer settings
+        self._waveform_streaming = False
+        self._waveform_invalid_acquisition_types = set()
+
         self._identity_description = "Agilent Infiniium series IVI oscilloscope driver"
         self._identity_supported_instrument_models = ['MSO9104A', 'MSO9064A','DSO90254A',
                 'DSO90404A','DSO90604A', 'DSO90804A','DSO91204A','DSO91304A','DSOX91304A',
@@ -173,6 +177,19 @@ class agilentBaseInfiniium(agilentBaseScope):
 
         return self._read_ieee_block()
 
+    def _display_write_screenshot(self, f, format='png', invert=False):
+        if self._driver_operation_simulate:
+            return
+
+        if format not in self._display_screenshot_image_format_mapping:
+            raise ivi.ValueNotSupportedException()
+
+        format = self._display_screenshot_image_format_mapping[format]
+
+        self._write(":display:data? %s, screen, on, %s" % (format, 'invert' if invert else 'normal'))
+
+        self._read_ieee_block_to(f)
+
     def _get_display_vectors(self):
         if not self._driver_operation_simulate and not self._get_cache_valid():
             self._display_vectors = bool(int(self._ask(":display:connect?")))
@@ -333,52 +350,68 @@ class agilentBaseInfiniium(agilentBaseScope):
         self._acquisition_number_of_averages = value
         self._set_cache_valid()
 
-    def _measurement_fetch_waveform(self, index):
+    def _measurement_fetch_waveform(self, index, start=None, stop=None, max_points=None):
         index = ivi.get_index(self._channel_name, index)
 
         if self._driver_operation_simulate:
-            return list()
+            return ivi.TraceYT()
 
         if sys.byteorder == 'little':
             self._write(":waveform:byteorder lsbfirst")
         else:
             self._write(":waveform:byteorder msbfirst")
         self._write(":waveform:format word")
+        if self._waveform_streaming:
+            self._write(":waveform:streaming on")
         self._write(":waveform:source %s" % self._channel_name[index])
 
+        trace = ivi.TraceYT()
+
         # Read preamble
 
-        pre = self._ask(":waveform:preamble?").split(',')
+        pre = self._ask_for_waveform_preamble(index, ":waveform:preamble?")
 
-        format = int(pre[0])
-        type = int(pre[1])
+        acq_format = int(pre[0])
+        acq_type = int(pre[1])
         points = int(pre[2])
-        count = int(pre[3])
-        xincrement = float(pre[4])
-        xorigin = float(pre[5])
-        xreference = int(float(pre[6]))
-        yincrement = float(pre[7])
-        yorigin = float(pre[8])
-        yreference = int(float(pre[9]))
-
-        #if type == 1:
-        #    raise scope.InvalidAcquisitionTypeException()
-
-        if format != 2:
-            raise UnexpectedResponseException()
-
-        # Read waveform data
-        raw_data = self._ask_for_ieee_block(":waveform:data?")
+        trace.average_count = int(pre[3])
+        trace.x_increment = float(pre[4])
+        trace.x_origin = float(pre[5])
+        trace.x_reference = int(float(pre[6]))
+        trace.y_increment = float(pre[7])
+        trace.y_origin = float(pre[8])
+        trace.y_reference = int(float(pre[9]))
+        trace.y_hole = 31232
+
+        if acq_type in self._waveform_invalid_acquisition_types:
+            raise scope.InvalidAcquisitionTypeException()
+
+        if acq_format != 2:
+            raise ivi.UnexpectedResponseException()
+
+        start, stop, step = scope.get_waveform_window(points, start, stop, max_points)
+
+        # Read waveform data, windowed in the instrument
+        if start > 0 or stop < points:
+            cmd = ":waveform:data? %d,%d" % (start+1, stop-start)
+        else:
+            cmd = ":waveform:data?"
 
-        # Split out points and convert to time and voltage pairs
-        y_data = array.array('h', raw_data[0:points*2])
+        # Store in trace object
+        if self._measurement_waveform_dtype is None:
+            raw_data = self._ask_for_ieee_block(cmd)
+            trace.y_raw = array.array('h', raw_data[0:(stop-start)*2])[::step]
+        else:
+            self._write(cmd)
+            self._read_waveform_block_converted(trace, '=i2', stop-start)
+            trace.y_raw = trace.y_raw[::step]
 
-        data = [(((i - xreference) * xincrement) + xorigin, float('nan') if y == 31232 else ((y - yreference) * yincrement) + yorigin) for i, y in enumerate(y_data)]
+        scope.offset_trace_x(trace, start, step)
 
-        return data
+        return trace
 
-    def _measurement_read_waveform(self, index, maximum_time):
-        return self._measurement_fetch_waveform(index)
+    def _measurement_read_waveform(self, index, maximum_time, start=None, stop=None, max_points=None):
+        return self._measurement_fetch_waveform(index, start, stop, max_points)
 
     def _measurement_initiate(self):
         if not self._driver_operation_simulate:
@@ -167,6 +167,8 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
                        scope.ContinuousAcquisition, scope.AverageAcquisition,
                        scope.SampleMode, scope.TriggerModifier, scope.AutoSetup,
                        extra.common.SystemSetup, extra.common.Screenshot,
+                       extra.scope.WaveformPreambleCache, extra.scope.WaveformConversion,
+                       extra.scope.WaveformMeasurementBatch,
                        ivi.Driver):
     "Agilent generic IVI oscilloscope driver"
     
@@ -210,6 +212,7 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
         self._timebase_window_position = 0.0
         self._timebase_window_range = 5e-6
         self._timebase_window_scale = 500e-9
+        self._measurement_waveform_points = None
         self._display_screenshot_image_format_mapping = ScreenshotImageFormatMapping
         self._display_vectors = True
         self._display_labels = True
@@ -584,6 +587,21 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
 
         return scr
     
+    def _display_write_screenshot(self, f, format='png', invert=False):
+        if self._driver_operation_simulate:
+            return
+        
+        if format not in self._display_screenshot_image_format_mapping:
+            raise ivi.ValueNotSupportedException()
+        
+        format = self._display_screenshot_image_format_mapping[format]
+        
+        self._write(":hardcopy:inksaver %d" % int(bool(invert)))
+        self._write(":display:data? %s" % format)
+
+        self._read_ieee_block_to(f)
+        self._read_raw() # flush buffer
+    
     def _acquisition_segmented_analyze(self):
         if not self._driver_operation_simulate:
             self._write(':acquire:segmented:analyze')
@@ -1333,13 +1351,8 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
     def _set_trigger_ac_line_slope(self, value):
         self._set_trigger_edge_slope(value)
     
-    def _measurement_fetch_waveform(self, index):
-        index = ivi.get_index(self._channel_name, index)
-
-        if self._driver_operation_simulate:
-            return ivi.TraceYT()
-
-        self._write(":waveform:source %s" % self._channel_name[index])
+    def _measurement_waveform_configure(self, max_points=None):
+        "Configure waveform transfer format, optionally decimating in the instrument"
         if sys.byteorder == 'little':
             self._write(":waveform:byteorder lsbfirst")
         else:
@@ -1347,10 +1360,22 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
         self._write(":waveform:unsigned 1")
         self._write(":waveform:format word")
 
-        trace = ivi.TraceYT()
+        if max_points is not None:
+            # decimate full record in the instrument
+            if self._measurement_waveform_points is None:
+                self._measurement_waveform_points = self._ask(":waveform:points?")
+            max_points = int(max_points)
+            self._write(":waveform:points %d" % max_points)
+        elif self._measurement_waveform_points is not None:
+            # restore point count from before decimated fetch
+            self._write(":waveform:points %s" % self._measurement_waveform_points)
+            self._measurement_waveform_points = None
 
-        # Read preamble
-        pre = self._ask(":waveform:preamble?").split(',')
+        return max_points
+
+    def _measurement_waveform_trace(self, pre):
+        "Create trace object from waveform preamble, returns trace and number of points"
+        trace = ivi.TraceYT()
 
         acq_format = int(pre[0])
         acq_type = int(pre[1])
@@ -1368,19 +1393,51 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
             raise scope.InvalidAcquisitionTypeException()
 
         if acq_format != 1:
-            raise UnexpectedResponseException()
+            raise ivi.UnexpectedResponseException()
+
+        return trace, points
+
+    def _measurement_fetch_waveform(self, index, start=None, stop=None, max_points=None):
+        index = ivi.get_index(self._channel_name, index)
+
+        if self._driver_operation_simulate:
+            return ivi.TraceYT()
+
+        self._write(":waveform:source %s" % self._channel_name[index])
+
+        if start is None and stop is None:
+            points = self._measurement_waveform_configure(max_points)
+            max_points = None
+        else:
+            points = self._measurement_waveform_configure()
+
+        # Read preamble
+        pre = self._ask_for_waveform_preamble((index, points), ":waveform:preamble?")
+
+        trace, points = self._measurement_waveform_trace(pre)
+
+        start, stop, step = scope.get_waveform_window(points, start, stop, max_points)
 
         # Read waveform data
-        raw_data = self._ask_for_ieee_block(":waveform:data?")
-        self._read_raw() # flush buffer
+        if self._measurement_waveform_dtype is None:
+            raw_data = self._ask_for_ieee_block(":waveform:data?")
+            self._read_raw() # flush buffer
 
-        # Store in trace object
-        trace.y_raw = array.array('H', raw_data[0:points*2])
+            # Store in trace object
+            trace.y_raw = array.array('H', raw_data[0:points*2])
+        else:
+            self._write(":waveform:data?")
+            self._read_waveform_block_converted(trace, '=u2', points)
+            self._read_raw() # flush buffer
+
+        # no windowing on the instrument, so window on the host
+        if start > 0 or stop < points or step > 1:
+            scope.window_trace(trace, start, stop, step)
 
         return trace
     
-    def _measurement_read_waveform(self, index, maximum_time):
-        return self._measurement_fetch_waveform(index)
+    def _measurement_read_waveform(self, index, maximum_time, start=None, stop=None, max_points=None):
+        return self._measurement_fetch_waveform(index, start, stop, max_points)
     
     def _measurement_initiate(self):
         if not self._driver_operation_simulate:
@@ -1454,7 +1511,7 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
                         self._reference_level_middle,
                         self._reference_level_low))
     
-    def _measurement_fetch_waveform_measurement(self, index, measurement_function, ref_channel = None):
+    def _measurement_waveform_measurement_query(self, index, measurement_function, ref_channel = None):
         index = ivi.get_index(self._channel_name, index)
         if index < self._analog_channel_count:
             if measurement_function not in MeasurementFunctionMapping:
@@ -1464,18 +1521,22 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
             if measurement_function not in MeasurementFunctionMappingDigital:
                 raise ivi.ValueNotSupportedException()
             func = MeasurementFunctionMappingDigital[measurement_function]
+        l = func.split(' ')
+        l[0] = l[0] + '?'
+        if len(l) > 1:
+            l[-1] = l[-1] + ','
+        func = ' '.join(l)
+        query = ":measure:%s %s" % (func, self._channel_name[index])
+        if measurement_function in ['ratio', 'phase', 'delay']:
+            if hasattr(ref_channel, 'name'):
+                ref_channel = ref_channel.name
+            ref_index = ivi.get_index(self._channel_name, ref_channel)
+            query += ", %s" % self._channel_name[ref_index]
+        return query
+
+    def _measurement_fetch_waveform_measurement(self, index, measurement_function, ref_channel = None):
+        query = self._measurement_waveform_measurement_query(index, measurement_function, ref_channel)
         if not self._driver_operation_simulate:
-            l = func.split(' ')
-            l[0] = l[0] + '?'
-            if len(l) > 1:
-                l[-1] = l[-1] + ','
-            func = ' '.join(l)
-            query = ":measure:%s %s" % (func, self._channel_name[index])
-            if measurement_function in ['ratio', 'phase', 'delay']:
-                if hasattr(ref_channel, 'name'):
-                    ref_channel = ref_channel.name
-                ref_index = ivi.get_index(self._channel_name, ref_channel)
-                query += ", %s" % self._channel_name[ref_index]
             return float(self._ask(query))
         return 0
     
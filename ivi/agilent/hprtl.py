@@ -25,303 +25,271 @@ THE SOFTWARE.
 """
 
 import io
+import re
 import struct
+import zlib
 import numpy as np
 
+ColorTables = {
+    -4: [ # KCMY
+        (255, 255, 255), # white
+        (127, 127, 127), # white
+        (  0, 255, 255), # cyan
+        (  0, 127, 127), # cyan
+        (255,   0, 255), # magenta
+        (127,   0, 127), # magenta
+        (  0,   0, 255), # blue
+        (  0,   0, 127), # blue
+        (255, 255,   0), # yellow
+        (127, 127,   0), # yellow
+        (  0, 255,   0), # green
+        (  0, 127,   0), # green
+        (255,   0,   0), # red
+        (127,   0,   0), # red
+        ( 63,  63,  63), # black
+        (  0,   0,   0)  # black
+    ],
+    -3: [ # CMY
+        (255, 255, 255), # white
+        (  0, 255, 255), # cyan
+        (255,   0, 255), # magenta
+        (  0,   0, 255), # blue
+        (255, 255,   0), # yellow
+        (  0, 255,   0), # green
+        (255,   0,   0), # red
+        (  0,   0,   0)  # black
+    ],
+    1: [ # K
+        (255, 255, 255), # white
+        (  0,   0,   0)  # black
+    ],
+    3: [ # RGB
+        (  0,   0,   0), # black
+        (255,   0,   0), # red
+        (  0, 255,   0), # green
+        (255, 255,   0), # yellow
+        (  0,   0, 255), # blue
+        (255,   0, 255), # magenta
+        (  0, 255, 255), # cyan
+        (255, 255, 255)  # white
+    ],
+    4: [ # indexed RGB
+        (  0,   0,   0), # black
+        (  0,   0,   0), # black
+        (127,   0,   0), # red
+        (255,   0,   0), # red
+        (  0, 127,   0), # green
+        (  0, 255,   0), # green
+        (127, 127,   0), # yellow
+        (255, 255,   0), # yellow
+        (  0,   0, 127), # blue
+        (  0,   0, 255), # blue
+        (127,   0, 127), # magenta
+        (255,   0, 255), # magenta
+        (  0, 127, 127), # cyan
+        (  0, 255, 255), # cyan
+        (127, 127, 127), # white
+        (255, 255, 255)  # white
+    ]
+}
+
+# ESC * [group letter][value][parameter letter], null bytes are ignored
+_rtl_command = re.compile(b'\x1b\\*(.)([-0-9\x00]*)(.)', re.DOTALL)
+
+def _unpack_bits(data, out_len):
+    """Decode a TIFF PackBits compressed row
+
+    Only the run headers are walked in Python, the row is then assembled
+    with a single gather from an array of source indices.
+    """
+    src = list()
+    cnt = list()
+    lit = list()
+    k = 0
+    n = len(data)
+    while k < n:
+        h = data[k]
+        k += 1
+        if h == 128:
+            continue
+        if h < 128:
+            src.append(k)
+            cnt.append(h+1)
+            lit.append(1)
+            k += h+1
+        else:
+            src.append(k)
+            cnt.append(257-h)
+            lit.append(0)
+            k += 1
+    if not src:
+        return np.zeros(out_len, np.uint8)
+    cnt = np.array(cnt)
+    # index of each output byte: run source plus offset within literal runs
+    start = np.cumsum(cnt) - cnt
+    off = np.arange(cnt.sum()) - np.repeat(start, cnt)
+    idx = np.repeat(np.array(src), cnt) + off * np.repeat(np.array(lit), cnt)
+    out = np.zeros(out_len, np.uint8)
+    d = np.frombuffer(data, np.uint8)
+    idx = idx[:out_len]
+    out[:len(idx)] = d[np.minimum(idx, n-1)]
+    return out
+
 def parse_hprtl(rtl_file):
-    """Convert HP Raster Transfer Language (RTL) to numpy array"""
-    color = 1
+    """Convert HP Raster Transfer Language (RTL) to numpy array
+
+    rtl_file can be a file name, a file object or the RTL data itself.
+    Returns an array of shape (height, width, 3) of RGB pixel values.
+    """
     width = 0
     byte_width = 0
-    height = 0
     compression = 0
 
-    current_row = 0
     plane_cnt = 1
     current_plane = 0
 
-    resolution = 1
-
-    plane_data = None
-
     in_raster = True
+    started = False
 
     red = 0
     green = 0
     blue = 0
 
-    color_list = [
-        (255, 255, 255), # white
-        (  0,   0,   0) # black
-    ]
+    color_list = list(ColorTables[1])
 
     if type(rtl_file) == str:
-        rtlf = open(rtl_file, 'rb')
+        with open(rtl_file, 'rb') as f:
+            data = f.read()
+    elif isinstance(rtl_file, (bytes, bytearray, memoryview)):
+        data = bytes(rtl_file)
     else:
-        rtlf = rtl_file
+        data = rtl_file.read()
 
-    while True:
-        s = rtlf.read(1)
+    # list of rows, each a list of plane rows
+    rows = list()
 
-        if len(s) == 0:
+    pos = 0
+    while True:
+        pos = data.find(b'\x1b', pos)
+        if pos < 0:
             break
 
-        if s[0] != 0x1b:
+        m = _rtl_command.match(data, pos)
+        if m is None:
+            pos += 1
             continue
-
-        s = rtlf.read(1)
-
-        if len(s) == 0:
-            break
-
-        if s[0] == ord('*'):
-            # valid ESC* command
-            # read [letter][numbers][letter]
-            cmd = rtlf.read(2)
-
-            while True:
-                if (cmd[-1] < ord('0') or cmd[-1] > ord('9')) and cmd[-1] != ord('-'):
-                    break
-
-                s = rtlf.read(1)
-
-                # ignore null bytes
-                if s[0] != 0:
-                    cmd += s
-
-            ca = cmd[0]
-            cb = cmd[-1]
-
-            #print(cmd)
-
-            if ca == ord('r') and (cb == ord('u') or cb == ord('U')):
-                # color command *r#u or *r#U
-                color = int(cmd[1:-1])
-
-                if color == -4:
-                    # KCMY
-                    plane_cnt = 4
-                    color_list = [
-                        (255, 255, 255), # white
-                        (127, 127, 127), # white
-                        (  0, 255, 255), # cyan
-                        (  0, 127, 127), # cyan
-                        (255,   0, 255), # magenta
-                        (127,   0, 127), # magenta
-                        (  0,   0, 255), # blue
-                        (  0,   0, 127), # blue
-                        (255, 255,   0), # yellow
-                        (127, 127,   0), # yellow
-                        (  0, 255,   0), # green
-                        (  0, 127,   0), # green
-                        (255,   0,   0), # red
-                        (127,   0,   0), # red
-                        ( 63,  63,  63), # black
-                        (  0,   0,   0)  # black
-                    ]
-                elif color == -3:
-                    # CMY
-                    plane_cnt = 3
-                    color_list = [
-                        (255, 255, 255), # white
-                        (  0, 255, 255), # cyan
-                        (255,   0, 255), # magenta
-                        (  0,   0, 255), # blue
-                        (255, 255,   0), # yellow
-                        (  0, 255,   0), # green
-                        (255,   0,   0), # red
-                        (  0,   0,   0)  # black
-                    ]
-                elif color == 1:
-                    # K
-                    plane_cnt = 1
-                    color_list = [
-                        (255, 255, 255), # white
-                        (  0,   0,   0)  # black
-                    ]
-                elif color == 3:
-                    # RGB
-                    plane_cnt = 3
-                    color_list = [
-                        (  0,   0,   0), # black
-                        (255,   0,   0), # red
-                        (  0, 255,   0), # green
-                        (255, 255,   0), # yellow
-                        (  0,   0, 255), # blue
-                        (255,   0, 255), # magenta
-                        (  0, 255, 255), # cyan
-                        (255, 255, 255)  # white
-                    ]
-                elif color == 4:
-                    # indexed RGB
-                    plane_cnt = 4
-                    color_list = [
-                        (  0,   0,   0), # black
-                        (  0,   0,   0), # black
-                        (127,   0,   0), # red
-                        (255,   0,   0), # red
-                        (  0, 127,   0), # green
-                        (  0, 255,   0), # green
-                        (127, 127,   0), # yellow
-                        (255, 255,   0), # yellow
-                        (  0,   0, 127), # blue
-                        (  0,   0, 255), # blue
-                        (127,   0, 127), # magenta
-                        (255,   0, 255), # magenta
-                        (  0, 127, 127), # cyan
-                        (  0, 255, 255), # cyan
-                        (127, 127, 127), # white
-                        (255, 255, 255)  # white
-                    ]
-                else:
-                    raise Exception("Invalid color")
-            elif ca == ord('r') and (cb == ord('a') or cb == ord('A')):
-                # start raster graphics
-                # only grab the first section
-                if height == 0:
-                    in_raster = True
-                elif in_raster:
-                    # if we missed the stop of one section, stop on the start of the next
-                    in_raster = False
-            elif ca == ord('r') and (cb == ord('c') or cb == ord('C')):
-                # end raster graphics
+        pos = m.end()
+
+        ca = m.group(1).lower()
+        cb = m.group(3).lower()
+        value = m.group(2).replace(b'\x00', b'')
+
+        if ca == b'r' and cb == b'u':
+            # color command *r#u or *r#U
+            color = int(value)
+            if color not in ColorTables:
+                raise Exception("Invalid color")
+            plane_cnt = int(abs(color))
+            color_list = list(ColorTables[color])
+        elif ca == b'r' and cb == b'a':
+            # start raster graphics
+            # only grab the first section
+            if not started:
+                in_raster = True
+            elif in_raster:
+                # if we missed the stop of one section, stop on the start of the next
                 in_raster = False
-            elif ca == ord('r') and (cb == ord('b') or cb == ord('B')):
-                # unknown
-                pass
-            elif ca == ord('r') and (cb == ord('s') or cb == ord('S')):
-                # raster width
-                width = int(cmd[1:-1])
-                byte_width = int((width+7)/8)
-            elif ca == ord('r') and (cb == ord('t') or cb == ord('T')):
-                # raster height
-                #height = int(cmd[1:-1])
-                pass
-            elif ca == ord('b') and (cb == ord('m') or cb == ord('M')):
-                # set compression
-                compression = int(cmd[1:-1])
-            elif ca == ord('t') and (cb == ord('r') or cb == ord('R')):
-                # set resolution
-                resolution = int(cmd[1:-1])
-            elif ca == ord('v') and (cb == ord('a') or cb == ord('A')):
-                # set red component
-                red = int(cmd[1:-1])
-            elif ca == ord('v') and (cb == ord('b') or cb == ord('B')):
-                # set green component
-                green = int(cmd[1:-1])
-            elif ca == ord('v') and (cb == ord('c') or cb == ord('C')):
-                # set blue component
-                blue = int(cmd[1:-1])
-            elif ca == ord('v') and (cb == ord('i') or cb == ord('I')):
-                # assign index
-                ind = int(cmd[1:-1])
-                color_list[ind] = (red, green, blue)
-            elif ca == ord('p') and (cb == ord('n') or cb == ord('N')):
-                # unknown
-                pass
-            elif ca == ord('v') and (cb == ord('o') or cb == ord('O')):
-                # pattern transparency mode
-                pass
-            elif ca == ord('v') and (cb == ord('n') or cb == ord('N')):
-                # source transparency mode
-                pass
-            elif ca == ord('p') and (cb == ord('x') or cb == ord('X')):
-                # move CAP horizontal
-                pass
-            elif ca == ord('p') and (cb == ord('y') or cb == ord('Y')):
-                # move CAP vertical
-                pass
-            elif ca == ord('b') and (cb == ord('v') or cb == ord('V') or cb == ord('w') or cb == ord('W')):
-                # image row
-                l = int(cmd[1:-1])
-
-                if l > 0:
-                    # read row
-                    d = rtlf.read(l)
-
-                    # skip if we are not in a raster section
-                    if not in_raster:
-                        continue
-
-                    # set width if not yet set
-                    # width must be set if compression enabled, otherwise
-                    # all lines will be the same length
-                    if width == 0:
-                        width = l * 8
-
-                    if byte_width == 0:
-                        byte_width = l
-
-                    # add row if on first plane
-                    if current_plane == 0:
-                        if height == 0:
-                            plane_data = np.zeros((10, byte_width, plane_cnt), dtype=np.uint8)
-
-                        height += 1
-
-                        if height >= plane_data.shape[0]:
-                            # need to add more rows
-                            plane_data = np.append(plane_data, np.zeros((10, byte_width, plane_cnt), dtype=np.uint8), 0)
-
-                    if compression == 0 or compression == 1:
-                        x = 0
-                        for b in d:
-                            plane_data[height-1][x][current_plane] = b
-                            x += 1
-                    elif compression == 2:
-                        k = 0
-                        x = 0
-                        while True:
-                            if len(d) <= k:
-                                break
-                            h = d[k]
-                            k += 1
-                            if h == 128:
-                                continue
-                            if h < 128:
-                                for j in range(h+1):
-                                    b = d[k]
-                                    k += 1
-                                    plane_data[height-1][x][current_plane] = b
-                                    x += 1
-                            if h > 128:
-                                b = d[k]
-                                k += 1
-                                for j in range(257-h):
-                                    plane_data[height-1][x][current_plane] = b
-                                    x += 1
-                    else:
-                        raise Exception("Invalid compression")
-
-                    # go to next plane, if more than one plane
-                    if plane_cnt > 0:
-                        current_plane += 1
-                        if current_plane == plane_cnt or cb == ord('w') or cb == ord('W'):
-                            current_plane = 0
+        elif ca == b'r' and cb == b'c':
+            # end raster graphics
+            in_raster = False
+        elif ca == b'r' and cb == b's':
+            # raster width
+            width = int(value)
+            byte_width = int((width+7)/8)
+        elif ca == b'b' and cb == b'm':
+            # set compression
+            compression = int(value)
+        elif ca == b'v' and cb == b'a':
+            # set red component
+            red = int(value)
+        elif ca == b'v' and cb == b'b':
+            # set green component
+            green = int(value)
+        elif ca == b'v' and cb == b'c':
+            # set blue component
+            blue = int(value)
+        elif ca == b'v' and cb == b'i':
+            # assign index
+            color_list[int(value)] = (red, green, blue)
+        elif ca == b'b' and cb in (b'v', b'w'):
+            # image row
+            l = int(value)
+
+            if l > 0:
+                # read row
+                d = data[pos:pos+l]
+                pos += l
+
+                # skip if we are not in a raster section
+                if not in_raster:
+                    continue
+
+                # set width if not yet set
+                # width must be set if compression enabled, otherwise
+                # all lines will be the same length
+                if width == 0:
+                    width = l * 8
+
+                if byte_width == 0:
+                    byte_width = l
+
+                # add row if on first plane
+                if current_plane == 0:
+                    started = True
+                    rows.append([None]*plane_cnt)
+
+                if compression == 0 or compression == 1:
+                    row = np.zeros(byte_width, np.uint8)
+                    d = np.frombuffer(d[:byte_width], np.uint8)
+                    row[:len(d)] = d
+                elif compression == 2:
+                    row = _unpack_bits(d, byte_width)
                 else:
-                    if cb == ord('w') or cb == ord('W'):
-                        current_plane = 0
-            else:
-                raise Exception("Invalid command (%s)" % (repr(cmd)))
-
-    # convert to bits
-    plane_data = np.unpackbits(plane_data, axis=1)
+                    raise Exception("Invalid compression")
 
-    # strip off extra rows
-    plane_data = plane_data[0:height, 0:width, :]
+                if current_plane < len(rows[-1]):
+                    rows[-1][current_plane] = row
 
-    # convert plane data to RGB
-    plane_data = np.right_shift(np.packbits(plane_data, axis=2), 8-plane_cnt)
-    
-    rgb_data = np.zeros((height, width, 3), dtype=np.uint8)
+                # go to next plane, if more than one plane
+                current_plane += 1
+                if current_plane == plane_cnt or cb == b'w':
+                    current_plane = 0
+            else:
+                if cb == b'w':
+                    current_plane = 0
+        elif (ca, cb) in ((b'r', b'b'), (b'r', b't'), (b't', b'r'), (b'p', b'n'),
+                (b'v', b'o'), (b'v', b'n'), (b'p', b'x'), (b'p', b'y')):
+            # raster height, resolution, transparency modes, cursor
+            # position and unknown commands are ignored
+            pass
+        else:
+            raise Exception("Invalid command (%s)" % (repr(m.group(0)[1:])))
+
+    height = len(rows)
+    plane_data = np.zeros((height, byte_width, plane_cnt), dtype=np.uint8)
+    for y, row in enumerate(rows):
+        for p, r in enumerate(row):
+            if r is not None:
+                plane_data[y, :, p] = r
 
-    for y in range(height):
-        for x in range(width):
-            rgb_data[y][x] = color_list[plane_data[y][x][0]]
+    # convert to bits
+    plane_data = np.unpackbits(plane_data, axis=1)[:, 0:width, :]
 
-    plane_data = rgb_data
+    # convert plane data to color index, first plane is the most significant bit
+    index = np.right_shift(np.packbits(plane_data, axis=2), 8-plane_cnt)[:, :, 0]
 
-    return plane_data
+    # color table lookup
+    return np.array(color_list, dtype=np.uint8)[index]
 
 def generate_bmp(img_data):
     """Generate a BMP format image from a numpy array"""
@@ -366,6 +334,9 @@ def generate_bmp(img_data):
     bmp.write(struct.pack('<L', color_table_entries)) # number of colors in palette (0 = 2^n)
     bmp.write(struct.pack('<L', 0)) # number of important colors in palette (0 = all)
 
+    # image data, bottom row first, rows padded to 4 bytes
+    pixels = np.zeros((height, row_size), dtype=np.uint8)
+
     if img_data.shape[2] == 1:
         # monochrome
 
@@ -373,15 +344,8 @@ def generate_bmp(img_data):
         bmp.write(struct.pack('<BBBx', 255, 255, 255)) # color 0 red, green, blue
         bmp.write(struct.pack('<BBBx', 0, 0, 0)) # color 1 red, green, blue
 
-        # image data
-        plane_data = np.packbits(img_data, axis=1)
-
-        for y in range(plane_data.shape[0]-1, -1, -1):
-            for x in range(plane_data.shape[1]):
-                bmp.write(struct.pack('<B', plane_data[y][x][0]))
-            if plane_data.shape[1] % 4 > 0:
-                for x in range(4 - (plane_data.shape[1] % 4)):
-                    bmp.write(b'\0')
+        plane_data = np.packbits(img_data[:, :, 0], axis=1)
+        pixels[:, :plane_data.shape[1]] = plane_data[::-1]
 
     else:
         # rgb
@@ -389,13 +353,40 @@ def generate_bmp(img_data):
         # color table
         # no color table for RGB
 
-        # image data
-        for y in range(img_data.shape[0]-1, -1, -1):
-            for x in range(img_data.shape[1]):
-                bmp.write(struct.pack('<BBB', img_data[y][x][2], img_data[y][x][1], img_data[y][x][0]))
-            if (img_data.shape[1]*3) % 4 > 0:
-                for x in range(4 - ((img_data.shape[1]*3) % 4)):
-                    bmp.write(b'\0')
+        # BGR byte order
+        pixels[:, :width*3] = img_data[::-1, :, 2::-1].reshape(height, width*3)
+
+    bmp.write(pixels.tobytes())
 
     return bmp.getvalue()
 
+def _png_chunk(tag, data):
+    return struct.pack('>L', len(data)) + tag + data + struct.pack('>L', zlib.crc32(tag + data) & 0xffffffff)
+
+def generate_png(img_data):
+    """Generate a PNG format image from a numpy array"""
+    width = img_data.shape[1]
+    height = img_data.shape[0]
+
+    if img_data.shape[2] == 1:
+        # monochrome, 1 bit grayscale with 1 as black
+        bit_depth = 1
+        color_type = 0
+        pixels = np.packbits(img_data[:, :, 0] == 0, axis=1)
+    else:
+        # rgb
+        bit_depth = 8
+        color_type = 2
+        pixels = np.ascontiguousarray(img_data[:, :, 0:3], dtype=np.uint8).reshape(height, width*3)
+
+    # filter type 0 (none) at the start of each row
+    raw = np.zeros((height, pixels.shape[1]+1), dtype=np.uint8)
+    raw[:, 1:] = pixels
+
+    png = io.BytesIO()
+    png.write(b'\x89PNG\r\n\x1a\n')
+    png.write(_png_chunk(b'IHDR', struct.pack('>LLBBBBB', width, height, bit_depth, color_type, 0, 0, 0)))
+    png.write(_png_chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)))
+    png.write(_png_chunk(b'IEND', b''))
+
+    return png.getvalue()
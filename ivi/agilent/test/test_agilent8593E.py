@@ -0,0 +1,95 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014-2016 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import io
+import struct
+import unittest
+
+import numpy as np
+
+from .. import agilent8593E
+
+class Virtual8593E(object):
+    "Fake 8593E responding to trace transfer commands"
+    def __init__(self, points=401):
+        self.read_buffer = io.BytesIO()
+        self.cmd_log = list()
+        self.vals = {'lg': '10', 'rl': '-10.00', 'fa': '1.0E+08', 'fb': '5.0E+08'}
+        self.data = dict((n, 8000 - (np.arange(points) % 100) * (k + 1))
+                for k, n in enumerate(['tra', 'trb', 'trc']))
+
+    def write_raw(self, data):
+        resp = list()
+        for cmd in data.decode().split(';'):
+            cmd = cmd.strip().lower()
+            if not cmd:
+                continue
+            self.cmd_log.append(cmd)
+            if cmd in ('lg?', 'rl?', 'fa?', 'fb?'):
+                resp.append(self.vals[cmd[:-1]].encode() + b'\n')
+            elif cmd[:-1] in self.data:
+                d = self.data[cmd[:-1]].astype('>i2').tobytes()
+                resp.append(b'#A' + struct.pack('>H', len(d)) + d)
+        if resp:
+            self.read_buffer = io.BytesIO(b''.join(resp))
+
+    def read_raw(self, num=-1):
+        return self.read_buffer.read(num)
+
+
+class TestAgilent8593E(unittest.TestCase):
+
+    def setUp(self):
+        self.vsa = Virtual8593E()
+        self.sa = agilent8593E(self.vsa)
+
+    def test_fetch_y(self):
+        trace = self.sa.traces[0].fetch_y()
+        self.assertEqual(len(trace), 401)
+        self.assertAlmostEqual(trace.y[0], -10)
+        self.assertAlmostEqual(trace.y[1], -10.01)
+        self.assertAlmostEqual(trace.x[0], 100e6)
+        self.assertAlmostEqual(trace.x[-1], 500e6)
+        trace = self.sa.traces['trb'].fetch_y()
+        self.assertAlmostEqual(trace.y[1], -10.02)
+        # scale, reference level and transfer format are only sent once
+        self.assertEqual(self.vsa.cmd_log.count('lg?'), 1)
+        self.assertEqual(self.vsa.cmd_log.count('rl?'), 1)
+        self.assertEqual(self.vsa.cmd_log.count('tdf a'), 1)
+        # changing the reference level through the driver updates the scaling
+        self.sa.level.reference = -20
+        self.assertAlmostEqual(self.sa.traces[0].fetch_y().y[0], -20)
+
+    def test_fetch_traces(self):
+        y = self.sa.acquisition.fetch_traces()
+        self.assertEqual(y.shape, (3, 401))
+        self.assertAlmostEqual(y[2, 1], -10.03)
+        self.assertEqual(self.vsa.read_buffer.read(), b'')
+        for i, name in enumerate(['tra', 'trb', 'trc']):
+            self.assertTrue(np.allclose(y[i], self.sa.traces[i].fetch_y().y))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014-2016 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import io
+import unittest
+
+import numpy as np
+
+import ivi
+from .. import agilent86140B
+
+class Virtual86140B(object):
+    "Fake 86140B responding to trace transfer commands"
+    def __init__(self, points=20001):
+        self.read_buffer = io.BytesIO()
+        self.write_count = 0
+        self.cmd_log = list()
+        self.format = 'ascii'
+        self.data = dict((n, -60 + np.arange(points) * 1e-3 + k)
+                for k, n in enumerate(['tra', 'trb', 'trc', 'trd', 'tre', 'trf']))
+
+    def write_raw(self, data):
+        self.write_count += 1
+        resp = list()
+        for cmd in data.decode().split(';'):
+            cmd = cmd.strip().lstrip(':')
+            self.cmd_log.append(cmd)
+            l = cmd.lower().split(' ', 1)
+            if l[0] == '*idn?':
+                resp.append(b'Agilent Technologies,86142B,US00000000,B.04.01')
+            elif l[0] == 'sense:wavelength:start?':
+                resp.append(b'+1.50000000E-006')
+            elif l[0] == 'sense:wavelength:stop?':
+                resp.append(b'+1.60000000E-006')
+            elif l[0] == '*rst':
+                self.format = 'ascii'
+            elif l[0] == 'format:data':
+                self.format = l[1]
+            elif l[0] == 'trace:data:y?':
+                y = self.data[l[1]]
+                if self.format == 'real,64':
+                    resp.append(ivi.build_ieee_block(y.astype('>f8').tobytes()))
+                else:
+                    resp.append(','.join('%e' % v for v in y).encode())
+        if resp:
+            self.read_buffer = io.BytesIO(b';'.join(resp) + b'\n')
+
+    def read_raw(self, num=-1):
+        return self.read_buffer.read(num)
+
+    def clear(self):
+        pass
+
+
+class TestAgilent86140B(unittest.TestCase):
+
+    def setUp(self):
+        self.vosa = Virtual86140B()
+        self.osa = agilent86140B(self.vosa)
+
+    def test_fetch_y(self):
+        trace = self.osa.traces[1].fetch_y()
+        self.assertEqual(len(trace), 20001)
+        self.assertTrue(np.array_equal(trace.y, self.vosa.data['trb']))
+        self.assertAlmostEqual(trace.x[0], 1.5e-6)
+        self.assertAlmostEqual(trace.x[-1], 1.6e-6)
+        self.assertEqual(self.vosa.read_buffer.read(), b'')
+        # data format is only set once
+        self.osa.traces[0].fetch_y()
+        self.assertEqual(self.vosa.cmd_log.count('format:data real,64'), 1)
+
+    def test_fetch_traces(self):
+        self.osa.traces[0].fetch_y()
+        self.vosa.write_count = 0
+        traces = self.osa.acquisition.fetch_traces()
+        self.assertEqual(self.vosa.write_count, 1)
+        self.assertEqual(len(traces), 6)
+        for trace, name in zip(traces, ['tra', 'trb', 'trc', 'trd', 'tre', 'trf']):
+            self.assertTrue(np.array_equal(trace.y, self.vosa.data[name]))
+        traces = self.osa.acquisition.fetch_traces(['trc', 0])
+        self.assertTrue(np.array_equal(traces[0].y, self.vosa.data['trc']))
+        self.assertTrue(np.array_equal(traces[1].y, self.vosa.data['tra']))
+
+    def test_fetch_y_after_reset(self):
+        self.osa.traces[0].fetch_y()
+        # *RST returns the instrument to ASCII, the format is sent again
+        self.osa.utility.reset()
+        self.assertEqual(self.vosa.format, 'ascii')
+        trace = self.osa.traces[2].fetch_y()
+        self.assertTrue(np.array_equal(trace.y, self.vosa.data['trc']))
+        self.assertEqual(self.vosa.cmd_log.count('format:data real,64'), 2)
+
+if __name__ == '__main__':
+    unittest.main()
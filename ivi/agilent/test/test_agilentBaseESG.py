@@ -0,0 +1,244 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014-2016 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import io
+import threading
+import unittest
+
+import numpy as np
+
+import ivi
+from .. import agilentE4421B
+from .. import agilentE4433B
+
+class VirtualESG(object):
+    "Fake ESG recording list sweep commands"
+    def __init__(self):
+        self.read_buffer = io.BytesIO()
+        self.write_count = 0
+        self.cmd_log = list()
+        self.lists = dict()
+        self.files = dict()
+        self.unsettled = 0
+
+    def write_raw(self, data):
+        self.write_count += 1
+        if data.startswith(b'mmemory:data'):
+            # waveform block, keep the binary data apart from the header
+            cmd, block = data.split(b', ', 1)
+            self.cmd_log.append(cmd.decode())
+            cmd, name = cmd.decode().split(' ', 1)
+            name = name.strip('"')
+            if not cmd.endswith(':append'):
+                self.files[name] = b''
+            self.files[name] += ivi.decode_ieee_block(block)
+            return
+        for cmd in data.decode().split(';'):
+            cmd = cmd.strip().lstrip(':')
+            self.cmd_log.append(cmd)
+            l = cmd.lower().split(' ', 1)
+            if l[0] == '*idn?':
+                self.read_buffer = io.BytesIO(b'Hewlett-Packard,ESG-A4000B,US00000000,B.03.50\n')
+            elif l[0] == '*opc?':
+                self.read_buffer = io.BytesIO(b'1\n')
+            elif l[0] == 'status:questionable:power:condition?':
+                self.read_buffer = io.BytesIO(b'2\n' if self.unsettled > 0 else b'0\n')
+                self.unsettled -= 1
+            elif l[0] in ('list:frequency', 'list:power', 'list:dwell'):
+                self.lists[l[0].split(':')[1]] = np.array([float(v) for v in l[1].split(',')])
+
+    def read_raw(self, num=-1):
+        return self.read_buffer.read(num)
+
+    def clear(self):
+        pass
+
+
+class TestESGList(unittest.TestCase):
+
+    def setUp(self):
+        self.vsg = VirtualESG()
+        self.sg = agilentE4421B(self.vsg)
+        self.freq = np.linspace(1e9, 2e9, 1000) + 0.5
+        self.power = np.linspace(-20, 0, 1000)
+
+    def test_upload(self):
+        self.sg.sweep.list.create_frequency_power('sweep', self.freq, self.power)
+        self.sg.sweep.list.dwell = 2e-3
+        self.vsg.write_count = 0
+        self.sg.sweep.list.selected_list = 'sweep'
+        # whole list in a single transfer
+        self.assertEqual(self.vsg.write_count, 1)
+        self.assertTrue(np.allclose(self.vsg.lists['frequency'], self.freq, rtol=0, atol=1e-3))
+        self.assertTrue(np.allclose(self.vsg.lists['power'], self.power))
+        self.assertEqual(self.vsg.lists['dwell'].tolist(), [2e-3])
+
+        self.sg.sweep.trigger_source = 'external'
+        self.sg.sweep.mode = 'list'
+        self.assertIn('trigger:source ext', self.vsg.cmd_log)
+        self.assertIn('list:type list', self.vsg.cmd_log)
+        self.assertIn('frequency:mode list', self.vsg.cmd_log)
+        self.assertIn('power:mode list', self.vsg.cmd_log)
+
+        self.sg.sweep.list.single_step_enabled = True
+        self.assertEqual(self.vsg.cmd_log[-1], 'list:trigger:source ext')
+        self.sg.send_software_trigger()
+        self.assertEqual(self.vsg.cmd_log[-1], '*trg')
+
+    def test_list_cache(self):
+        self.sg.sweep.list.create_frequency('a', self.freq, dwell=np.full(1000, 1e-3))
+        self.sg.sweep.list.create_power('b', self.power)
+        self.sg.sweep.list.selected_list = 'a'
+        self.sg.sweep.list.selected_list = 'b'
+        self.vsg.write_count = 0
+        self.sg.sweep.list.selected_list = 'b'
+        self.assertEqual(self.vsg.write_count, 0)
+        # recreating with the same content keeps the uploaded copy
+        self.sg.sweep.list.create_power('b', self.power.copy())
+        self.assertEqual(self.vsg.write_count, 0)
+        # changed content of the selected list is uploaded again
+        self.sg.sweep.list.create_power('b', self.power - 1)
+        self.assertEqual(self.vsg.write_count, 1)
+        self.assertTrue(np.allclose(self.vsg.lists['power'], self.power - 1))
+        self.sg.sweep.mode = 'list'
+        self.assertEqual(self.vsg.cmd_log[-2:], ['frequency:mode cw', 'power:mode list'])
+        # reset invalidates the instrument copy
+        self.sg.sweep.mode = 'none'
+        self.sg.utility.reset()
+        self.vsg.write_count = 0
+        self.sg.sweep.list.selected_list = 'a'
+        self.assertEqual(self.vsg.write_count, 1)
+
+    def test_sweep_modes(self):
+        for mode in ('frequency_sweep', 'frequency_step'):
+            self.sg.sweep.mode = mode
+            self.assertEqual(self.vsg.cmd_log[-3:], ['list:type step', 'frequency:mode list', 'power:mode fix'])
+            self.assertEqual(self.sg.sweep.mode, mode)
+        for mode in ('power_sweep', 'power_step'):
+            self.sg.sweep.mode = mode
+            self.assertEqual(self.vsg.cmd_log[-3:], ['list:type step', 'frequency:mode cw', 'power:mode list'])
+            self.assertEqual(self.sg.sweep.mode, mode)
+        self.sg.sweep.mode = 'none'
+        self.assertEqual(self.vsg.cmd_log[-2:], ['frequency:mode cw', 'power:mode fix'])
+        self.assertRaises(ivi.ValueNotSupportedException, setattr, self.sg.sweep, 'mode', 'ramp')
+
+    def test_errors(self):
+        self.assertRaises(ivi.OutOfRangeException, self.sg.sweep.list.create_frequency_power,
+                'x', self.freq, self.power[:-1])
+        self.assertRaises(ivi.OutOfRangeException, self.sg.sweep.list.create_frequency,
+                'x', np.linspace(1e9, 5e9, 10))
+        self.assertRaises(ivi.OutOfRangeException, self.sg.sweep.list.create_power,
+                'x', np.zeros(2000))
+        self.assertRaises(ivi.rfsiggen.FrequencyListUnknownException,
+                setattr, self.sg.sweep.list, 'selected_list', 'missing')
+        self.sg.sweep.list.clear_all()
+        self.assertRaises(ivi.rfsiggen.FrequencyListUnknownException,
+                setattr, self.sg.sweep, 'mode', 'list')
+
+class TestESGDArbUpload(unittest.TestCase):
+
+    def setUp(self):
+        self.vsg = VirtualESG()
+        self.sg = agilentE4433B(self.vsg)
+        self.sg._digital_modulation_arb_chunk_size = 1000
+        t = np.arange(10000)
+        self.i = np.cos(t * 0.01)
+        self.q = np.sin(t * 0.01)
+
+    def decode(self, name):
+        return np.frombuffer(self.vsg.files[name], '>u2')
+
+    def expected(self, y):
+        return np.rint((np.clip(y, -1, 1) + 1) / 2 * ((1 << 14) - 1)).astype(int)
+
+    def test_write_chunked(self):
+        self.sg.digital_modulation.arb.write_waveform('wfm', self.i, self.q)
+        self.assertEqual(self.vsg.write_count, 20)
+        self.assertTrue(np.array_equal(self.decode('ARBI:wfm'), self.expected(self.i)))
+        self.assertTrue(np.array_equal(self.decode('ARBQ:wfm'), self.expected(self.q)))
+        # complex samples, rewriting replaces the old data
+        self.sg.digital_modulation.arb.write_waveform('wfm', (self.i + 1j*self.q)[:3000])
+        self.assertTrue(np.array_equal(self.decode('ARBQ:wfm'), self.expected(self.q[:3000])))
+
+    def test_write_error(self):
+        count = threading.active_count()
+        def fail(data):
+            raise ivi.IOException()
+        self.vsg.write_raw = fail
+        self.assertRaises(ivi.IOException, self.sg.digital_modulation.arb.write_waveform, 'wfm', self.i, self.q)
+        # encoder thread is stopped, not left blocked on the queue
+        self.assertEqual(threading.active_count(), count)
+
+    def test_more_data_pending(self):
+        def segments():
+            for k in range(0, 10000, 2500):
+                yield self.i[k:k+2500] + 1j*self.q[k:k+2500]
+        self.sg.digital_modulation.arb.write_waveform('wfm', segments(), None, True)
+        self.sg.digital_modulation.arb.write_waveform('wfm', self.i[:100], self.q[:100], False)
+        self.assertEqual(self.sg._digital_modulation_arb_pending, dict())
+        self.assertTrue(np.array_equal(self.decode('ARBI:wfm'),
+                self.expected(np.concatenate((self.i, self.i[:100])))))
+        self.assertEqual(self.vsg.cmd_log.count('mmemory:data "ARBQ:wfm"'), 1)
+        self.assertRaises(ivi.ValueNotSupportedException,
+                self.sg.digital_modulation.arb.write_waveform, 'odd', self.i[:101], self.q[:101])
+        self.assertRaises(ivi.ValueNotSupportedException,
+                self.sg.digital_modulation.arb.write_waveform, 'odd', self.i[:100], self.q[:99])
+
+class TestESGSettle(unittest.TestCase):
+
+    def setUp(self):
+        self.vsg = VirtualESG()
+        self.sg = agilentE4421B(self.vsg)
+
+    def test_opc(self):
+        self.vsg.cmd_log = list()
+        self.sg.rf.wait_until_settled(1.0)
+        self.assertEqual(self.vsg.cmd_log, ['*opc?', 'status:questionable:power:condition?'])
+
+    def test_poll(self):
+        self.sg._rf_settle_method = 'poll'
+        self.vsg.unsettled = 3
+        self.vsg.cmd_log = list()
+        self.sg.rf.wait_until_settled(1.0)
+        self.assertEqual(self.vsg.cmd_log, ['status:questionable:power:condition?'] * 4)
+
+    def test_timeout(self):
+        self.vsg.unsettled = 1000000
+        self.assertRaises(ivi.MaxTimeoutExceededException, self.sg.rf.wait_until_settled, 0.02)
+
+    def test_async(self):
+        self.vsg.unsettled = 2
+        done = list()
+        handle = self.sg.rf.wait_until_settled_async(1.0, done.append)
+        self.assertTrue(handle.wait(5))
+        self.assertTrue(handle.done())
+        self.assertEqual(done, [handle])
+        self.vsg.unsettled = 1000000
+        handle = self.sg.rf.wait_until_settled_async(0.02)
+        self.assertRaises(ivi.MaxTimeoutExceededException, handle.wait, 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,184 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014-2016 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import array
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import ivi
+from .. import agilentDSOX3034A
+from .. import hprtl
+
+class VirtualInfiniiVision(object):
+    "Fake InfiniiVision scope responding to waveform transfer commands"
+    def __init__(self, points=1000):
+        self.read_buffer = io.BytesIO()
+        self.write_count = 0
+        self.cmd_log = list()
+        self.points = points
+        self.source = 'channel1'
+        self.acquisitions = 0
+        self.screen = np.zeros((48, 64, 3), dtype=np.uint8)
+        self.screen[10:20, 5:60] = (255, 128, 0)
+        self.screen[:, 32] = (10, 20, 30)
+
+    def write_raw(self, data):
+        self.write_count += 1
+        for cmd in data.decode().split(';'):
+            self.cmd_log.append(cmd)
+            l = cmd.lower().split(' ', 1)
+            if l[0] == '*idn?':
+                self.read_buffer = io.BytesIO(b'AGILENT TECHNOLOGIES,DSO-X 3034A,MY00000000,02.35\n')
+            elif l[0] == ':digitize':
+                self.acquisitions += 1
+            elif l[0] == ':waveform:source':
+                self.source = l[1]
+            elif l[0] == ':waveform:preamble?':
+                pre = '+1,+0,+%d,+1,+1.0E-09,-5.0E-07,+0,+1.0E-02,+0.0E+00,+32768\n' % self.points
+                self.read_buffer = io.BytesIO(pre.encode())
+            elif l[0] == ':waveform:data?':
+                d = array.array('H', [int(self.source[-1])*1000 + self.acquisitions]*self.points)
+                self.read_buffer = io.BytesIO(ivi.build_ieee_block(d.tobytes()) + b'\n')
+            elif l[0] == ':display:data?':
+                if l[1] == 'png':
+                    img = hprtl.generate_png(self.screen)
+                else:
+                    img = hprtl.generate_bmp(self.screen)
+                self.read_buffer = io.BytesIO(ivi.build_ieee_block(img) + b'\n')
+
+    def read_raw(self, num=-1):
+        return self.read_buffer.read(num)
+
+
+class TestInfiniiVisionLoop(unittest.TestCase):
+
+    def setUp(self):
+        self.vscope = VirtualInfiniiVision()
+        self.scope = agilentDSOX3034A(self.vscope)
+
+    def test_read_waveform_loop(self):
+        self.vscope.cmd_log = list()
+        self.vscope.write_count = 0
+        n = 0
+        for traces in self.scope.measurement.read_waveform_loop(['channel1', 'channel2'], 10):
+            n += 1
+            self.assertEqual(len(traces), 2)
+            self.assertEqual(len(traces[0]), 1000)
+            self.assertEqual(traces[0].y_raw[0], 1000 + n)
+            self.assertEqual(traces[1].y_raw[0], 2000 + n)
+        self.assertEqual(n, 10)
+        self.assertEqual(self.scope.measurement.loop_count, 10)
+        self.assertTrue(self.scope.measurement.loop_rate > 0)
+        # configuration and preamble only once
+        self.assertEqual(self.vscope.cmd_log.count(':waveform:preamble?'), 2)
+        self.assertEqual(self.vscope.cmd_log.count(':waveform:format word'), 1)
+        self.assertEqual(self.vscope.cmd_log.count(':digitize'), 10)
+
+    def test_read_waveform_loop_stop(self):
+        loop = self.scope.measurement.read_waveform_loop('channel1')
+        for n, traces in enumerate(loop):
+            if n == 4:
+                break
+        loop.close()
+        # response to the acquisition in flight was discarded
+        self.assertEqual(self.vscope.read_buffer.read(), b'')
+        self.assertEqual(self.vscope.acquisitions, 6)
+
+class TestInfiniiVisionConversion(unittest.TestCase):
+
+    def setUp(self):
+        self.vscope = VirtualInfiniiVision(100001)
+        self.scope = agilentDSOX3034A(self.vscope)
+
+    def test_fetch_waveform_converted(self):
+        ref = self.scope.channels[1].measurement.fetch_waveform()
+        self.scope.measurement.waveform_dtype = 'float32'
+        # odd chunk size, so samples straddle chunk boundaries
+        self.scope._measurement_waveform_chunk_size = 4097
+        trace = self.scope.channels[1].measurement.fetch_waveform()
+        self.assertEqual(trace.y_raw.dtype.name, 'float32')
+        self.assertEqual(len(trace), 100001)
+        self.assertTrue(abs(trace.y - ref.y).max() < 1e-4)
+        self.assertEqual(self.vscope.read_buffer.read(), b'')
+
+    def test_fetch_waveform_converted_window(self):
+        self.scope.measurement.waveform_dtype = 'float64'
+        trace = self.scope.channels[0].measurement.fetch_waveform(start=100, stop=200)
+        self.assertEqual(len(trace), 100)
+        self.assertEqual(trace.t[0], -5.0e-7 + 100e-9)
+        self.assertAlmostEqual(trace.y[0], (1000 - 32768) * 1e-2)
+
+    def test_waveform_dtype(self):
+        self.assertEqual(self.scope.measurement.waveform_dtype, None)
+        self.assertRaises(ivi.ValueNotSupportedException, setattr,
+                self.scope.measurement, 'waveform_dtype', 'int16')
+
+
+class TestInfiniiVisionScreenshot(unittest.TestCase):
+
+    def setUp(self):
+        self.vscope = VirtualInfiniiVision()
+        self.scope = agilentDSOX3034A(self.vscope)
+
+    def test_fetch_screenshot_to_file_object(self):
+        f = io.BytesIO()
+        self.assertEqual(self.scope.display.fetch_screenshot_to(f), 'png')
+        self.assertIn(':display:data? png', self.vscope.cmd_log)
+        self.assertEqual(f.getvalue(), hprtl.generate_png(self.vscope.screen))
+        # block terminator is flushed, not written to the file
+        self.assertEqual(self.vscope.read_buffer.read(), b'')
+
+    def test_fetch_screenshot_to_path(self):
+        d = tempfile.mkdtemp()
+        try:
+            name = os.path.join(d, 'screen.bmp')
+            self.assertEqual(self.scope.display.fetch_screenshot_to(name, 'bmp'), 'bmp')
+            with open(name, 'rb') as f:
+                self.assertEqual(f.read(), hprtl.generate_bmp(self.vscope.screen))
+        finally:
+            shutil.rmtree(d)
+
+    def test_fetch_screenshot_array(self):
+        for format in ('auto', 'bmp'):
+            img = self.scope.display.fetch_screenshot_array(format)
+            self.assertEqual(img.shape, (48, 64, 3))
+            self.assertTrue(np.array_equal(img, self.vscope.screen))
+
+    def test_decode_png_without_header(self):
+        png = hprtl.generate_png(self.vscope.screen)
+        self.assertTrue(np.array_equal(ivi.extra.common.decode_png(png), self.vscope.screen))
+        # drop the IHDR chunk following the signature
+        self.assertRaises(ivi.UnexpectedResponseException, ivi.extra.common.decode_png,
+                png[:8] + png[33:])
+
+
+if __name__ == '__main__':
+    unittest.main()
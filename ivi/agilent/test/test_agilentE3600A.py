@@ -0,0 +1,100 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014-2016 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import io
+import unittest
+
+import numpy as np
+
+import ivi
+from .. import agilentE3631A
+
+class VirtualE3631A(object):
+    "Fake E3631A recording SCPI commands"
+    def __init__(self):
+        self.read_buffer = io.BytesIO()
+        self.write_count = 0
+        self.cmd_log = list()
+        self.channel = 1
+
+    def write_raw(self, data):
+        self.write_count += 1
+        resp = list()
+        for cmd in data.decode().split(';'):
+            cmd = cmd.strip().lstrip(':').lower()
+            self.cmd_log.append(cmd)
+            l = cmd.split(' ', 1)
+            if l[0] == '*idn?':
+                resp.append('HEWLETT-PACKARD,E3631A,0,2.1-5.0-1.0')
+            elif l[0] == 'instrument:nselect':
+                self.channel = int(l[1])
+            elif l[0] == 'measure:voltage?':
+                resp.append('%+.8E' % (self.channel * 5))
+            elif l[0] == 'measure:current?':
+                resp.append('%+.8E' % (self.channel / 10.0))
+        if resp:
+            self.read_buffer = io.BytesIO((';'.join(resp) + '\n').encode())
+
+    def read_raw(self, num=-1):
+        return self.read_buffer.read(num)
+
+    def clear(self):
+        pass
+
+
+class TestE3631AConfigure(unittest.TestCase):
+
+    def setUp(self):
+        self.vps = VirtualE3631A()
+        self.ps = agilentE3631A(self.vps)
+
+    def test_configure_many(self):
+        self.vps.write_count = 0
+        self.vps.cmd_log = list()
+        self.ps.configure_many([dict(voltage=5, current=1), dict(voltage=20), dict(voltage=-20, enabled=True)])
+        self.assertEqual(self.vps.write_count, 1)
+        self.assertEqual(self.vps.cmd_log, ['instrument:nselect 1', 'source:current:level 1.000000',
+                'source:voltage:level 5.000000', 'instrument:nselect 2', 'source:voltage:level 20.000000',
+                'instrument:nselect 3', 'source:voltage:level -20.000000', 'output 1'])
+        self.assertEqual(self.ps.outputs[2].voltage_level, -20)
+class TestE3631AMeasurement(unittest.TestCase):
+
+    def setUp(self):
+        self.vps = VirtualE3631A()
+        self.ps = agilentE3631A(self.vps)
+
+    def test_measure_all(self):
+        self.vps.write_count = 0
+        self.vps.cmd_log = list()
+        m = self.ps.measurement.measure_all(['voltage', 'current'])
+        # queries for all outputs are pipelined in one message
+        self.assertEqual(self.vps.write_count, 1)
+        self.assertEqual(self.vps.cmd_log[:3], ['instrument:nselect 1', 'measure:voltage?',
+                'measure:current?'])
+        np.testing.assert_allclose(m, [[5, 0.1], [10, 0.2], [15, 0.3]])
+
+if __name__ == '__main__':
+    unittest.main()
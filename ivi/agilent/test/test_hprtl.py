@@ -0,0 +1,155 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014-2016 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import struct
+import unittest
+import zlib
+
+import numpy as np
+
+from ivi.agilent import hprtl
+
+
+def pack_bits(row):
+    "TIFF PackBits encoder, used to build test captures"
+    out = bytearray()
+    i = 0
+    n = len(row)
+    while i < n:
+        j = i + 1
+        while j < n and j - i < 128 and row[j] == row[i]:
+            j += 1
+        if j - i > 1:
+            out.append(257 - (j - i))
+            out.append(row[i])
+            i = j
+            continue
+        j = i + 1
+        while j < n and j - i < 128 and (j + 1 >= n or row[j] != row[j+1]):
+            j += 1
+        out.append(j - i - 1)
+        out.extend(row[i:j])
+        i = j
+    return bytes(out)
+
+
+def make_capture(index, color=3, compression=2):
+    "Build an RTL capture of a color index image, one plane per bit"
+    height, width = index.shape
+    plane_cnt = abs(color)
+    rtl = bytearray(b'\x1bE')
+    rtl += b'\x1b*r%dU' % color
+    rtl += b'\x1b*r%dS' % width
+    rtl += b'\x1b*b%dM' % compression
+    rtl += b'\x1b*r1A'
+    for y in range(height):
+        for p in range(plane_cnt):
+            bits = (index[y] >> (plane_cnt-1-p)) & 1
+            row = np.packbits(bits.astype(np.uint8)).tobytes()
+            if compression == 2:
+                row = pack_bits(row)
+            cmd = b'W' if p == plane_cnt-1 else b'V'
+            rtl += b'\x1b*b%d' % len(row) + cmd + row
+    rtl += b'\x1b*rC'
+    return bytes(rtl)
+
+
+def stored_capture():
+    "Synthetic 8590-style screen capture: flat background, graticule and trace"
+    height, width = 480, 640
+    index = np.zeros((height, width), dtype=np.uint8)
+    index[::48, :] = 7
+    index[:, ::64] = 7
+    x = np.arange(width)
+    y = (240 + 100*np.sin(x / 40.0)).astype(int)
+    index[y, x] = 2
+    index[y+1, x] = 2
+    index[400:440, 20:300] = 4
+    return index
+
+
+class TestHPRTL(unittest.TestCase):
+    def test_pack_bits_decode(self):
+        row = bytes(bytearray([0, 0, 0, 0, 1, 2, 3, 255, 255, 7]))
+        self.assertEqual(hprtl._unpack_bits(pack_bits(row), 12).tolist(),
+                list(bytearray(row)) + [0, 0])
+
+    def test_parse_rgb(self):
+        index = stored_capture()[:64, :100]
+        colors = np.array(hprtl.ColorTables[3], dtype=np.uint8)
+        for compression in (0, 2):
+            img = hprtl.parse_hprtl(make_capture(index, 3, compression))
+            self.assertEqual(img.shape, (64, 100, 3))
+            self.assertTrue(np.array_equal(img, colors[index]))
+
+    def test_parse_kcmy_file_object(self):
+        import io
+        index = (np.arange(16*40).reshape(16, 40) % 16).astype(np.uint8)
+        img = hprtl.parse_hprtl(io.BytesIO(make_capture(index, -4)))
+        colors = np.array(hprtl.ColorTables[-4], dtype=np.uint8)
+        self.assertTrue(np.array_equal(img, colors[index]))
+
+    def test_palette_assignment(self):
+        index = np.array([[0, 1, 1, 0]*4], dtype=np.uint8)
+        rtl = make_capture(index, 1, 0)
+        rtl = rtl.replace(b'\x1b*r1A', b'\x1b*v10A\x1b*v20B\x1b*v30C\x1b*v1I\x1b*r1A')
+        img = hprtl.parse_hprtl(rtl)
+        self.assertEqual(img[0, 1].tolist(), [10, 20, 30])
+        self.assertEqual(img[0, 0].tolist(), [255, 255, 255])
+
+    def test_generate_bmp(self):
+        img = np.zeros((3, 5, 3), dtype=np.uint8)
+        img[0, 0] = (1, 2, 3)
+        bmp = hprtl.generate_bmp(img)
+        self.assertEqual(bmp[0:2], b'BM')
+        offset = struct.unpack('<L', bmp[10:14])[0]
+        self.assertEqual(len(bmp), struct.unpack('<L', bmp[2:6])[0])
+        self.assertEqual(len(bmp) - offset, 3*16)
+        # top row is stored last, in BGR order
+        self.assertEqual(bytearray(bmp[offset+2*16:offset+2*16+3]), bytearray([3, 2, 1]))
+
+    def test_generate_png(self):
+        img = np.arange(2*4*3, dtype=np.uint8).reshape(2, 4, 3)
+        png = hprtl.generate_png(img)
+        self.assertEqual(png[0:8], b'\x89PNG\r\n\x1a\n')
+        self.assertEqual(struct.unpack('>LL', png[16:24]), (4, 2))
+        length = struct.unpack('>L', png[33:37])[0]
+        raw = bytearray(zlib.decompress(png[41:41+length]))
+        self.assertEqual(raw[0], 0)
+        self.assertEqual(raw[1:13], bytearray(img[0].tobytes()))
+
+    def test_full_size_capture(self):
+        index = stored_capture()
+        rtl = make_capture(index)
+        colors = np.array(hprtl.ColorTables[3], dtype=np.uint8)
+        img = hprtl.parse_hprtl(rtl)
+        self.assertTrue(np.array_equal(img, colors[index]))
+        self.assertEqual(hprtl.generate_bmp(img)[0:2], b'BM')
+        self.assertEqual(hprtl.generate_png(img)[0:8], b'\x89PNG\r\n\x1a\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
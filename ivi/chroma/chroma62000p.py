@@ -28,7 +28,7 @@ from .chromaBaseDCPwr import *
 
 OCPLevels = set(["low", "high"])
 
-class chroma62000p(chromaBaseDCPwr):
+class chroma62000p(chromaBaseDCPwr, scpi.dcpwr.List):
     "Chroma ATE 62000P series IVI DC power supply driver"
 
     def __init__(self, *args, **kwargs):
@@ -52,6 +52,13 @@ class chroma62000p(chromaBaseDCPwr):
 
         self._memory_size = 10
 
+        # lists are stored as a program of auto sequences
+        self._output_list_program = 1
+        self._output_list_max_points = 100
+        self._output_list_dwell_min = 0.005
+        self._output_list_dwell_max = 15000.0
+        self._output_list_count_max = 15000
+
         self._identity_description = "Chroma 62000P series IVI DC power supply driver"
         self._identity_identifier = ""
         self._identity_revision = ""
@@ -151,7 +158,8 @@ class chroma62000p(chromaBaseDCPwr):
         """
         index = ivi.get_index(self._output_name, index)
         value = float(value)
-        if value < 0 or value > self._output_voltage_max[index]:
+        vmin, vmax = self._output_voltage_range(index)
+        if value < vmin or value > vmax:
             raise ivi.OutOfRangeException()
         if not self._driver_operation_simulate:
             self._write("SOUR:VOLT %.2f" % float((value)))
@@ -208,6 +216,22 @@ class chroma62000p(chromaBaseDCPwr):
     #    self._output_ocp_limit[index] = value
     #    self._set_cache_valid(index=index)
 
+    def _output_configure_commands(self, index, voltage, current, ovp, enabled):
+        """
+        This function returns the commands for outputs[].configure, in the forms
+        used by the individual setters.
+        """
+        cmd = list()
+        if ovp is not None:
+            cmd.append("SOUR:VOLT:PROT:HIGH %.1f" % ovp)
+        if current is not None:
+            cmd.append("SOUR:CURR %.2f" % current)
+        if voltage is not None:
+            cmd.append("SOUR:VOLT %.2f" % voltage)
+        if enabled is not None:
+            cmd.append("CONF:OUTP %s" % ("OFF", "ON")[enabled])
+        return cmd
+
     # Tested on Chroma 62012P-80-60; working
     def _output_measure(self, index, meas_type):
         """
@@ -224,6 +248,12 @@ class chroma62000p(chromaBaseDCPwr):
                 return float(self._ask("FETC:CURR?"))
         return 0
 
+    def _measurement_measure_all_commands(self, types):
+        """
+        This function returns the queries for measurement.measure_all.
+        """
+        return ["FETC:%s?" % t[:4].upper() for t in types]
+
     # Tested on Chroma 62012P-80-60; working
     def _get_output_slew_rate(self, index):
         """
@@ -254,3 +284,32 @@ class chroma62000p(chromaBaseDCPwr):
         for k in range(self._output_count):
             self._set_cache_valid(valid=False, index=k)
         self._set_cache_valid(index=index)
+
+    def _set_output_list_enabled(self, index, value):
+        """
+        This function runs or stops the program holding the list.
+        """
+        index = ivi.get_index(self._output_name, index)
+        value = bool(value)
+        if not self._driver_operation_simulate:
+            self._write("PROG:SEL %d;:PROG:RUN %s" % (self._output_list_program, ("OFF", "ON")[value]))
+        self._output_list_enabled[index] = value
+        self._set_cache_valid(False, 'output_voltage_level', index)
+        self._set_cache_valid(False, 'output_current_limit', index)
+
+    def _output_list_load(self, index, voltage=None, current=None, dwell=None, count=1):
+        """
+        This function writes the list to a program, one auto sequence per step.
+        """
+        index = ivi.get_index(self._output_name, index)
+        voltage, current, dwell = self._output_list_validate(index, voltage, current, dwell, count)
+        if not self._driver_operation_simulate:
+            cmd = ["PROG:SEL %d" % self._output_list_program, "PROG:CLE"]
+            for k in range(len(dwell)):
+                cmd.append("PROG:SEQ:SEL %d" % (k+1))
+                cmd.append("PROG:SEQ:EDIT AUTO,%.2f,%.2f,0,%.3f" % (voltage[k], current[k], dwell[k]))
+            cmd.append("PROG:LINK 0")
+            cmd.append("PROG:COUN %d" % int(count))
+            self._write(';:'.join(cmd))
+        self._output_list_points[index] = len(dwell)
+
@@ -0,0 +1,140 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014-2016 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import io
+import unittest
+
+import numpy as np
+
+import ivi
+from .. import chroma62012p8060
+
+class VirtualChroma62000P(object):
+    "Fake Chroma 62000P recording commands"
+    def __init__(self):
+        self.read_buffer = io.BytesIO()
+        self.write_count = 0
+        self.cmd_log = list()
+        self.voltage = 24.0
+        self.current = 2.5
+
+    def write_raw(self, data):
+        self.write_count += 1
+        resp = list()
+        for cmd in data.decode().split(';'):
+            cmd = cmd.strip().lstrip(':').upper()
+            self.cmd_log.append(cmd)
+            l = cmd.split(' ', 1)
+            if l[0] == '*IDN?':
+                resp.append('Chroma ATE,62012P-80-60,0,1.00')
+            elif l[0] == 'SOUR:VOLT?':
+                resp.append('%.2f' % self.voltage)
+            elif l[0] == 'SOUR:CURR?':
+                resp.append('%.2f' % self.current)
+            elif l[0] == 'FETC:VOLT?':
+                resp.append('%.4f' % (self.voltage - 0.01))
+            elif l[0] == 'FETC:CURR?':
+                resp.append('%.4f' % 1.25)
+        if resp:
+            self.read_buffer = io.BytesIO((';'.join(resp) + '\n').encode())
+
+    def read_raw(self, num=-1):
+        return self.read_buffer.read(num)
+
+    def clear(self):
+        pass
+
+
+class TestChroma62000PList(unittest.TestCase):
+
+    def setUp(self):
+        self.vps = VirtualChroma62000P()
+        self.ps = chroma62012p8060(self.vps)
+
+    def test_load(self):
+        self.vps.write_count = 0
+        self.vps.cmd_log = list()
+        self.ps.outputs[0].list.load([10, 20], None, [0.5, 1], 3)
+        self.assertEqual(self.vps.cmd_log, ['SOUR:CURR?',
+                'PROG:SEL 1', 'PROG:CLE',
+                'PROG:SEQ:SEL 1', 'PROG:SEQ:EDIT AUTO,10.00,2.50,0,0.500',
+                'PROG:SEQ:SEL 2', 'PROG:SEQ:EDIT AUTO,20.00,2.50,0,1.000',
+                'PROG:LINK 0', 'PROG:COUN 3'])
+        # list in a single write after reading back the current limit
+        self.assertEqual(self.vps.write_count, 2)
+        self.assertEqual(self.ps.outputs[0].list.points, 2)
+        self.ps.outputs[0].list.enabled = True
+        self.assertEqual(self.vps.cmd_log[-2:], ['PROG:SEL 1', 'PROG:RUN ON'])
+
+    def test_validation(self):
+        self.vps.write_count = 0
+        # limits of the 80 V model, not the 600 V series default
+        self.assertRaises(ivi.OutOfRangeException, self.ps.outputs[0].list.load, [10, 100], 1, 1)
+        self.assertRaises(ivi.OutOfRangeException, self.ps.outputs[0].list.load, [10, 20], 70, 1)
+        self.assertRaises(ivi.OutOfRangeException, self.ps.outputs[0].list.load, [10, 20], 1, 0.001)
+        # the voltage setter checks the same limit
+        with self.assertRaises(ivi.OutOfRangeException):
+            self.ps.outputs[0].voltage_level = 100
+        self.assertEqual(self.vps.write_count, 0)
+
+class TestChroma62000PConfigure(unittest.TestCase):
+
+    def setUp(self):
+        self.vps = VirtualChroma62000P()
+        self.ps = chroma62012p8060(self.vps)
+
+    def test_configure(self):
+        self.vps.write_count = 0
+        self.vps.cmd_log = list()
+        self.ps.outputs[0].configure(voltage=48, current=10, ovp=52, enabled=True)
+        self.assertEqual(self.vps.write_count, 1)
+        self.assertEqual(self.vps.cmd_log, ['SOUR:VOLT:PROT:HIGH 52.0', 'SOUR:CURR 10.00',
+                'SOUR:VOLT 48.00', 'CONF:OUTP ON'])
+        self.assertEqual(self.ps.outputs[0].voltage_level, 48)
+        self.assertEqual(self.vps.write_count, 1)
+
+    def test_voltage_limit(self):
+        # configure checks the same limit as the voltage setter
+        self.vps.write_count = 0
+        self.assertRaises(ivi.OutOfRangeException, self.ps.outputs[0].configure, voltage=100)
+        self.assertEqual(self.vps.write_count, 0)
+
+class TestChroma62000PMeasurement(unittest.TestCase):
+
+    def setUp(self):
+        self.vps = VirtualChroma62000P()
+        self.ps = chroma62012p8060(self.vps)
+
+    def test_measure_all(self):
+        self.vps.write_count = 0
+        self.vps.cmd_log = list()
+        m = self.ps.measurement.measure_all()
+        self.assertEqual(self.vps.write_count, 1)
+        self.assertEqual(self.vps.cmd_log, ['FETC:VOLT?', 'FETC:CURR?'])
+        np.testing.assert_allclose(m, [[23.99, 1.25]])
+
+if __name__ == '__main__':
+    unittest.main()
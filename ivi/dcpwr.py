@@ -24,6 +24,10 @@ THE SOFTWARE.
 
 """
 
+import time
+
+import numpy as np
+
 from . import ivi
 
 # Parameter Values
@@ -268,6 +272,27 @@ class Base(ivi.IviContainer):
                         Use the Query Output State function to determine if the power supply is in
                         an over-voltage or over-current state.
                         """, cls, grp, '4.3.10'))
+        self._add_method('outputs[].configure',
+                        self._output_configure,
+                        ivi.Doc("""
+                        Configures the voltage level, current limit, OVP limit and output state
+                        of an output in one call. Parameters left as None are not changed.
+                        Drivers send the settings with as few commands as the instrument allows
+                        and update the cached attribute values without reading them back.
+                        """))
+        self._add_method('configure_many',
+                        self._configure_many,
+                        ivi.Doc("""
+                        Configures several outputs in one call. settings is either a list with a
+                        dict of outputs[].configure parameters for each output, or None to skip
+                        an output, or a dict of such dicts keyed by output index or name.
+                        
+                        Example:
+                        
+                        psu.configure_many([dict(voltage=5, current=1, enabled=True),
+                                            None,
+                                            dict(voltage=12, ovp=13)])
+                        """))
         
         self._init_outputs()
     
@@ -419,6 +444,36 @@ class Base(ivi.IviContainer):
     def _output_reset_output_protection(self, index):
         pass
     
+    def _output_voltage_range(self, index):
+        "Return (min, max) voltage level allowed on an output"
+        return tuple(sorted((0, self._output_spec[index]['voltage_max'])))
+    
+    def _output_configure(self, index, voltage=None, current=None, ovp=None, enabled=None):
+        if ovp is not None:
+            self._set_output_ovp_limit(index, ovp)
+        if current is not None:
+            self._set_output_current_limit(index, current)
+        if voltage is not None:
+            self._set_output_voltage_level(index, voltage)
+        if enabled is not None:
+            self._set_output_enabled(index, enabled)
+    
+    def _configure_many_settings(self, settings):
+        "Return list of (index, settings) from a list or dict of settings per output"
+        if isinstance(settings, dict):
+            items = settings.items()
+        else:
+            items = enumerate(settings)
+        res = list()
+        for k, v in items:
+            if v is not None:
+                res.append((ivi.get_index(self._output_name, k), v))
+        return res
+    
+    def _configure_many(self, settings):
+        for index, kwargs in self._configure_many_settings(settings):
+            self._output_configure(index, **kwargs)
+    
     
 class Trigger(ivi.IviContainer):
     "Extension IVI methods for power supplies supporting trigger based output changes"
@@ -617,6 +672,28 @@ class Measurement(ivi.IviContainer):
                         * 'voltage'
                         * 'current'
                         """, cls, grp, '7.2.1'))
+        self._add_method('measurement.measure_all',
+                        self._measurement_measure_all,
+                        ivi.Doc("""
+                        Measures all outputs and returns a numpy array with one row per output
+                        and one column per measurement type. types is a measurement type or a
+                        list of them, by default ('voltage', 'current'). Drivers combine the
+                        measurements into as few transactions as the instrument allows.
+                        """))
+        self._add_method('measurement.sample_loop',
+                        self._measurement_sample_loop,
+                        ivi.Doc("""
+                        Repeatedly measures all outputs with measurement.measure_all. Returns a
+                        generator that yields (timestamp, values) tuples, count times or until
+                        the caller stops iterating if count is None. Samples are taken on a fixed
+                        schedule of interval seconds, or as fast as possible if interval is 0. If
+                        a sample overruns the schedule, the next one is taken immediately.
+                        
+                        Example:
+                        
+                        for t, values in psu.measurement.sample_loop(interval=0.1):
+                            log.write("%f %s\\n" % (t, ' '.join(map(str, values.ravel()))))
+                        """))
     
     def _output_measure(self, index, type):
         index = ivi.get_index(self._output_name, index)
@@ -624,5 +701,43 @@ class Measurement(ivi.IviContainer):
             raise ivi.ValueNotSupportedException()
         return 0
     
-    
-
+    def _measurement_measure_all_types(self, types):
+        if isinstance(types, str):
+            types = [types]
+        types = list(types)
+        for t in types:
+            if t not in MeasurementType:
+                raise ivi.ValueNotSupportedException()
+        return types
+    
+    def _measurement_measure_all(self, types=('voltage', 'current')):
+        types = self._measurement_measure_all_types(types)
+        values = np.zeros((self._output_count, len(types)))
+        for index in range(self._output_count):
+            for k, t in enumerate(types):
+                values[index, k] = self._output_measure(index, t)
+        return values
+    
+    def _measurement_sample_loop(self, types=('voltage', 'current'), count=None, interval=0.0):
+        # check arguments now, not on the first iteration of the generator
+        types = self._measurement_measure_all_types(types)
+        interval = float(interval)
+        if count is not None:
+            count = int(count)
+        if interval < 0 or (count is not None and count < 0):
+            raise ivi.OutOfRangeException()
+        return self._measurement_sample_loop_iter(types, count, interval)
+    
+    def _measurement_sample_loop_iter(self, types, count, interval):
+        n = 0
+        next_time = time.time()
+        while count is None or n < count:
+            t = time.time()
+            if interval > 0:
+                if next_time > t:
+                    time.sleep(next_time - t)
+                    t = time.time()
+                next_time = max(next_time + interval, t)
+            values = self._measurement_measure_all(types)
+            n += 1
+            yield t, values
@@ -28,7 +28,9 @@ __all__ = [
         # Common functions
         "common",
         # Extra base classes
-        "dcpwr"]
+        "dcpwr",
+        "fgen",
+        "scope"]
 
 from . import *
 
@@ -24,8 +24,161 @@ THE SOFTWARE.
 
 """
 
+import struct
+import zlib
+
+import numpy as np
+
 from .. import ivi
 
+# screenshot formats, roughly smallest to largest on the wire
+# lossy formats are never picked automatically
+ScreenshotImageFormatPreference = ['png', 'png24', 'gif', 'bmp8', 'tif', 'tiff', 'bmp', 'bmp24']
+# formats that decode_image can handle
+ScreenshotDecodeFormatPreference = ['png', 'png24', 'bmp', 'bmp24']
+
+def _unpack_index(rows, width, depth):
+    "Split rows of packed 1, 2 or 4 bit values, most significant first"
+    bits = np.unpackbits(rows, axis=1)[:, 0:width*depth].reshape(rows.shape[0], width, depth)
+    return np.dot(bits, 1 << np.arange(depth-1, -1, -1)).astype(np.uint8)
+
+def _png_unfilter(raw, height, stride, bpp):
+    "Undo PNG scanline filtering"
+    raw = np.frombuffer(raw, np.uint8)[:height*(stride+1)].reshape(height, stride+1)
+    ft = raw[:, 0]
+    img = raw[:, 1:].copy()
+
+    if np.all(ft == 0):
+        return img
+
+    prev = np.zeros(stride, np.uint8)
+    for y in range(height):
+        row = img[y]
+        f = ft[y]
+        if f == 1:
+            # sub, running sum per byte position within the pixel
+            row[:] = np.cumsum(row.reshape(-1, bpp), axis=0, dtype=np.uint8).reshape(-1)
+        elif f == 2:
+            # up
+            row += prev
+        elif f == 3 or f == 4:
+            # average and paeth depend on the reconstructed left neighbor
+            r = bytearray(row.tobytes())
+            b = bytearray(prev.tobytes())
+            for x in range(stride):
+                a = r[x-bpp] if x >= bpp else 0
+                if f == 3:
+                    r[x] = (r[x] + ((a + b[x]) >> 1)) & 0xff
+                else:
+                    c = b[x-bpp] if x >= bpp else 0
+                    p = a + b[x] - c
+                    pa = abs(p - a)
+                    pb = abs(p - b[x])
+                    pc = abs(p - c)
+                    if pa <= pb and pa <= pc:
+                        pr = a
+                    elif pb <= pc:
+                        pr = b[x]
+                    else:
+                        pr = c
+                    r[x] = (r[x] + pr) & 0xff
+            row[:] = np.frombuffer(bytes(r), np.uint8)
+        elif f != 0:
+            raise ivi.UnexpectedResponseException()
+        prev = row
+
+    return img
+
+def decode_png(data):
+    "Decode a non-interlaced PNG image to an RGB numpy array"
+    data = bytes(data)
+    if data[0:8] != b'\x89PNG\r\n\x1a\n':
+        raise ivi.UnexpectedResponseException()
+
+    idat = list()
+    palette = None
+    header = None
+    ind = 8
+    while ind + 8 <= len(data):
+        l, tag = struct.unpack('>L4s', data[ind:ind+8])
+        chunk = data[ind+8:ind+8+l]
+        ind += l + 12
+        if tag == b'IHDR' and l == 13:
+            header = struct.unpack('>LLBBBBB', chunk)
+        elif tag == b'PLTE':
+            palette = np.frombuffer(chunk, np.uint8).reshape(-1, 3)
+        elif tag == b'IDAT':
+            idat.append(chunk)
+        elif tag == b'IEND':
+            break
+
+    if header is None:
+        raise ivi.UnexpectedResponseException()
+    width, height, depth, color_type, comp, filt, interlace = header
+
+    if interlace != 0 or depth == 16:
+        raise ivi.ValueNotSupportedException()
+
+    channels = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}[color_type]
+    stride = (width*channels*depth + 7) // 8
+    bpp = max(1, channels*depth // 8)
+
+    img = _png_unfilter(zlib.decompress(b''.join(idat)), height, stride, bpp)
+
+    if depth < 8:
+        img = _unpack_index(img, width, depth)
+        if color_type == 0:
+            img = (img.astype(np.uint16) * 255 // ((1 << depth) - 1)).astype(np.uint8)
+        img = img.reshape(height, width, 1)
+    else:
+        img = img.reshape(height, width, channels)
+
+    if color_type == 3:
+        return palette[img[:, :, 0]]
+    if color_type in (0, 4):
+        return np.repeat(img[:, :, 0:1], 3, axis=2)
+    return np.ascontiguousarray(img[:, :, 0:3])
+
+def decode_bmp(data):
+    "Decode an uncompressed BMP image to an RGB numpy array"
+    data = bytes(data)
+    if data[0:2] != b'BM':
+        raise ivi.UnexpectedResponseException()
+
+    offset = struct.unpack('<L', data[10:14])[0]
+    hsize, width, height, planes, bpp, comp = struct.unpack('<LllHHL', data[14:34])
+
+    if comp not in (0, 3):
+        raise ivi.ValueNotSupportedException()
+
+    top_down = height < 0
+    height = abs(height)
+    stride = ((bpp*width + 31) // 32) * 4
+
+    rows = np.frombuffer(data, np.uint8, stride*height, offset).reshape(height, stride)
+    if not top_down:
+        rows = rows[::-1]
+
+    if bpp <= 8:
+        colors = struct.unpack('<L', data[46:50])[0] or (1 << bpp)
+        palette = np.frombuffer(data, np.uint8, colors*4, 14+hsize).reshape(-1, 4)[:, 2::-1]
+        if bpp < 8:
+            ind = _unpack_index(rows, width, bpp)
+        else:
+            ind = rows[:, 0:width]
+        return palette[ind]
+
+    n = bpp // 8
+    return np.ascontiguousarray(rows[:, 0:width*n].reshape(height, width, n)[:, :, 2::-1])
+
+def decode_image(data):
+    "Decode a PNG or BMP image to an RGB numpy array"
+    if data[0:8] == b'\x89PNG\r\n\x1a\n':
+        return decode_png(data)
+    if data[0:2] == b'BM':
+        return decode_bmp(data)
+    raise ivi.UnexpectedResponseException()
+
 class SerialNumber(ivi.IviContainer):
     "Extension IVI methods for instruments that can report a serial number"
 
@@ -159,9 +312,59 @@ class Screenshot(ivi.IviContainer):
                         Captures the screen and transfers it in the specified format.
                         The display graticule is optionally inverted.
                         """))
+        self._add_method('display.fetch_screenshot_to',
+                        self._display_fetch_screenshot_to,
+                        ivi.Doc("""
+                        Captures the screen and writes it to a file, given either as a path
+                        or as a file object opened in binary mode. Where the instrument
+                        returns the image as an IEEE block, the data is streamed to the file
+                        as it arrives instead of being held in memory.
+                        
+                        With format set to 'auto', the smallest lossless format supported by
+                        the instrument is used. Returns the name of the format used.
+                        """))
+        self._add_method('display.fetch_screenshot_array',
+                        self._display_fetch_screenshot_array,
+                        ivi.Doc("""
+                        Captures the screen and returns it as a numpy array of RGB values with
+                        shape (height, width, 3). With format set to 'auto', the smallest
+                        format that can be decoded (PNG or BMP) is requested.
+                        """))
     
     def _display_fetch_screenshot(self, format='png', invert=False):
         return b''
     
+    def _display_select_screenshot_format(self, format='auto', preference=None):
+        if format != 'auto':
+            return format
+        if preference is None:
+            preference = ScreenshotImageFormatPreference
+        mapping = getattr(self, '_display_screenshot_image_format_mapping', None)
+        if not mapping:
+            return 'png'
+        for f in preference:
+            if f in mapping:
+                return f
+        raise ivi.ValueNotSupportedException()
+    
+    def _display_write_screenshot(self, f, format='png', invert=False):
+        f.write(self._display_fetch_screenshot(format, invert))
+    
+    def _display_fetch_screenshot_to(self, destination, format='auto', invert=False):
+        format = self._display_select_screenshot_format(format)
+        if hasattr(destination, 'write'):
+            self._display_write_screenshot(destination, format, invert)
+        else:
+            with open(destination, 'wb') as f:
+                self._display_write_screenshot(f, format, invert)
+        return format
+    
+    def _display_fetch_screenshot_array(self, format='auto', invert=False):
+        format = self._display_select_screenshot_format(format, ScreenshotDecodeFormatPreference)
+        data = self._display_fetch_screenshot(format, invert)
+        if len(data) == 0:
+            return np.zeros((0, 0, 3), np.uint8)
+        return decode_image(data)
+    
     
 
@@ -24,6 +24,8 @@ THE SOFTWARE.
 
 """
 
+import numpy as np
+
 from .. import ivi
 
 class OCP(ivi.IviContainer):
@@ -115,4 +117,113 @@ class OCP(ivi.IviContainer):
         pass
     
     
-
+class List(ivi.IviContainer):
+    "Extension IVI methods for power supplies supporting hardware voltage and current lists"
+    
+    def __init__(self, *args, **kwargs):
+        super(List, self).__init__(*args, **kwargs)
+        
+        self._output_list_enabled = list()
+        self._output_list_points = list()
+        self._output_list_max_points = 100
+        self._output_list_dwell_min = 0.01
+        self._output_list_dwell_max = 3600.0
+        self._output_list_count_max = 9999
+        
+        self._add_property('outputs[].list.enabled',
+                        self._get_output_list_enabled,
+                        self._set_output_list_enabled,
+                        None,
+                        ivi.Doc("""
+                        Specifies whether the output steps through the loaded list. When the list
+                        is enabled, the instrument steps through the voltage and current levels on
+                        its own, holding each for its dwell time, so the step timing does not
+                        depend on the I/O. Depending on the instrument, the list starts
+                        immediately or on the next trigger after trigger.initiate.
+                        """))
+        self._add_property('outputs[].list.points',
+                        self._get_output_list_points,
+                        None,
+                        None,
+                        ivi.Doc("""
+                        Returns the number of steps in the loaded list.
+                        """))
+        self._add_method('outputs[].list.load',
+                        self._output_list_load,
+                        ivi.Doc("""
+                        Loads a list of voltage levels, current limits and dwell times into the
+                        instrument in a single transfer. Any of voltage, current and dwell can be
+                        a single value, which is used for every step; voltage or current can also
+                        be None to keep the present level. count is the number of times the list
+                        is repeated.
+                        
+                        All values are checked against the output ranges before anything is sent
+                        to the instrument. The list is not started until list.enabled is set.
+                        """))
+        
+        # no _init_outputs call here, this runs before the base class sets up
+        # _output_spec; the list state is set up by the _init_outputs chain
+    
+    def _init_outputs(self):
+        try:
+            super(List, self)._init_outputs()
+        except AttributeError:
+            pass
+        
+        self._output_list_enabled = list()
+        self._output_list_points = list()
+        for i in range(self._output_count):
+            self._output_list_enabled.append(False)
+            self._output_list_points.append(0)
+    
+    def _get_output_list_enabled(self, index):
+        index = ivi.get_index(self._output_name, index)
+        return self._output_list_enabled[index]
+    
+    def _set_output_list_enabled(self, index, value):
+        index = ivi.get_index(self._output_name, index)
+        value = bool(value)
+        self._output_list_enabled[index] = value
+    
+    def _get_output_list_points(self, index):
+        index = ivi.get_index(self._output_name, index)
+        return self._output_list_points[index]
+    
+    def _output_list_validate(self, index, voltage, current, dwell, count):
+        "Check list against output spec, return voltage, current and dwell arrays of equal length"
+        spec = self._output_spec[index]
+        lists = [None if l is None else np.atleast_1d(np.asarray(l, dtype=float)) for l in (voltage, current, dwell)]
+        if lists[2] is None:
+            raise ivi.ValueNotSupportedException()
+        
+        n = max(len(l) for l in lists if l is not None)
+        for l in lists:
+            if l is not None and (len(l.shape) != 1 or len(l) not in (1, n)):
+                raise ivi.ValueNotSupportedException()
+        if n < 1 or n > self._output_list_max_points:
+            raise ivi.OutOfRangeException()
+        
+        voltage, current, dwell = lists
+        # read back present levels, the cache may not hold them yet
+        if voltage is None:
+            voltage = np.array([self._get_output_voltage_level(index)])
+        if current is None:
+            current = np.array([self._get_output_current_limit(index)])
+        
+        vmin, vmax = self._output_voltage_range(index)
+        if voltage.min() < vmin or voltage.max() > vmax:
+            raise ivi.OutOfRangeException()
+        if current.min() < 0 or current.max() > spec['current_max']:
+            raise ivi.OutOfRangeException()
+        if dwell.min() < self._output_list_dwell_min or dwell.max() > self._output_list_dwell_max:
+            raise ivi.OutOfRangeException()
+        count = int(count)
+        if count < 1 or count > self._output_list_count_max:
+            raise ivi.OutOfRangeException()
+        
+        return np.broadcast_to(voltage, (n,)), np.broadcast_to(current, (n,)), np.broadcast_to(dwell, (n,))
+    
+    def _output_list_load(self, index, voltage=None, current=None, dwell=None, count=1):
+        index = ivi.get_index(self._output_name, index)
+        voltage, current, dwell = self._output_list_validate(index, voltage, current, dwell, count)
+        self._output_list_points[index] = len(dwell)
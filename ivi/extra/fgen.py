@@ -0,0 +1,126 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014-2016 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import hashlib
+from collections import OrderedDict
+
+from .. import ivi
+
+class ArbitraryWaveformCache(ivi.IviContainer):
+    "Extension IVI methods for generators that keep uploaded waveforms in a host side cache"
+    
+    def __init__(self, *args, **kwargs):
+        super(ArbitraryWaveformCache, self).__init__(*args, **kwargs)
+        
+        # content key -> (handle, size), least recently used first
+        self._arbitrary_waveform_cache = OrderedDict()
+        self._arbitrary_waveform_cache_enabled = True
+        # instrument waveform memory in samples, 0 for no limit
+        self._arbitrary_waveform_memory_size = 0
+        
+        self._add_property('arbitrary.waveform.cache_enabled',
+                        self._get_arbitrary_waveform_cache_enabled,
+                        self._set_arbitrary_waveform_cache_enabled,
+                        None,
+                        ivi.Doc("""
+                        Specifies whether arbitrary.waveform.create reuses waveforms already
+                        uploaded by the driver. Waveforms are identified by a hash of the encoded
+                        samples and format parameters, so creating an identical waveform returns
+                        the existing handle without a transfer. When instrument memory runs out,
+                        the least recently used cached waveforms are cleared to make room.
+                        """))
+        self._add_method('arbitrary.waveform.clear_cache',
+                        self._arbitrary_waveform_clear_cache,
+                        ivi.Doc("""
+                        Forgets all cached waveforms. The waveforms are not removed from the
+                        instrument.
+                        """))
+    
+    def _get_arbitrary_waveform_cache_enabled(self):
+        return self._arbitrary_waveform_cache_enabled
+    
+    def _set_arbitrary_waveform_cache_enabled(self, value):
+        value = bool(value)
+        self._arbitrary_waveform_cache_enabled = value
+    
+    def _arbitrary_waveform_clear_cache(self):
+        self._arbitrary_waveform_cache = OrderedDict()
+    
+    def _arbitrary_waveform_cache_key(self, data, *params):
+        h = hashlib.sha1(repr(params).encode('utf-8'))
+        h.update(data)
+        return h.hexdigest()
+    
+    def _arbitrary_waveform_cache_lookup(self, key):
+        "Return handle of a cached waveform and mark it as recently used"
+        if not self._arbitrary_waveform_cache_enabled or key not in self._arbitrary_waveform_cache:
+            return None
+        handle, size = self._arbitrary_waveform_cache.pop(key)
+        if not self._arbitrary_waveform_exists(handle):
+            return None
+        self._arbitrary_waveform_cache[key] = (handle, size)
+        return handle
+    
+    def _arbitrary_waveform_cache_store(self, key, handle, size):
+        if self._arbitrary_waveform_cache_enabled:
+            self._arbitrary_waveform_cache[key] = (handle, size)
+    
+    def _arbitrary_waveform_cache_forget(self, handle):
+        for key in [k for k, v in self._arbitrary_waveform_cache.items() if v[0] == handle]:
+            del self._arbitrary_waveform_cache[key]
+    
+    def _arbitrary_waveform_cache_reserve(self, size):
+        "Clear least recently used cached waveforms until size samples and one more waveform fit"
+        in_use = self._arbitrary_waveform_in_use()
+        while True:
+            used = self._arbitrary_waveform_memory_used()
+            count = len(self._arbitrary_waveform_handles())
+            if ((self._arbitrary_waveform_memory_size == 0 or used + size <= self._arbitrary_waveform_memory_size) and
+                    (self._arbitrary_waveform_number_waveforms_max == 0 or count < self._arbitrary_waveform_number_waveforms_max)):
+                return
+            victim = None
+            for key, (handle, s) in self._arbitrary_waveform_cache.items():
+                if handle not in in_use:
+                    victim = handle
+                    break
+            if victim is None:
+                raise ivi.OutOfRangeException()
+            self._arbitrary_waveform_clear(victim)
+            self._arbitrary_waveform_cache_forget(victim)
+    
+    def _arbitrary_waveform_in_use(self):
+        return set(getattr(self, '_output_arbitrary_waveform', []))
+    
+    def _arbitrary_waveform_exists(self, handle):
+        return handle in self._arbitrary_waveform_handles()
+    
+    def _arbitrary_waveform_handles(self):
+        return [v[0] for v in self._arbitrary_waveform_cache.values()]
+    
+    def _arbitrary_waveform_memory_used(self):
+        return sum(v[1] for v in self._arbitrary_waveform_cache.values())
+    
+    
@@ -0,0 +1,221 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014-2016 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import numpy as np
+
+from .. import ivi
+from .. import scope
+
+class WaveformPreambleCache(ivi.IviContainer):
+    "Extension IVI methods for oscilloscopes that cache the waveform preamble"
+
+    def __init__(self, *args, **kwargs):
+        self._measurement_waveform_preamble = dict()
+        self._measurement_preamble_cache_hits = 0
+        self._measurement_preamble_cache_misses = 0
+
+        # cache tags of the settings that change the waveform preamble
+        self._measurement_preamble_dependencies = ('acquisition', 'channel', 'timebase')
+
+        super(WaveformPreambleCache, self).__init__(*args, **kwargs)
+
+        self._add_property('measurement.preamble_cache_hits',
+                        self._get_measurement_preamble_cache_hits,
+                        None,
+                        None,
+                        ivi.Doc("""
+                        Returns the number of waveform fetches that reused a cached waveform
+                        preamble instead of querying the instrument.
+                        """))
+        self._add_property('measurement.preamble_cache_misses',
+                        self._get_measurement_preamble_cache_misses,
+                        None,
+                        None,
+                        ivi.Doc("""
+                        Returns the number of waveform fetches that queried the waveform
+                        preamble from the instrument.
+
+                        The cached preamble is discarded whenever a timebase, channel or
+                        acquisition setting is changed through the driver, when all attributes
+                        are invalidated, and is not used when the driver cache is disabled.
+                        """))
+
+    def _get_measurement_preamble_cache_hits(self):
+        return self._measurement_preamble_cache_hits
+
+    def _get_measurement_preamble_cache_misses(self):
+        return self._measurement_preamble_cache_misses
+
+    def _set_cache_valid(self, valid=True, tag=None, index=-1):
+        tag = self._get_cache_tag(tag, 2)
+        if tag.startswith(self._measurement_preamble_dependencies):
+            self._measurement_waveform_preamble = dict()
+        super(WaveformPreambleCache, self)._set_cache_valid(valid, tag, index)
+
+    def _driver_operation_invalidate_all_attributes(self):
+        super(WaveformPreambleCache, self)._driver_operation_invalidate_all_attributes()
+        self._measurement_waveform_preamble = dict()
+
+    def _ask_for_waveform_preamble(self, key, query, delim=','):
+        "Return split waveform preamble, only querying the instrument on a cache miss"
+        if self._driver_operation_cache and key in self._measurement_waveform_preamble:
+            self._measurement_preamble_cache_hits += 1
+            return self._measurement_waveform_preamble[key]
+        self._measurement_preamble_cache_misses += 1
+        pre = self._ask(query).split(delim)
+        self._measurement_waveform_preamble[key] = pre
+        return pre
+
+class WaveformConversion(ivi.IviContainer):
+    "Extension IVI methods for oscilloscopes that convert waveform data while it is transferred"
+
+    def __init__(self, *args, **kwargs):
+        self._measurement_waveform_dtype = None
+        self._measurement_waveform_chunk_size = 1048576
+
+        super(WaveformConversion, self).__init__(*args, **kwargs)
+
+        self._add_property('measurement.waveform_dtype',
+                        self._get_measurement_waveform_dtype,
+                        self._set_measurement_waveform_dtype,
+                        None,
+                        ivi.Doc("""
+                        Selects how fetched waveform data is stored in the returned trace.
+
+                        When None (the default), the trace holds the raw sample codes from the
+                        instrument and y values are computed from them on access.  When set to
+                        'float32' or 'float64', the waveform data block is read in chunks and each
+                        chunk is scaled to volts into a preallocated array of that type while the
+                        rest of the block is still being transferred.  This hides the conversion
+                        time behind the transfer and avoids holding the raw block, the raw codes
+                        and the converted values in memory at the same time, which matters for
+                        deep records.  Holes in the record are stored as NaN.
+                        """))
+
+    def _get_measurement_waveform_dtype(self):
+        return self._measurement_waveform_dtype
+
+    def _set_measurement_waveform_dtype(self, value):
+        if value is not None:
+            value = str(value)
+            if value not in ('float32', 'float64'):
+                raise ivi.ValueNotSupportedException()
+        self._measurement_waveform_dtype = value
+
+    def _read_waveform_block_converted(self, trace, dtype, count=None):
+        "Read waveform IEEE block into trace, scaling to measurement_waveform_dtype during the transfer"
+        y = self._read_ieee_block_array(dtype, trace.y_increment, trace.y_reference, trace.y_origin,
+                trace.y_hole, self._measurement_waveform_dtype, self._measurement_waveform_chunk_size)
+        if count is not None:
+            y = y[:count]
+        trace.y_raw = y
+        trace.y_increment = 1
+        trace.y_reference = 0
+        trace.y_origin = 0
+        trace.y_hole = None
+        return trace
+
+class WaveformMeasurementBatch(ivi.IviContainer):
+    "Extension IVI methods for oscilloscopes that fetch several waveform measurements at once"
+
+    def __init__(self, *args, **kwargs):
+        # maximum number of measurement queries chained in one message
+        self._measurement_batch_size = 16
+
+        super(WaveformMeasurementBatch, self).__init__(*args, **kwargs)
+
+        self._add_method('measurement.fetch_waveform_measurements',
+                        self._measurement_fetch_waveform_measurements,
+                        ivi.Doc("""
+                        Fetches a list of waveform measurements from the last acquisition with
+                        as few instrument transactions as the instrument allows.  Each entry of
+                        measurement_list is a tuple (channel, measurement_function) or
+                        (channel, measurement_function, reference_channel); channels may be
+                        given by name or index.  The measurement functions are the same as for
+                        the Fetch Waveform Measurement function.
+
+                        Returns a numpy record array with the fields channel, function,
+                        reference and value, one record per entry, in the order requested.
+                        Measurements that could not be made are returned as reported by the
+                        instrument.
+                        """))
+
+        self._add_method('measurement.compute_waveform_measurements',
+                        self._measurement_compute_waveform_measurements,
+                        ivi.Doc("""
+                        Computes waveform measurements on the host from previously fetched
+                        waveforms, without querying the instrument.  trace is a waveform as
+                        returned by Fetch Waveform, or a list of waveforms of equal length, which
+                        are measured together.  The reference levels configured in the driver are
+                        used for the edge measurements.  measurement_functions is a list of
+                        measurement functions, as for Fetch Waveform Measurement; all of them are
+                        computed when it is omitted.
+
+                        Returns a dict mapping each measurement function to its value, or to a
+                        numpy array with one value per waveform when a list is passed.
+                        Measurements that cannot be made are NaN.
+                        """))
+
+    def _measurement_compute_waveform_measurements(self, trace, measurement_functions=None):
+        return scope.measure_trace(trace, measurement_functions,
+                        self._reference_level_low, self._reference_level_middle,
+                        self._reference_level_high)
+
+    def _measurement_fetch_waveform_measurements(self, measurement_list):
+        measurement_list = [self._measurement_normalize_batch_entry(m) for m in measurement_list]
+        values = self._measurement_fetch_waveform_measurement_list(measurement_list)
+        return np.rec.fromrecords([(self._channel_name[index], func, ref or '', value)
+                        for (index, func, ref), value in zip(measurement_list, values)],
+                        names='channel,function,reference,value')
+
+    def _measurement_normalize_batch_entry(self, entry):
+        entry = tuple(entry)
+        if len(entry) == 2:
+            entry += (None,)
+        if len(entry) != 3:
+            raise ivi.ValueNotSupportedException()
+        index, func, ref = entry
+        index = ivi.get_index(self._channel_name, index)
+        if ref is not None:
+            if hasattr(ref, 'name'):
+                ref = ref.name
+            ref = self._channel_name[ivi.get_index(self._channel_name, ref)]
+        return (index, func, ref)
+
+    def _measurement_fetch_waveform_measurement_list(self, measurement_list):
+        "Fetch measurements by chaining the individual measurement queries"
+        queries = [self._measurement_waveform_measurement_query(index, func, ref)
+                        for index, func, ref in measurement_list]
+        if self._driver_operation_simulate:
+            return [0.0]*len(queries)
+        values = list()
+        for k in range(0, len(queries), self._measurement_batch_size):
+            group = queries[k:k+self._measurement_batch_size]
+            resp = self._ask(';'.join(group)).split(';')
+            if len(resp) != len(group):
+                raise ivi.UnexpectedResponseException()
+            values.extend(float(v) for v in resp)
+        return values
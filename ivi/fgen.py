@@ -24,6 +24,8 @@ THE SOFTWARE.
 
 """
 
+import numpy as np
+
 from . import ivi
 
 # Exceptions
@@ -44,6 +46,108 @@ FMSource = set(['internal', 'external'])
 BinaryAlignment = set(['left', 'right'])
 TerminalConfiguration = set(['single_ended', 'differential'])
 TriggerSlope = set(['positive', 'negative', 'either'])
+WaveformEncoding = set(['offset', 'twos_complement', 'float'])
+WaveformByteOrder = set(['big', 'little'])
+
+_waveform_chunk_size = 65536
+
+def get_waveform(data):
+    "Parse arbitrary waveform input into x and y components, x is None if not specified"
+    # arrays, memmaps and memoryviews are returned as views, not copies
+    if isinstance(data, memoryview):
+        data = np.asarray(data)
+    if isinstance(data, np.ndarray):
+        data = np.asarray(data)
+        if len(data.shape) == 1:
+            # 1D array
+            return None, data
+        elif len(data.shape) == 2 and data.shape[0] == 1:
+            # 2D array, hieght 1
+            return None, data[0]
+        elif len(data.shape) == 2 and data.shape[1] == 1:
+            # 2D array, width 1
+            return None, data[:,0]
+    elif type(data) == list and len(data) > 0 and type(data[0]) != tuple:
+        # list
+        return None, np.array(data, dtype=float)
+    elif hasattr(data, '__next__') or hasattr(data, 'next'):
+        # iterator
+        return None, np.fromiter(data, dtype=float)
+    return ivi.get_sig(data)
+
+def get_waveform_dtype(bits=16, encoding='offset', byteorder='big'):
+    "Return numpy dtype of encoded waveform samples"
+    if encoding not in WaveformEncoding or byteorder not in WaveformByteOrder:
+        raise ivi.ValueNotSupportedException()
+    order = '>' if byteorder == 'big' else '<'
+    if encoding == 'float':
+        return np.dtype(order+'f4')
+    if not 2 <= bits <= 16:
+        raise ivi.ValueNotSupportedException()
+    return np.dtype(order+('u2' if encoding == 'offset' else 'i2'))
+
+def encode_waveform(y, bits=16, encoding='offset', byteorder='big', full_scale=None, out=None):
+    """Clip samples to [-1, 1] and encode them as DAC codes
+
+    Offset binary maps -1 to 0 and 1 to full_scale, which defaults to the
+    largest code.  Two's complement maps 1 to full_scale, by default the
+    largest positive code, and float stores 32 bit floats times full_scale,
+    by default 1.  Samples are processed in fixed size chunks, so memmaps are
+    never read into memory at once.  out is an optional writable buffer
+    (bytearray, memoryview or array) that receives the codes.  Returns an
+    array of the codes.
+    """
+    dtype = get_waveform_dtype(bits, encoding, byteorder)
+    y = np.asarray(y)
+    n = len(y)
+    
+    if encoding == 'float':
+        scale, offset = 1.0 if full_scale is None else full_scale, 0
+    elif encoding == 'offset':
+        full_scale = (1 << bits) - 1 if full_scale is None else full_scale
+        scale, offset = full_scale / 2.0, full_scale / 2.0
+    else:
+        full_scale = (1 << (bits-1)) - 1 if full_scale is None else full_scale
+        scale, offset = full_scale, 0
+    
+    if out is None:
+        out = np.empty(n, dtype)
+    else:
+        out = np.frombuffer(out, dtype, n)
+    
+    tmp = np.empty(min(n, _waveform_chunk_size))
+    for k in range(0, n, _waveform_chunk_size):
+        t = tmp[:min(n-k, _waveform_chunk_size)]
+        np.clip(y[k:k+len(t)], -1, 1, out=t)
+        if scale != 1:
+            t *= scale
+        if offset:
+            t += offset
+        if encoding != 'float':
+            np.rint(t, out=t)
+        out[k:k+len(t)] = t
+    
+    return out
+
+def build_waveform_block(y, prefix=None, **kwargs):
+    """Encode samples straight into an IEEE block, preceded by prefix
+
+    Keyword arguments are passed to encode_waveform.  Returns a bytearray
+    ready for _write_raw.
+    """
+    dtype = get_waveform_dtype(kwargs.get('bits', 16), kwargs.get('encoding', 'offset'),
+                kwargs.get('byteorder', 'big'))
+    if prefix is None:
+        prefix = b''
+    elif type(prefix) == str:
+        prefix = prefix.encode('utf-8')
+    size = len(y) * dtype.itemsize
+    head = prefix + str('#8%08d' % size).encode('utf-8')
+    block = bytearray(len(head) + size)
+    block[:len(head)] = head
+    encode_waveform(y, out=memoryview(block)[len(head):], **kwargs)
+    return block
+
 
 
 class Base(ivi.IviContainer):
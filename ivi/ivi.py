@@ -28,8 +28,15 @@ THE SOFTWARE.
 import inspect
 import numpy as np
 import re
+import threading
+import time
 from functools import partial
 
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
 # try importing drivers
 # python-vxi11 for LAN instruments
 try:
@@ -422,13 +429,111 @@ class TraceY(object):
         self.y_hole = None
 
     @property
-    def y(self):
-        y = np.array(self.y_raw)
+    def y_raw(self):
+        return self._y_raw
+
+    @y_raw.setter
+    def y_raw(self, value):
+        self._y_raw = value
+        self._decimation_cache = dict()
+
+    def _scale_raw(self, y):
         yf = y.astype(float)
         if self.y_hole is not None:
             yf[y == self.y_hole] = float('nan')
         return ((yf - self.y_reference) * self.y_increment) + self.y_origin
 
+    def _x_index(self, index):
+        return index
+
+    def _decimate_min_max(self, points):
+        y = np.asarray(self.y_raw)
+        start = np.linspace(0, len(y), points, endpoint=False).astype(np.intp)
+        return start, np.minimum.reduceat(y, start), np.maximum.reduceat(y, start)
+
+    def _decimate_lttb(self, points):
+        # all buckets are evaluated at once on a (bucket, sample) array;
+        # the anchor of each bucket is the point selected in the previous
+        # bucket by a first pass anchored on the bucket averages
+        y = np.asarray(self.y_raw)
+        n = len(y)
+        edges = np.linspace(1, n - 1, points - 1).astype(np.intp)
+        bounds = np.append(edges, n)
+        count = np.diff(bounds)
+        cx = (bounds[:-1] + bounds[1:] - 1) / 2.0
+        cy = np.add.reduceat(y, edges, dtype=float) / count
+        # buckets differ in length by at most one sample, so only the last
+        # column can run into the next bucket
+        b = edges[:-1, None] + np.arange(count[:-1].max())
+        short = b[:, -1] >= bounds[1:-1]
+        b[short, -1] -= 1
+        yb = y[b]
+        bx = b.astype(float)
+
+        def select(ax, ay):
+            # point of each bucket with the largest triangle formed with
+            # the anchor and the average of the next bucket
+            dx = ax - cx[1:]
+            dy = cy[1:] - ay
+            area = yb * dx[:, None]
+            area += bx * dy[:, None]
+            area += (-dx * ay - ax * dy)[:, None]
+            np.abs(area, out=area)
+            return b[np.arange(len(b)), area.argmax(axis=1)]
+
+        a = select(np.append(0.0, cx[:-2]), np.append(float(y[0]), cy[:-2]))
+        a = np.append(0, a[:-1])
+        a = select(a.astype(float), y[a].astype(float))
+        index = np.concatenate(([0], a, [n - 1]))
+        return index, y[index]
+
+    def decimate(self, points, method='min_max'):
+        """Return a reduced view of the trace for display or storage
+
+        The reduction is done on the raw sample codes, so the full floating
+        point arrays are never built.  Results are cached per target size and
+        discarded when y_raw is replaced.
+
+        method 'min_max' splits the record into points buckets and returns
+        (x, y_min, y_max) with the x position of the start of each bucket and
+        the extremes within it.  method 'lttb' selects points samples with the
+        largest-triangle-three-buckets algorithm and returns (x, y); the
+        buckets are evaluated together, each anchored on the point a first
+        pass selects in the previous bucket, rather than one after the other.
+        For a TraceY, x is the sample index.
+        """
+        points = int(points)
+        n = len(self.y_raw)
+        if method not in ('min_max', 'lttb'):
+            raise ValueNotSupportedException()
+        if points < (3 if method == 'lttb' else 1):
+            raise OutOfRangeException()
+        key = (method, min(points, n))
+        if key not in self._decimation_cache:
+            if points >= n:
+                r = np.arange(n), np.asarray(self.y_raw)
+                if method == 'min_max':
+                    r = r + (r[1],)
+            elif method == 'min_max':
+                r = self._decimate_min_max(points)
+            else:
+                r = self._decimate_lttb(points)
+            self._decimation_cache[key] = r
+        r = self._decimation_cache[key]
+        y = [self._scale_raw(v) for v in r[1:]]
+        if method == 'min_max' and self.y_increment < 0:
+            y.reverse()
+        return (self._x_index(r[0]),) + tuple(y)
+
+    @property
+    def y(self):
+        y = np.asarray(self.y_raw)
+        if (y.dtype.kind == 'f' and self.y_hole is None and self.y_increment == 1 and
+                self.y_reference == 0 and self.y_origin == 0):
+            # already converted
+            return y
+        return self._scale_raw(y)
+
     def __getitem__(self, index):
         y = self.y_raw[index]
         if y == self.y_hole:
@@ -455,12 +560,43 @@ class TraceYT(TraceY):
 
     @property
     def x(self):
-        return ((np.arange(len(self.y_raw)) - self.x_reference) * self.x_increment) + self.x_origin
+        return self._x_index(np.arange(len(self.y_raw)))
+
+    def _x_index(self, index):
+        return ((index - self.x_reference) * self.x_increment) + self.x_origin
 
     @property
     def t(self):
         return self.x
 
+    def spectrum(self, window='hann', units='dBm', impedance=50.0):
+        """Calculate the single sided spectrum of the trace
+
+        The FFT is taken on the raw sample codes and scaled with y_increment
+        afterwards, y_origin is added as the cached spectrum of the window.  See
+        ivi.spectrum for the window and units options.
+
+        Returns a TraceYT with the frequency axis as x.
+        """
+        y = np.asarray(self.y_raw)
+        gain = self.y_increment
+        offset = self.y_origin
+        if (self.y_hole is not None and np.any(y == self.y_hole)) or gain == 0:
+            y = np.nan_to_num(self.y)
+            gain = 1.0
+            offset = 0.0
+        elif y.dtype.kind == 'f':
+            y = y - self.y_reference
+        else:
+            y = y.astype(float) - self.y_reference
+        s = _spectrum_bins(y, window, y.dtype, gain, offset)
+
+        trace = TraceYT()
+        trace.y_increment = 1
+        trace.y_raw = _spectrum_units(s, units, impedance)
+        trace.x_increment = 1.0 / (len(y) * self.x_increment)
+        return trace
+
     def __getitem__(self, index):
         y = self.y_raw[index]
         if y == self.y_hole:
@@ -503,6 +639,7 @@ def decode_ieee_block(data):
     # where l is length of n and n is the
     # length of the data
     # ex: #800002000 prefixes 2000 data bytes
+    # pass a memoryview to get the data without a copy
     if len(data) == 0:
         return b''
     
@@ -512,11 +649,11 @@ def decode_ieee_block(data):
         ind += 1
     
     ind += 1
-    l = int(data[ind:ind+1])
+    l = int(bytes(data[ind:ind+1]))
     ind += 1
     
     if (l > 0):
-        num = int(data[ind:ind+l].decode('utf-8'))
+        num = int(bytes(data[ind:ind+l]).decode('utf-8'))
         ind += l
         
         return data[ind:ind+num]
@@ -524,6 +661,51 @@ def decode_ieee_block(data):
         return data[ind:]
 
 
+def iter_threaded(iterable, maxsize = 2):
+    "Iterate in a background thread, keeping at most maxsize items queued"
+    # Close the returned generator when stopping early, or when the loop
+    # over it raises, to stop the thread; the thread never blocks on a
+    # full queue once the consumer is gone.
+    q = queue.Queue(maxsize)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout = 0.05)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def producer():
+        try:
+            for item in iterable:
+                if not put((False, item)):
+                    return
+            put((True, None))
+        except Exception as e:
+            put((True, e))
+
+    def consumer(t):
+        try:
+            while True:
+                done, item = q.get()
+                if done:
+                    if item is not None:
+                        raise item
+                    return
+                yield item
+        finally:
+            stop.set()
+            t.join()
+
+    t = threading.Thread(target=producer)
+    t.daemon = True
+    t.start()
+    return consumer(t)
+
+
 def get_sig(sig):
     "Parse various signal inputs into x and y components"
     if type(sig) == tuple and len(sig) == 2:
@@ -558,6 +740,110 @@ def rms(y):
     return np.linalg.norm(y) / np.sqrt(y.size)
 
 
+# cosine sum coefficients of periodic spectral windows
+SpectrumWindows = {
+        'rectangular': [1.0],
+        'hann': [0.5, 0.5],
+        'hamming': [0.54, 0.46],
+        'blackman': [0.42, 0.5, 0.08],
+        'blackman_harris': [0.35875, 0.48829, 0.14128, 0.01168],
+        'flattop': [0.21557895, 0.41663158, 0.277263158, 0.083578947, 0.006947368]}
+SpectrumUnits = set(['dBm', 'dBV', 'V', 'W'])
+
+_spectrum_window_cache = dict()
+_spectrum_frequency_cache = dict()
+_spectrum_cache_size = 32
+
+def _spectrum_window(n, window, dtype):
+    "Window table and scale for converting rfft bins to RMS amplitude, cached per length and dtype"
+    key = (n, window, np.dtype(dtype).str)
+    if key not in _spectrum_window_cache:
+        if window not in SpectrumWindows:
+            raise ValueNotSupportedException()
+        if len(_spectrum_window_cache) >= _spectrum_cache_size:
+            _spectrum_window_cache.clear()
+        a = SpectrumWindows[window]
+        phase = 2 * np.pi * np.arange(n) / n
+        w = np.zeros(n)
+        for k, c in enumerate(a):
+            w += (-1)**k * c * np.cos(k * phase)
+        # single sided RMS amplitude: DC and Nyquist bins are not doubled
+        scale = np.full(n // 2 + 1, np.sqrt(2) / w.sum())
+        scale[0] = 1 / w.sum()
+        if n % 2 == 0:
+            scale[-1] = 1 / w.sum()
+        _spectrum_window_cache[key] = (w.astype(dtype), scale, np.fft.rfft(w))
+    return _spectrum_window_cache[key]
+
+def _spectrum_frequency(n, x_increment):
+    "Frequency axis of an rfft, cached per length and sample interval"
+    key = (n, x_increment)
+    if key not in _spectrum_frequency_cache:
+        if len(_spectrum_frequency_cache) >= _spectrum_cache_size:
+            _spectrum_frequency_cache.clear()
+        f = np.fft.rfftfreq(n, x_increment)
+        f.flags.writeable = False
+        _spectrum_frequency_cache[key] = f
+    return _spectrum_frequency_cache[key]
+
+def _spectrum_bins(y, window, dtype, gain=1.0, offset=0.0):
+    "RMS amplitude of each rfft bin of y along the last axis"
+    # the spectrum of gain * y + offset is gain times the spectrum of y
+    # plus offset times the spectrum of the window
+    n = y.shape[-1]
+    w, scale, wf = _spectrum_window(n, window, dtype)
+    s = np.fft.rfft(y * w, axis=-1)
+    if offset != 0:
+        s += wf * (offset / gain)
+    s = np.abs(s)
+    s *= scale * abs(gain)
+    return s
+
+def _spectrum_units(s, units, impedance):
+    "Convert RMS amplitude to the requested units"
+    if units not in SpectrumUnits:
+        raise ValueNotSupportedException()
+    if units == 'V':
+        return s
+    p = s * s
+    if units == 'W':
+        return p / impedance
+    with np.errstate(divide='ignore'):
+        if units == 'dBV':
+            return 10 * np.log10(p)
+        return 10 * np.log10(p / impedance / 1e-3)
+
+def spectrum(y, x_increment=1.0, window='hann', units='dBm', impedance=50.0, average=False):
+    """Calculate the single sided spectrum of a signal
+
+    y is a sequence of samples, a 2D array of records, one per row, or a list
+    of traces.  The spectrum is taken along the last axis with the specified
+    window, scaled to RMS amplitude so that a sine wave reads its true level
+    in the bin at its frequency, and converted to units: 'V' (RMS volts), 'W'
+    and 'dBm' (power into impedance) or 'dBV'.
+
+    With average set, the power of the spectra of the records on the second
+    to last axis is averaged, for example a (channels, acquisitions, points)
+    array returns one spectrum per channel.
+
+    Window and frequency tables are cached per record length, so repeated
+    calls on same-length records only pay for the FFT.
+
+    Returns the frequency axis and the spectrum.
+    """
+    if isinstance(y, (list, tuple)) and len(y) > 0 and isinstance(y[0], TraceY):
+        if isinstance(y[0], TraceYT):
+            x_increment = y[0].x_increment
+        y = np.array([t.y for t in y])
+    y = np.asarray(y)
+    if y.dtype.kind != 'f':
+        y = y.astype(float)
+    s = _spectrum_bins(y, window, y.dtype)
+    if average and s.ndim > 1:
+        s = np.sqrt(np.mean(s * s, axis=-2))
+    return _spectrum_frequency(y.shape[-1], x_increment), _spectrum_units(s, units, impedance)
+
+
 def trim_doc(docstring):
     if not docstring:
         return ''
@@ -1564,6 +1850,8 @@ class Driver(DriverOperation, DriverIdentity, DriverUtility):
         self._initialized = False
         self.__dict__.setdefault('_instrument_id', '')
         self._cache_valid = dict()
+        # (first, maximum) polling interval for completion waits
+        self._wait_interval = (0.01, 1.0)
         
         super(Driver, self).__init__(*args, **kwargs)
         
@@ -2071,6 +2359,75 @@ class Driver(DriverOperation, DriverIdentity, DriverUtility):
         except (AttributeError, NotImplementedError):
             return int(self._ask("*STB?"))
     
+    def _wait_until(self, condition, timeout, interval=None):
+        """Call condition until it returns a true value, then return that value
+        
+        Polling starts at the first interval of the (first, maximum) pair and
+        doubles up to the maximum.  Raises MaxTimeoutExceededException after
+        timeout seconds.
+        """
+        if interval is None:
+            interval = self._wait_interval
+        deadline = time.time() + timeout
+        delay, delay_max = interval
+        while True:
+            value = condition()
+            if value:
+                return value
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise MaxTimeoutExceededException()
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, delay_max)
+    
+    def _wait_for_stb(self, mask, timeout, interval=None):
+        "Serial poll until any bit in mask is set, return status byte"
+        if self._driver_operation_simulate:
+            return mask
+        stb = [0]
+        def condition():
+            stb[0] = self._read_stb()
+            return stb[0] & mask
+        self._wait_until(condition, timeout, interval)
+        return stb[0]
+    
+    def _wait_for_opc(self, timeout, interval=None):
+        "Wait for pending operations with *OPC and the ESR operation complete bit"
+        if self._driver_operation_simulate:
+            return
+        self._write("*OPC")
+        self._wait_until(lambda: int(self._ask("*ESR?")) & 1, timeout, interval)
+    
+    def _wait_for_response(self, timeout, interval=None):
+        """Wait until the response to a long running query is available
+        
+        Serial polls for the message available bit and returns when it is
+        set or after timeout seconds, after which the response can be read.
+        Without serial poll support, sleeps for the full timeout.
+        """
+        if self._driver_operation_simulate:
+            return
+        try:
+            self._interface.read_stb()
+        except (AttributeError, NotImplementedError):
+            time.sleep(timeout)
+            return
+        try:
+            self._wait_for_stb(1 << 4, timeout, interval)
+        except MaxTimeoutExceededException:
+            pass
+    
+    def _ask_until(self, data, condition, timeout, interval=None):
+        "Repeat query until condition is true for the response, return the response"
+        if self._driver_operation_simulate:
+            return self._ask(data)
+        resp = [None]
+        def check():
+            resp[0] = self._ask(data)
+            return condition(resp[0])
+        self._wait_until(check, timeout, interval)
+        return resp[0]
+    
     def _trigger(self):
         "Device trigger"
         if self._driver_operation_simulate:
@@ -2133,6 +2490,87 @@ class Driver(DriverOperation, DriverIdentity, DriverUtility):
 
         return raw_data
     
+    def _read_ieee_block_length(self):
+        "Read IEEE block header, returns length of data or None for indefinite length"
+        ch = self._read_raw(1)
+
+        if len(ch) == 0:
+            return 0
+
+        while ch != b'#':
+            ch = self._read_raw(1)
+
+        l = int(self._read_raw(1))
+        if l > 0:
+            return int(self._read_raw(l))
+        return None
+
+    def _read_ieee_block_chunks(self, num, chunk_size = 1048576):
+        "Read num bytes of IEEE block data, yielding chunks as they arrive"
+        while num > 0:
+            data = self._read_raw(min(num, chunk_size))
+            if len(data) == 0:
+                raise IOException('Unexpected end of IEEE block')
+            num -= len(data)
+            yield data
+
+    def _read_ieee_block_array(self, dtype, scale = 1.0, reference = 0, origin = 0.0, hole = None,
+                out_dtype = np.float64, chunk_size = 1048576):
+        "Read IEEE block of integer codes and scale to floating point while the transfer is in progress"
+        # The block is read in a separate thread, chunk by chunk, while the
+        # chunks received so far are converted into a preallocated array,
+        # so conversion overlaps the transfer and the raw block is never
+        # held in memory as a whole.
+        dtype = np.dtype(dtype)
+
+        def convert(raw, out):
+            out[:] = raw
+            out -= reference
+            out *= scale
+            out += origin
+            if hole is not None:
+                out[raw == hole] = float('nan')
+
+        num = self._read_ieee_block_length()
+
+        if num is None:
+            raw = np.frombuffer(self._read_raw(), dtype)
+            out = np.empty(len(raw), out_dtype)
+            convert(raw, out)
+            return out
+
+        out = np.empty(num // dtype.itemsize, out_dtype)
+        chunks = iter_threaded(self._read_ieee_block_chunks(num, chunk_size), 4)
+
+        ind = 0
+        carry = b''
+        try:
+            for data in chunks:
+                if len(carry) > 0:
+                    data = carry + data
+                n = min(len(data) // dtype.itemsize, len(out) - ind)
+                carry = data[n*dtype.itemsize:]
+                convert(np.frombuffer(data, dtype, n), out[ind:ind+n])
+                ind += n
+        finally:
+            chunks.close()
+
+        return out
+
+    def _read_ieee_block_to(self, f, chunk_size = 1048576):
+        "Read IEEE block and write it to a file object chunk by chunk, returns number of bytes written"
+        num = self._read_ieee_block_length()
+
+        if num is None:
+            data = self._read_raw()
+            f.write(data)
+            return len(data)
+
+        for data in self._read_ieee_block_chunks(num, chunk_size):
+            f.write(data)
+
+        return num
+
     def _ask_for_ieee_block(self, data, encoding = 'utf-8'):
         "Write string then read IEEE block"
         self._write(data, encoding)
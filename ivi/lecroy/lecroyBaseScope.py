@@ -24,8 +24,9 @@ THE SOFTWARE.
 
 """
 
+import array
+import sys
 import time
-import struct
 
 from .. import ivi
 from .. import scope
@@ -157,6 +158,7 @@ class lecroyBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.commo
                        scope.ContinuousAcquisition, scope.AverageAcquisition,
                        scope.SampleMode, scope.AutoSetup,
                        extra.common.SystemSetup, extra.common.Screenshot,
+                       extra.scope.WaveformMeasurementBatch,
                        ivi.Driver):
     "LeCroy generic IVI oscilloscope driver"
 
@@ -204,6 +206,7 @@ class lecroyBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.commo
         self._display_vectors = True
         self._display_labels = True
         self._display_grid = "single"
+        self._display_screenshot_image_format_mapping = ScreenshotImageFormatMapping
 
         self._identity_description = "LeCroy generic IVI oscilloscope driver"
         self._identity_identifier = ""
@@ -525,14 +528,13 @@ class lecroyBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.commo
     def _utility_reset_with_defaults(self):
         self._utility_reset()
 
-    # TODO: test self test, check if the time.sleep() is sufficient
     def _utility_self_test(self):
         code = 0
         message = "Self test passed"
         if not self._driver_operation_simulate:
             self._write("*TST?")
-            # Wait for test to complete - may be adjusted if required
-            time.sleep(40)
+            # wait for test to complete
+            self._wait_for_response(40)
             code = int(self._read())
             if code != 0:
                 message = "Self test failed"
@@ -1406,11 +1408,11 @@ class lecroyBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.commo
     #     self._set_trigger_edge_slope(value)
 
     # Modified for LeCroy, WORKING ON WR104XI-A
-    def _measurement_fetch_waveform(self, index):
+    def _measurement_fetch_waveform(self, index, start=None, stop=None, max_points=None):
         index = ivi.get_index(self._channel_name, index)
 
         if self._driver_operation_simulate:
-            return list()
+            return ivi.TraceYT()
 
         # Send the MSB first
         # old - self._write(":waveform:byteorder msbfirst")
@@ -1449,32 +1451,33 @@ class lecroyBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.commo
         if format.lower() != "word":
             raise ivi.UnexpectedResponseException()
 
-        # Read waveform data
-        self._write("%s:WAVEFORM? DAT1" % self._channel_name[index])
-        raw_data = raw_data = self._read_ieee_block()
+        start, stop, step = scope.get_waveform_window(points, start, stop, max_points)
 
-        # Split out points and convert to time and voltage pairs
-        data = list()
-        for i in range(points):
-            x = (i * xincrement) + xorigin
+        # Select window and sparsing factor in the instrument
+        self._write("WAVEFORM_SETUP SP,%d,NP,%d,FP,%d,SN,0" % (step, -(-(stop-start) // step), start))
 
-            yval = struct.unpack(">H", raw_data[i * 2:i * 2 + 2])[0]
+        trace = ivi.TraceYT()
+        trace.x_increment = xincrement
+        trace.x_origin = xorigin
+        trace.y_increment = yincrement
+        trace.y_origin = -yorigin
+        trace.y_hole = 0
 
-            if yval > 32767:
-                yval = yval - (2 ** 16)
+        # Read waveform data
+        self._write("%s:WAVEFORM? DAT1" % self._channel_name[index])
+        raw_data = self._read_ieee_block()
 
-            if yval == 0:
-                # hole value
-                y = float('nan')
-            else:
-                y = (yincrement * yval) - yorigin
+        # Store in trace object, data is signed MSB first
+        trace.y_raw = array.array('h', raw_data[0:(len(raw_data)//2)*2])
+        if sys.byteorder == 'little':
+            trace.y_raw.byteswap()
 
-            data.append((x, y))
+        scope.offset_trace_x(trace, start, step)
 
-        return data
+        return trace
 
-    def _measurement_read_waveform(self, index, maximum_time):
-        return self._measurement_fetch_waveform(index)
+    def _measurement_read_waveform(self, index, maximum_time, start=None, stop=None, max_points=None):
+        return self._measurement_fetch_waveform(index, start, stop, max_points)
 
     def _measurement_initiate(self):
         if not self._driver_operation_simulate:
@@ -1524,7 +1527,7 @@ class lecroyBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.commo
                          self._reference_level_middle,
                          self._reference_level_low))
 
-    def _measurement_fetch_waveform_measurement(self, index, measurement_function, ref_channel=None):
+    def _measurement_waveform_measurement_query(self, index, measurement_function, ref_channel=None):
         index = ivi.get_index(self._channel_name, index)
         if index < self._analog_channel_count:
             if measurement_function not in MeasurementFunctionMapping:
@@ -1534,16 +1537,20 @@ class lecroyBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.commo
             if measurement_function not in MeasurementFunctionMappingDigital:
                 raise ivi.ValueNotSupportedException()
             func = MeasurementFunctionMappingDigital[measurement_function]
+        l = func.split(' ')
+        l[0] = l[0] + '?'
+        if len(l) > 1:
+            l[-1] = l[-1] + ','
+        func = ' '.join(l)
+        query = ":measure:%s %s" % (func, self._channel_name[index])
+        if measurement_function in ['ratio', 'phase', 'delay']:
+            ref_index = ivi.get_index(self._channel_name, ref_channel)
+            query += ", %s" % self._channel_name[ref_index]
+        return query
+
+    def _measurement_fetch_waveform_measurement(self, index, measurement_function, ref_channel=None):
+        query = self._measurement_waveform_measurement_query(index, measurement_function, ref_channel)
         if not self._driver_operation_simulate:
-            l = func.split(' ')
-            l[0] = l[0] + '?'
-            if len(l) > 1:
-                l[-1] = l[-1] + ','
-            func = ' '.join(l)
-            query = ":measure:%s %s" % (func, self._channel_name[index])
-            if measurement_function in ['ratio', 'phase', 'delay']:
-                ref_index = ivi.get_index(self._channel_name, ref_channel)
-                query += ", %s" % self._channel_name[ref_index]
             return float(self._ask(query))
         return 0
 
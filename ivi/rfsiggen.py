@@ -24,6 +24,9 @@ THE SOFTWARE.
 
 """
 
+import threading
+import time
+
 from . import ivi
 
 # Exceptions
@@ -42,6 +45,26 @@ IQSource = set(['digital_modulation_base', 'cdma_base', 'tdma_base', 'arb_genera
 DigitalModulationBaseDataSource = set(['external', 'prbs', 'bit_sequence'])
 DigitalModulationBasePRBSType = set(['prbs9', 'prbs11', 'prbs15', 'prbs16', 'prbs20', 'prbs21', 'prbs23'])
 ClockType = set(['bit', 'symbol'])
+SettleMethod = set(['poll', 'opc'])
+
+class SettleWait(object):
+    "Handle for a wait until settled running in the background"
+    
+    def __init__(self):
+        self.exception = None
+        self._event = threading.Event()
+    
+    def done(self):
+        "Return True once the wait has finished"
+        return self._event.is_set()
+    
+    def wait(self, timeout=None):
+        "Block until the wait finishes, raise its exception if it failed"
+        if not self._event.wait(timeout):
+            return False
+        if self.exception is not None:
+            raise self.exception
+        return True
 
 class Base(ivi.IviContainer):
     "Base IVI methods for all RF signal generators"
@@ -58,6 +81,13 @@ class Base(ivi.IviContainer):
         self._rf_output_enabled = False
         self._alc_enabled = False
         
+        # 'opc' waits on *OPC? before checking the settled state, 'poll'
+        # checks it directly; either way, polls back off exponentially from
+        # the first to the second interval, after an initial model settle time
+        self._rf_settle_method = 'poll'
+        self._rf_settle_time = 0.0
+        self._rf_settle_poll_interval = (0.001, 0.05)
+        
         self._add_property('rf.frequency',
                         self._get_rf_frequency,
                         self._set_rf_frequency)
@@ -75,6 +105,19 @@ class Base(ivi.IviContainer):
                         self._rf_is_settled)
         self._add_method('rf.wait_until_settled',
                         self._rf_wait_until_settled)
+        self._add_method('rf.wait_until_settled_async',
+                        self._rf_wait_until_settled_async,
+                        ivi.Doc("""
+                        Starts waiting for the output to settle in a background thread and
+                        returns a handle with done() and wait(timeout) methods. wait raises
+                        MaxTimeoutExceededException if the output did not settle within
+                        maximum_time. If callback is given, it is called with the handle when
+                        the wait finishes. The instrument must not be accessed from other
+                        threads until the wait is done.
+                        
+                        asyncio code can use loop.run_in_executor with wait_until_settled
+                        instead.
+                        """))
         self._add_property('alc.enabled',
                         self._get_alc_enabled,
                         self._set_alc_enabled)
@@ -133,10 +176,37 @@ class Base(ivi.IviContainer):
         return True
     
     def _rf_wait_until_settled(self, maximum_time):
-        t = 0
-        while not self._rf_is_settled() and t < maximum_time:
-            time.sleep(0.01)
-            t = t + 0.01
+        if self._driver_operation_simulate:
+            return
+        deadline = time.time() + maximum_time
+        
+        if self._rf_settle_method == 'opc':
+            # returns once pending frequency and level changes are complete
+            self._ask("*opc?")
+            if self._rf_is_settled():
+                return
+        
+        if self._rf_settle_time > 0:
+            time.sleep(max(0, min(self._rf_settle_time, deadline - time.time())))
+        
+        self._wait_until(self._rf_is_settled, deadline - time.time(), self._rf_settle_poll_interval)
+    
+    def _rf_wait_until_settled_async(self, maximum_time, callback=None):
+        handle = SettleWait()
+        
+        def waiter():
+            try:
+                self._rf_wait_until_settled(maximum_time)
+            except Exception as e:
+                handle.exception = e
+            handle._event.set()
+            if callback is not None:
+                callback(handle)
+        
+        t = threading.Thread(target=waiter)
+        t.daemon = True
+        t.start()
+        return handle
     
     
 class ModulateAM(ivi.IviContainer):
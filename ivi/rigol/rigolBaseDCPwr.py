@@ -24,6 +24,8 @@ THE SOFTWARE.
 
 """
 
+import numpy as np
+
 from .. import ivi
 from .. import dcpwr
 from .. import scpi
@@ -32,6 +34,10 @@ TrackingType = set(['floating'])
 TriggerSourceMapping = {
         'immediate': 'imm',
         'bus': 'bus'}
+# columns of :measure:all? response
+MeasureAllColumns = {
+        'voltage': 0,
+        'current': 1}
 
 class rigolBaseDCPwr(scpi.dcpwr.Base, scpi.dcpwr.Trigger, scpi.dcpwr.SoftwareTrigger,
                 scpi.dcpwr.Measurement):
@@ -102,6 +108,31 @@ class rigolBaseDCPwr(scpi.dcpwr.Base, scpi.dcpwr.Trigger, scpi.dcpwr.SoftwareTri
             return 'on'
         return 'off'
     
+    def _output_configure_commands(self, index, voltage, current, ovp, enabled):
+        # channel is given in each command, no need to select it
+        ch = "ch%d" % (index+1)
+        cmd = list()
+        if ovp is not None:
+            cmd.append("output:ovp:value %s,%.3f" % (ch, ovp))
+        if voltage is not None and current is not None:
+            cmd.append("apply %s,%.3f,%.3f" % (ch, voltage, current))
+        elif voltage is not None:
+            cmd.append("source%d:voltage:level %.3f" % (index+1, voltage))
+        elif current is not None:
+            cmd.append("source%d:current:level %.3f" % (index+1, current))
+        if enabled is not None:
+            cmd.append("output:state %s,%s" % (ch, self._get_bool_str(enabled)))
+        return cmd
+    
+    def _measurement_measure_all(self, types=('voltage', 'current')):
+        types = self._measurement_measure_all_types(types)
+        if self._driver_operation_simulate:
+            return np.zeros((self._output_count, len(types)))
+        # voltage, current and power of every channel in one message
+        resp = self._ask(';:'.join("measure:all? ch%d" % (k+1) for k in range(self._output_count)))
+        values = np.array(resp.replace(';', ',').split(','), dtype=float).reshape(self._output_count, -1)
+        return values[:, [MeasureAllColumns[t] for t in types]]
+    
     def _memory_save(self, index):
         index = int(index)
         if index < 1 or index > self._memory_size:
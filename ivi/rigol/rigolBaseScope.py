@@ -28,6 +28,8 @@ import array
 import math
 import time
 
+import numpy as np
+
 from .. import ivi
 from .. import scope
 from .. import scpi
@@ -142,6 +144,7 @@ class rigolBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common
                 scope.ContinuousAcquisition, scope.AverageAcquisition,
                 scope.TriggerModifier, scope.AutoSetup,
                 extra.common.SystemSetup, extra.common.Screenshot,
+                extra.scope.WaveformPreambleCache, extra.scope.WaveformMeasurementBatch,
                 ivi.Driver):
     "Rigol generic IVI oscilloscope driver"
 
@@ -171,6 +174,9 @@ class rigolBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common
         self._horizontal_divisions = 12
         self._vertical_divisions = 8
 
+        # maximum points per :waveform:data? in byte format, set per series
+        self._waveform_chunk_size = 250000
+
         self._timebase_mode = 'main'
         self._timebase_position = 0.0
         self._timebase_range = 1e-3
@@ -415,6 +421,19 @@ class rigolBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common
 
         return ivi.decode_ieee_block(data)
 
+    def _display_write_screenshot(self, f, format='png', invert=False):
+        if self._driver_operation_simulate:
+            return
+
+        if format not in self._display_screenshot_image_format_mapping:
+            raise ivi.ValueNotSupportedException()
+
+        format = self._display_screenshot_image_format_mapping[format]
+
+        self._write(":display:data? on, %d, %s" % (int(invert), format))
+
+        self._read_ieee_block_to(f)
+
     def _get_timebase_mode(self):
         if not self._driver_operation_simulate and not self._get_cache_valid():
             if int(self._ask(":timebase:delay:enable?")):
@@ -1075,7 +1094,7 @@ class rigolBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common
     def _set_trigger_ac_line_slope(self, value):
         self._set_trigger_edge_slope(value)
 
-    def _measurement_fetch_waveform(self, index):
+    def _measurement_fetch_waveform(self, index, start=None, stop=None, max_points=None):
         index = ivi.get_index(self._channel_name, index)
 
         if self._driver_operation_simulate:
@@ -1087,7 +1106,7 @@ class rigolBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common
         trace = ivi.TraceYT()
 
         # Read preamble
-        pre = self._ask(":waveform:preamble?").split(',')
+        pre = self._ask_for_waveform_preamble(index, ":waveform:preamble?")
 
         acq_format = int(pre[0])
         acq_type = int(pre[1])
@@ -1103,23 +1122,48 @@ class rigolBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common
         if acq_format != 0:
             raise UnexpectedResponseException()
 
-        # Read waveform data
-        data = bytearray()
+        start, stop, step = scope.get_waveform_window(points, start, stop, max_points)
 
-        for offset in range(1, points+1, 250000):
-            self._write(":waveform:start %d" % offset)
-            self._write(":waveform:stop %d" % min(points, offset+249999))
-            self._write(":waveform:data?")
-            raw_data = self._read_raw()
-            data.extend(ivi.decode_ieee_block(raw_data))
+        # Read waveform data, only the requested window
+        trace.y_raw = self._read_waveform_data(start, stop)[::step]
 
-        # Store in trace object
-        trace.y_raw = array.array('B', data[0:points])
+        scope.offset_trace_x(trace, start, step)
 
         return trace
 
-    def _measurement_read_waveform(self, index, maximum_time):
-        return self._measurement_fetch_waveform(index)
+    def _read_waveform_data(self, start, stop):
+        "Read record points start to stop of the current source in chunks"
+        data = np.zeros(stop-start, dtype=np.uint8)
+        offsets = range(start, stop, self._waveform_chunk_size)
+
+        def request(offset):
+            self._write(":waveform:start %d;:waveform:stop %d;:waveform:data?" %
+                    (offset+1, min(stop, offset+self._waveform_chunk_size)))
+
+        if len(offsets) > 0:
+            request(offsets[0])
+
+        for k in range(len(offsets)):
+            raw_data = self._read_raw()
+
+            # a short block would leave zeros in the record; check it before
+            # the next request so that nothing is left in flight
+            block = ivi.decode_ieee_block(memoryview(raw_data))
+            n = min(stop, offsets[k]+self._waveform_chunk_size) - offsets[k]
+            if len(block) != n:
+                raise ivi.UnexpectedResponseException()
+
+            # keep the next chunk in flight while this one is copied
+            if k+1 < len(offsets):
+                request(offsets[k+1])
+
+            ind = offsets[k]-start
+            data[ind:ind+n] = np.frombuffer(block, dtype=np.uint8, count=n)
+
+        return data
+
+    def _measurement_read_waveform(self, index, maximum_time, start=None, stop=None, max_points=None):
+        return self._measurement_fetch_waveform(index, start, stop, max_points)
 
     def _measurement_initiate(self):
         if not self._driver_operation_simulate:
@@ -1171,7 +1215,7 @@ class rigolBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common
         self._reference_level_middle = value
         self._set_cache_valid()
 
-    def _measurement_fetch_waveform_measurement(self, index, measurement_function, ref_channel = None):
+    def _measurement_waveform_measurement_query(self, index, measurement_function, ref_channel = None):
         index = ivi.get_index(self._channel_name, index)
         if index < self._analog_channel_count:
             if measurement_function not in MeasurementFunctionMapping:
@@ -1181,16 +1225,20 @@ class rigolBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common
             if measurement_function not in MeasurementFunctionMappingDigital:
                 raise ivi.ValueNotSupportedException()
             func = MeasurementFunctionMappingDigital[measurement_function]
+        l = func.split(' ')
+        l[0] = l[0] + '?'
+        if len(l) > 1:
+            l[-1] = l[-1] + ','
+        func = ' '.join(l)
+        query = ":measure:%s %s" % (func, self._channel_name[index])
+        if measurement_function in ['phase', 'delay']:
+            ref_index = ivi.get_index(self._channel_name, ref_channel)
+            query += ", %s" % self._channel_name[ref_index]
+        return query
+
+    def _measurement_fetch_waveform_measurement(self, index, measurement_function, ref_channel = None):
+        query = self._measurement_waveform_measurement_query(index, measurement_function, ref_channel)
         if not self._driver_operation_simulate:
-            l = func.split(' ')
-            l[0] = l[0] + '?'
-            if len(l) > 1:
-                l[-1] = l[-1] + ','
-            func = ' '.join(l)
-            query = ":measure:%s %s" % (func, self._channel_name[index])
-            if measurement_function in ['phase', 'delay']:
-                ref_index = ivi.get_index(self._channel_name, ref_channel)
-                query += ", %s" % self._channel_name[ref_index]
             return float(self._ask(query))
         return 0
 
@@ -24,9 +24,11 @@ THE SOFTWARE.
 
 """
 
+import numpy as np
+
 from .rigolBaseDCPwr import *
 
-class rigolDP800(rigolBaseDCPwr):
+class rigolDP800(rigolBaseDCPwr, scpi.dcpwr.List):
     "Rigol DP800 series IVI DC power supply driver"
     
     def __init__(self, *args, **kwargs):
@@ -68,6 +70,12 @@ class rigolDP800(rigolBaseDCPwr):
         
         self._memory_size = 10
         
+        # lists run on the output timer
+        self._output_list_max_points = 2048
+        self._output_list_dwell_min = 1.0
+        self._output_list_dwell_max = 99999.0
+        self._output_list_count_max = 99999
+        
         self._identity_description = "Rigol DP800 series IVI DC power supply driver"
         self._identity_identifier = ""
         self._identity_revision = ""
@@ -80,6 +88,31 @@ class rigolDP800(rigolBaseDCPwr):
         self._identity_supported_instrument_models = ['DP831A', 'DP832', 'DP832A']
         
         self._init_outputs()
-        
     
+    def _set_output_list_enabled(self, index, value):
+        index = ivi.get_index(self._output_name, index)
+        value = bool(value)
+        if not self._driver_operation_simulate:
+            self._write(":timer:state ch%d,%s" % (index+1, self._get_bool_str(value)))
+        self._output_list_enabled[index] = value
+        # levels change as the timer runs
+        self._set_cache_valid(False, 'output_voltage_level', index)
+        self._set_cache_valid(False, 'output_current_limit', index)
     
+    def _output_list_load(self, index, voltage=None, current=None, dwell=None, count=1):
+        index = ivi.get_index(self._output_name, index)
+        voltage, current, dwell = self._output_list_validate(index, voltage, current, dwell, count)
+        # timer only takes whole seconds
+        if np.any(dwell != np.floor(dwell)):
+            raise ivi.ValueNotSupportedException()
+        if not self._driver_operation_simulate:
+            ch = "ch%d" % (index+1)
+            n = len(dwell)
+            # one timer group per step, all sent in a single write
+            cmd = [":timer:parameter %s,%d,%.3f,%.3f,%d" % (ch, k, v, i, t)
+                    for k, v, i, t in zip(range(n), voltage, current, dwell)]
+            cmd.append(":timer:groups %s,%d" % (ch, n))
+            cmd.append(":timer:cycles %s,n,%d" % (ch, int(count)))
+            cmd.append(":timer:endstate %s,last" % ch)
+            self._write(';'.join(cmd))
+        self._output_list_points[index] = len(dwell)
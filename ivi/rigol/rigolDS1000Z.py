@@ -41,6 +41,9 @@ class rigolDS1000Z(rigolBaseScope, rigolDSSource):
         self._bandwidth_limit = {'20M': 20e6}
         self._max_averages = 1024
 
+        # maximum points per :waveform:data? in byte format
+        self._waveform_chunk_size = 250000
+
         self._horizontal_divisions = 12
         self._vertical_divisions = 8
 
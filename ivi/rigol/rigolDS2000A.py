@@ -43,6 +43,9 @@ class rigolDS2000A(rigolBaseScope, rigolDSSource):
         self._bandwidth_limit = {'20M': 20e6, '100M': 100e6}
         self._max_averages = 8192
 
+        # maximum points per :waveform:data? in byte format
+        self._waveform_chunk_size = 250000
+
         self._horizontal_divisions = 14
         self._vertical_divisions = 8
 
@@ -71,6 +74,17 @@ class rigolDS2000A(rigolBaseScope, rigolDSSource):
 
         return ivi.decode_ieee_block(data)
 
+    def _display_write_screenshot(self, f, format='bmp', invert=False):
+        if self._driver_operation_simulate:
+            return
+
+        if format not in self._display_screenshot_image_format_mapping:
+            raise ivi.ValueNotSupportedException()
+
+        self._write(":display:data?")
+
+        self._read_ieee_block_to(f)
+
     def _get_channel_probe_attenuation(self, index):
         index = ivi.get_index(self._analog_channel_name, index)
         if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
@@ -26,6 +26,10 @@ THE SOFTWARE.
 
 from .rigolBaseScope import *
 
+ScreenshotImageFormatMapping = {
+        'bmp': 'bmp',
+        'bmp24': 'bmp24'}
+
 class rigolDS4000(rigolBaseScope):
     "Rigol DS4000 series IVI oscilloscope driver"
 
@@ -40,9 +44,15 @@ class rigolDS4000(rigolBaseScope):
         self._bandwidth_limit = {'20M': 20e6, '100M': 100e6}
         self._max_averages = 8192
 
+        # maximum points per :waveform:data? in byte format
+        self._waveform_chunk_size = 1400000
+
         self._horizontal_divisions = 12
         self._vertical_divisions = 8
 
+        # :display:data? only returns BMP
+        self._display_screenshot_image_format_mapping = ScreenshotImageFormatMapping
+
         self._identity_description = "Rigol DS4000 series IVI oscilloscope driver"
         self._identity_supported_instrument_models = ['DS4012', 'DS4014', 'DS4022',
                 'DS4024', 'DS4032', 'DS4034', 'DS4052', 'DS4054', 'MSO4012', 'MSO4014',
@@ -62,6 +72,17 @@ class rigolDS4000(rigolBaseScope):
         data = self._read_raw()
 
         return ivi.decode_ieee_block(data)
+
+    def _display_write_screenshot(self, f, format='bmp', invert=False):
+        if self._driver_operation_simulate:
+            return
+
+        if format not in self._display_screenshot_image_format_mapping:
+            raise ivi.ValueNotSupportedException()
+
+        self._write(":display:data?")
+
+        self._read_ieee_block_to(f)
     
     def _get_channel_input_impedance(self, index):
         index = ivi.get_index(self._analog_channel_name, index)
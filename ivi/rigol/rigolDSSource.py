@@ -401,35 +401,16 @@ class rigolDSSource(fgen.Base, fgen.StdFunc, fgen.ArbWfm, fgen.ArbFrequency,
         self._set_output_standard_waveform_frequency(index, value)
 
     def _arbitrary_waveform_create_channel_waveform(self, index, data):
-        y = None
-        x = None
-        if type(data) == list and type(data[0]) == float:
-            # list
-            y = array(data)
-        elif type(data) == np.ndarray and len(data.shape) == 1:
-            # 1D array
-            y = data
-        elif type(data) == np.ndarray and len(data.shape) == 2 and data.shape[0] == 1:
-            # 2D array, hieght 1
-            y = data[0]
-        elif type(data) == np.ndarray and len(data.shape) == 2 and data.shape[1] == 1:
-            # 2D array, width 1
-            y = data[:,0]
-        else:
-            x, y = ivi.get_sig(data)
+        x, y = fgen.get_waveform(data)
 
         if len(y) % self._arbitrary_waveform_quantum != 0:
             raise ivi.ValueNotSupportedException()
 
-        # clip on [-1,1] and rescale to [0,1]
-        yc = (y.clip(-1, 1)+1)/2
-
-        # scale to 14 bits
-        yb = np.rint(yc * ((1 << 14)-1)).astype(int) & 0x00003fff
-
-        raw_data = yb.astype('<i2').tobytes()
-
+        # clip on [-1,1] and scale to 14 bits, offset binary, LSB first
         # space required before IEEE block due to Rigol firmware bug wrt. data alignment in scope memory
-        self._write_ieee_block(raw_data, ':trace%d:data:dac volatile, ' % (index+1))
+        block = fgen.build_waveform_block(y, ':trace%d:data:dac volatile, ' % (index+1),
+                bits=14, byteorder='little')
+
+        self._write_raw(block)
 
         return self._output_name[index]
\ No newline at end of file
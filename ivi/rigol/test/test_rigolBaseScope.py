@@ -0,0 +1,187 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014-2016 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import io
+import unittest
+
+import numpy as np
+
+import ivi
+from .. import rigolDS1104Z, rigolDS4054
+
+class VirtualDS1000Z(object):
+    "Fake Rigol DS1000Z responding to waveform transfer commands"
+    def __init__(self, points=1200000):
+        self.read_buffer = io.BytesIO()
+        self.write_count = 0
+        self.read_count = 0
+        self.cmd_log = list()
+        self.memory = (np.arange(points) % 251).astype(np.uint8)
+        self.screen = b'BM' + bytes(range(256)) * 16
+        self.block_limit = None
+        self.vals = {
+            '*idn': 'RIGOL TECHNOLOGIES,DS1104Z,DS1ZA000000000,00.04.03',
+            ':waveform:source': 'chan1',
+            ':waveform:format': 'byte',
+            ':waveform:start': 1,
+            ':waveform:stop': 1200,
+        }
+
+    def write_raw(self, data):
+        self.write_count += 1
+        resp = list()
+        for cmd in data.decode().split(';'):
+            self.cmd_log.append(cmd)
+            l = cmd.lower().split(' ', 1)
+            if l[0] == '*idn?':
+                resp.append(self.vals['*idn'].encode())
+            elif l[0] == ':waveform:preamble?':
+                pre = '0,0,%d,1,1.000000e-09,-6.000000e-04,0,4.000000e-02,0,127' % len(self.memory)
+                resp.append(pre.encode())
+            elif l[0] == ':waveform:data?':
+                start = int(self.vals[':waveform:start'])
+                stop = int(self.vals[':waveform:stop'])
+                d = self.memory[start-1:stop].tobytes()[:self.block_limit]
+                resp.append(ivi.build_ieee_block(d))
+            elif l[0] == ':display:data?':
+                resp.append(ivi.build_ieee_block(self.screen))
+            elif l[0].startswith(':measure:') and l[0].endswith('?'):
+                # value encodes the channel number and measurement name length
+                resp.append(('%d.%d' % (int(l[1][-1]), len(l[0]))).encode())
+            elif len(l) > 1:
+                self.vals[l[0]] = l[1]
+        if resp:
+            self.read_buffer = io.BytesIO(b';'.join(resp) + b'\n')
+
+    def read_raw(self, num=-1):
+        self.read_count += 1
+        return self.read_buffer.read(num)
+
+
+class TestRigolDS1104Z(unittest.TestCase):
+
+    def setUp(self):
+        self.vscope = VirtualDS1000Z()
+        self.scope = rigolDS1104Z(self.vscope)
+
+    def test_fetch_waveform(self):
+        trace = self.scope.channels[0].measurement.fetch_waveform()
+        self.assertEqual(len(trace), len(self.vscope.memory))
+        self.assertTrue(np.array_equal(trace.y_raw, self.vscope.memory))
+        self.assertAlmostEqual(trace.x[0], -6e-4)
+        # one request per chunk, start/stop/data? in a single write
+        self.assertEqual(self.vscope.cmd_log.count(':waveform:data?'), 5)
+
+    def test_fetch_waveform_window(self):
+        trace = self.scope.channels[0].measurement.fetch_waveform(start=249000, stop=251000, max_points=100)
+        self.assertEqual(len(trace), 100)
+        self.assertTrue(np.array_equal(trace.y_raw, self.vscope.memory[249000:251000:20]))
+        self.assertAlmostEqual(trace.x[0], -6e-4 + 249000e-9)
+        self.assertAlmostEqual(trace.x_increment, 20e-9)
+        self.assertEqual(self.vscope.cmd_log.count(':waveform:data?'), 1)
+
+    def test_fetch_waveform_preamble_cache(self):
+        self.scope.channels[0].measurement.fetch_waveform()
+        self.scope.channels[0].measurement.fetch_waveform()
+        self.assertEqual(self.vscope.cmd_log.count(':waveform:preamble?'), 1)
+        self.assertEqual(self.scope.measurement.preamble_cache_hits, 1)
+        self.assertEqual(self.scope.measurement.preamble_cache_misses, 1)
+
+        self.scope.timebase.scale = 1e-3
+        self.scope.channels[0].measurement.fetch_waveform()
+        self.assertEqual(self.vscope.cmd_log.count(':waveform:preamble?'), 2)
+
+        self.scope.driver_operation.cache = False
+        self.scope.channels[0].measurement.fetch_waveform()
+        self.assertEqual(self.vscope.cmd_log.count(':waveform:preamble?'), 3)
+
+    def test_fetch_waveform_chunked(self):
+        self.scope._waveform_chunk_size = 10000
+        self.vscope.write_count = 0
+        trace = self.scope.channels[0].measurement.fetch_waveform()
+        chunks = -(-len(self.vscope.memory) // 10000)
+        self.assertTrue(np.array_equal(trace.y_raw, self.vscope.memory))
+        self.assertEqual(self.vscope.cmd_log.count(':waveform:data?'), chunks)
+        # previously three writes per chunk
+        self.assertTrue(self.vscope.write_count < chunks + 5)
+
+    def test_fetch_waveform_truncated(self):
+        self.scope._waveform_chunk_size = 10000
+        self.vscope.block_limit = 9000
+        self.assertRaises(ivi.UnexpectedResponseException,
+                self.scope.channels[0].measurement.fetch_waveform)
+        # the next chunk is not requested after a short block
+        self.assertEqual(self.vscope.cmd_log.count(':waveform:data?'), 1)
+
+    def test_fetch_waveform_measurements(self):
+        request = [(ch, func) for ch in range(4) for func in
+                        ['frequency', 'voltage_peak_to_peak', 'rise_time', 'voltage_rms']]
+        request.append(('chan2', 'period'))
+        self.vscope.write_count = 0
+        res = self.scope.measurement.fetch_waveform_measurements(request)
+        self.assertEqual(len(res), 17)
+        # 17 queries chained into two messages
+        self.assertEqual(self.vscope.write_count, 2)
+        self.assertEqual(res[0].channel, 'chan1')
+        self.assertEqual(res[0].function, 'frequency')
+        self.assertEqual(res[0].reference, '')
+        self.assertEqual(res[5].value, 2.13)
+        self.assertEqual(res[16].value, 2.16)
+        single = self.scope.channels[3].measurement.fetch_waveform_measurement('voltage_rms')
+        self.assertEqual(res[15].value, single)
+        self.assertTrue(np.array_equal(res.value[:4], [1.19, 1.13, 1.15, 1.14]))
+
+    def test_compute_waveform_measurements(self):
+        functions = ['frequency', 'period', 'rise_time', 'fall_time', 'voltage_rms',
+                'voltage_peak_to_peak', 'voltage_high', 'voltage_low', 'amplitude',
+                'width_positive', 'duty_cycle_positive', 'overshoot']
+        traces = [self.scope.channels[i].measurement.fetch_waveform() for i in range(4)]
+        self.vscope.write_count = 0
+        res = self.scope.measurement.compute_waveform_measurements(traces, functions)
+        # computed on the host without any instrument transaction
+        self.assertEqual(self.vscope.write_count, 0)
+        self.assertEqual(sorted(res.keys()), sorted(functions))
+        self.assertEqual(len(res['frequency']), 4)
+        self.assertAlmostEqual(res['voltage_high'][0], (250 - 127) * 0.04, 1)
+
+class TestRigolDS4000(unittest.TestCase):
+
+    def setUp(self):
+        self.vscope = VirtualDS1000Z()
+        self.vscope.vals['*idn'] = 'RIGOL TECHNOLOGIES,DS4054,DS4A000000000,00.01.02'
+        self.scope = rigolDS4054(self.vscope)
+
+    def test_fetch_screenshot_to(self):
+        f = io.BytesIO()
+        # only BMP is available, whatever the base class maps
+        self.assertEqual(self.scope.display.fetch_screenshot_to(f), 'bmp')
+        self.assertEqual(f.getvalue(), self.vscope.screen)
+        self.assertRaises(ivi.ValueNotSupportedException,
+                self.scope.display.fetch_screenshot_to, io.BytesIO(), 'png')
+        self.assertEqual(self.vscope.cmd_log.count(':display:data?'), 1)
+
+if __name__ == '__main__':
+    unittest.main()
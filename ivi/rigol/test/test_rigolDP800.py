@@ -0,0 +1,185 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014-2016 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import io
+import unittest
+
+import numpy as np
+
+import ivi
+from .. import rigolDP832
+
+class VirtualDP832(object):
+    "Fake DP832 keeping track of channel settings"
+    def __init__(self):
+        self.read_buffer = io.BytesIO()
+        self.write_count = 0
+        self.cmd_log = list()
+        self.channel = 1
+        self.timer = dict()
+        self.voltage = {1: 5.0, 2: 12.0, 3: 3.3}
+        self.current = {1: 1.0, 2: 1.5, 3: 0.5}
+
+    def write_raw(self, data):
+        self.write_count += 1
+        resp = list()
+        for cmd in data.decode().split(';'):
+            cmd = cmd.strip().lstrip(':').lower()
+            self.cmd_log.append(cmd)
+            l = cmd.split(' ', 1)
+            if l[0] == '*idn?':
+                resp.append('RIGOL TECHNOLOGIES,DP832,DP8A000000000,00.01.14')
+            elif l[0] == 'instrument:nselect':
+                self.channel = int(l[1])
+            elif l[0] == 'timer:parameter':
+                ch, k, v, i, t = l[1].split(',')
+                self.timer.setdefault(ch, dict())[int(k)] = (float(v), float(i), float(t))
+            elif l[0] == 'source:voltage:level?':
+                resp.append('%.3f' % self.voltage[self.channel])
+            elif l[0] == 'source:current:level?':
+                resp.append('%.3f' % self.current[self.channel])
+            elif l[0] == 'measure:all?':
+                ch = int(l[1][2:])
+                resp.append('%.3f,%.3f,%.3f' % (ch, ch/10.0, ch*ch/10.0))
+        if resp:
+            self.read_buffer = io.BytesIO((';'.join(resp) + '\n').encode())
+
+    def read_raw(self, num=-1):
+        return self.read_buffer.read(num)
+
+    def clear(self):
+        pass
+
+
+class TestDP832List(unittest.TestCase):
+
+    def setUp(self):
+        self.vps = VirtualDP832()
+        self.ps = rigolDP832(self.vps)
+
+    def test_load(self):
+        v = np.linspace(1, 10, 50)
+        self.vps.write_count = 0
+        self.ps.outputs[1].list.load(v, 0.5, 2)
+        # whole list in a single transfer
+        self.assertEqual(self.vps.write_count, 1)
+        self.assertEqual(self.ps.outputs[1].list.points, 50)
+        self.assertEqual(len(self.vps.timer['ch2']), 50)
+        self.assertEqual(self.vps.timer['ch2'][49], (10.0, 0.5, 2.0))
+        self.assertIn('timer:groups ch2,50', self.vps.cmd_log)
+        self.assertIn('timer:cycles ch2,n,1', self.vps.cmd_log)
+        self.ps.outputs[1].list.enabled = True
+        self.assertEqual(self.vps.cmd_log[-1], 'timer:state ch2,on')
+
+    def test_load_present_level(self):
+        # current limit not cached yet, read back from the instrument
+        self.ps.outputs[1].list.load([1, 2, 3], None, 1)
+        self.assertEqual([self.vps.timer['ch2'][k][1] for k in range(3)], [1.5]*3)
+        self.ps.outputs[2].list.load(None, [0.1, 0.2], 5)
+        self.assertEqual([self.vps.timer['ch3'][k][0] for k in range(2)], [3.3]*2)
+
+    def test_validation(self):
+        self.vps.write_count = 0
+        # voltage above range
+        self.assertRaises(ivi.OutOfRangeException, self.ps.outputs[0].list.load, [1, 40], 1, 1)
+        # current above range
+        self.assertRaises(ivi.OutOfRangeException, self.ps.outputs[0].list.load, [1, 2], [1, 4], 1)
+        # dwell below timer resolution
+        self.assertRaises(ivi.OutOfRangeException, self.ps.outputs[0].list.load, [1, 2], 1, 0.1)
+        # dwell not whole seconds
+        self.assertRaises(ivi.ValueNotSupportedException, self.ps.outputs[0].list.load, [1, 2], 1, [1, 2.5])
+        # mismatched lengths
+        self.assertRaises(ivi.ValueNotSupportedException, self.ps.outputs[0].list.load, [1, 2], [1, 2, 3], 1)
+        self.assertRaises(ivi.OutOfRangeException, self.ps.outputs[0].list.load, np.ones(3000), 1, 1)
+        self.assertEqual(self.vps.write_count, 0)
+
+class TestDP832Configure(unittest.TestCase):
+
+    def setUp(self):
+        self.vps = VirtualDP832()
+        self.ps = rigolDP832(self.vps)
+
+    def test_configure(self):
+        self.vps.write_count = 0
+        self.vps.cmd_log = list()
+        self.ps.outputs[0].configure(voltage=5, current=1, ovp=6, enabled=True)
+        self.assertEqual(self.vps.write_count, 1)
+        self.assertEqual(self.vps.cmd_log, ['output:ovp:value ch1,6.000', 'apply ch1,5.000,1.000',
+                'output:state ch1,on'])
+        # values are cached, nothing is read back
+        self.assertEqual(self.ps.outputs[0].voltage_level, 5)
+        self.assertEqual(self.ps.outputs[0].current_limit, 1)
+        self.assertEqual(self.ps.outputs[0].ovp_limit, 6)
+        self.assertEqual(self.ps.outputs[0].enabled, True)
+        self.assertEqual(self.vps.write_count, 1)
+        self.ps.outputs[1].configure(current=0.5)
+        self.assertEqual(self.vps.cmd_log[-1], 'source2:current:level 0.500')
+
+    def test_configure_many(self):
+        self.vps.write_count = 0
+        self.ps.configure_many([dict(voltage=3.3, current=1, enabled=True),
+                None,
+                dict(voltage=5, current=2, enabled=True)])
+        self.assertEqual(self.vps.write_count, 1)
+        self.assertIn('apply ch3,5.000,2.000', self.vps.cmd_log)
+        self.assertEqual(self.ps.outputs[2].voltage_level, 5)
+        self.ps.configure_many({'output2': dict(voltage=12)})
+        self.assertEqual(self.vps.cmd_log[-1], 'source2:voltage:level 12.000')
+        # nothing is sent if any value is out of range
+        self.vps.write_count = 0
+        self.assertRaises(ivi.OutOfRangeException, self.ps.configure_many,
+                [dict(voltage=1), dict(voltage=50)])
+        self.assertEqual(self.vps.write_count, 0)
+
+class TestDP832Measurement(unittest.TestCase):
+
+    def setUp(self):
+        self.vps = VirtualDP832()
+        self.ps = rigolDP832(self.vps)
+
+    def test_measure_all(self):
+        self.vps.write_count = 0
+        m = self.ps.measurement.measure_all()
+        # every channel in a single query
+        self.assertEqual(self.vps.write_count, 1)
+        self.assertEqual(m.shape, (3, 2))
+        np.testing.assert_allclose(m, [[1, 0.1], [2, 0.2], [3, 0.3]])
+        m = self.ps.measurement.measure_all('current')
+        np.testing.assert_allclose(m, [[0.1], [0.2], [0.3]])
+        self.assertRaises(ivi.ValueNotSupportedException, self.ps.measurement.measure_all, 'power')
+
+    def test_sample_loop(self):
+        samples = list(self.ps.measurement.sample_loop(count=3, interval=0.01))
+        self.assertEqual(len(samples), 3)
+        t = [s[0] for s in samples]
+        self.assertTrue(all(b - a >= 0.009 for a, b in zip(t, t[1:])))
+        np.testing.assert_allclose(samples[2][1], [[1, 0.1], [2, 0.2], [3, 0.3]])
+        # bad arguments are reported by the call, before iterating
+        self.assertRaises(ivi.ValueNotSupportedException, self.ps.measurement.sample_loop, 'power')
+        self.assertRaises(ivi.OutOfRangeException, self.ps.measurement.sample_loop, interval=-1)
+
+if __name__ == '__main__':
+    unittest.main()
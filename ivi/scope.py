@@ -24,6 +24,10 @@ THE SOFTWARE.
 
 """
 
+import numpy as np
+import threading
+import warnings
+
 from . import ivi
 
 # Exceptions
@@ -54,6 +58,434 @@ MeasurementFunction = set(['rise_time', 'fall_time', 'frequency', 'period',
         'overshoot', 'preshoot'])
 AcquisitionStatus = set(['complete', 'in_progress', 'unknown'])
 
+def get_waveform_window(points, start=None, stop=None, max_points=None):
+    "Validate waveform window and return (start, stop, step) record indices"
+    if start is None:
+        start = 0
+    if stop is None or stop > points:
+        stop = points
+    start = int(start)
+    stop = int(stop)
+    if start < 0 or start > stop:
+        raise ivi.OutOfRangeException()
+    step = 1
+    if max_points is not None:
+        max_points = int(max_points)
+        if max_points < 1:
+            raise ivi.OutOfRangeException()
+        step = max(1, -(-(stop - start) // max_points))
+    return start, stop, step
+
+def offset_trace_x(trace, start=0, step=1):
+    "Rebase trace time axis on record point start with a spacing of step points"
+    trace.x_origin = ((start - trace.x_reference) * trace.x_increment) + trace.x_origin
+    trace.x_reference = 0
+    trace.x_increment = trace.x_increment * step
+    return trace
+
+def window_trace(trace, start=0, stop=None, step=1):
+    "Apply host-side windowing and decimation to a full record trace"
+    trace.y_raw = trace.y_raw[start:stop:step]
+    return offset_trace_x(trace, start, step)
+
+def _row_mean(rows, values, count):
+    "Mean of values grouped by row, NaN for rows without values"
+    n = np.bincount(rows, minlength=count)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.bincount(rows, values, minlength=count) / n
+
+def _waveform_levels(y, ymin, ymax, ok=None, bins=256):
+    """Return (base, top) levels of each row of y from the histogram modes, or the extremes
+
+    ok masks the finite samples of y when it has holes; rows without any
+    finite samples have NaN levels.
+    """
+    count, points = y.shape
+    rows = np.arange(count)
+    span = ymax - ymin
+    span[~(span > 0)] = 1
+    b = (y - ymin[:, None]) * ((bins - 1) / span)[:, None]
+    if ok is None:
+        b = b.astype(np.intp)
+        b += (rows * bins)[:, None]
+        b = b.ravel()
+        v = y.ravel()
+        valid = points
+    else:
+        b = b[ok].astype(np.intp) + np.broadcast_to((rows * bins)[:, None], y.shape)[ok]
+        v = y[ok]
+        valid = ok.sum(1)
+    n = np.bincount(b, minlength=count*bins).reshape(count, bins)
+    s = np.bincount(b, v, minlength=count*bins).reshape(count, bins)
+    half = bins // 2
+    top = half + n[:, half:].argmax(1)
+    base = n[:, :half].argmax(1)
+    # only flat tops and bases give a distinct mode; use the extremes otherwise
+    limit = 0.05 * valid
+    n_top = n[rows, top]
+    n_base = n[rows, base]
+    vtop = np.where(n_top > limit, s[rows, top] / np.maximum(n_top, 1), ymax)
+    vbase = np.where(n_base > limit, s[rows, base] / np.maximum(n_base, 1), ymin)
+    return vbase, vtop
+
+def _fill_holes(y, ok):
+    "Return y with each non-finite sample replaced by the previous finite sample of its row"
+    count, points = y.shape
+    idx = np.where(ok, np.arange(points), -1)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    # holes at the start of a row take the first finite sample
+    idx = np.where(idx < 0, ok.argmax(1)[:, None], idx)
+    return y[np.arange(count)[:, None], idx]
+
+def _waveform_edges(y, low, middle, high):
+    "Return (row, middle crossing, transition time, rising) of each edge in samples"
+    count, points = y.shape
+    yf = y.ravel()
+
+    # samples outside of the band between the low and high levels; an edge
+    # is where the next sample outside the band is on the other side of it
+    state = np.zeros(y.shape, np.int8)
+    state[y <= low[:, None]] = -1
+    state[y >= high[:, None]] = 1
+    nz = np.flatnonzero(state)
+    st = state.ravel()[nz]
+    e = np.flatnonzero((st[1:] != st[:-1]) & (nz[1:] // points == nz[:-1] // points))
+    j = nz[e]
+    k = nz[e+1]
+    rising = st[e+1] == 1
+    r = k // points
+
+    # start level crossed after sample j, end level crossed before sample k
+    l0 = np.where(rising, low[r], high[r])
+    l1 = np.where(rising, high[r], low[r])
+    t0 = j + (l0 - yf[j]) / (yf[j+1] - yf[j])
+    t1 = (k-1) + (l1 - yf[k-1]) / (yf[k] - yf[k-1])
+
+    # first middle level crossing of the transition
+    above = y >= middle[:, None]
+    rm, im = np.nonzero(above[:, 1:] != above[:, :-1])
+    mid = rm * points + im
+    m = mid[np.searchsorted(mid, j)]
+    tm = m + (middle[r] - yf[m]) / (yf[m+1] - yf[m]) - r * points
+    return r, tm, t1 - t0, rising
+
+def measure_waveform(y, x_increment=1.0, functions=None, low=10, middle=50, high=90):
+    """Compute waveform measurements from sample data on the host
+
+    y is a one dimensional array of samples, or a two dimensional array with
+    one waveform per row, all of which are measured in one pass.  low, middle
+    and high are the reference levels in percent of the amplitude, as for the
+    reference_level attributes.  functions selects the measurement functions
+    (see MeasurementFunction), by default all of them are computed.
+
+    Returns a dict mapping each measurement function to its value, or to an
+    array with one value per row.  Measurements that cannot be made on a
+    waveform, such as the period of a waveform without two edges, are NaN.
+    Samples that are not finite, such as the holes in a trace, are left out.
+    """
+    y = np.asarray(y, dtype=float)
+    single = y.ndim == 1
+    y = np.atleast_2d(y)
+    count, points = y.shape
+    if functions is None:
+        functions = MeasurementFunction
+    for f in functions:
+        if f not in MeasurementFunction:
+            raise ivi.ValueNotSupportedException()
+    x_increment = np.broadcast_to(np.asarray(x_increment, dtype=float), (count,))
+
+    ok = np.isfinite(y)
+    if ok.all():
+        ok = None
+
+    res = dict()
+    if ok is None:
+        res['voltage_max'] = y.max(1)
+        res['voltage_min'] = y.min(1)
+        res['voltage_average'] = y.mean(1)
+        res['voltage_rms'] = np.sqrt(np.einsum('ij,ij->i', y, y) / points)
+    else:
+        y = np.where(ok, y, np.nan)
+        with warnings.catch_warnings():
+            # rows without finite samples are NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            res['voltage_max'] = np.nanmax(y, 1)
+            res['voltage_min'] = np.nanmin(y, 1)
+            res['voltage_average'] = np.nanmean(y, 1)
+            res['voltage_rms'] = np.sqrt(np.nanmean(y*y, 1))
+    res['voltage_peak_to_peak'] = res['voltage_max'] - res['voltage_min']
+    vlow, vhigh = _waveform_levels(y, res['voltage_min'], res['voltage_max'], ok)
+    amp = vhigh - vlow
+    res['voltage_high'] = vhigh
+    res['voltage_low'] = vlow
+    res['amplitude'] = amp
+    with np.errstate(invalid='ignore', divide='ignore'):
+        res['overshoot'] = (res['voltage_max'] - vhigh) / amp * 100
+        res['preshoot'] = (vlow - res['voltage_min']) / amp * 100
+
+    # skip edge detection when only level measurements are requested
+    if set(functions) <= set(res):
+        return _measure_waveform_result(res, functions, single)
+
+    l = vlow + amp * (low / 100.0)
+    m = vlow + amp * (middle / 100.0)
+    h = vlow + amp * (high / 100.0)
+
+    # edges are in order, rising and falling edges alternate on each row;
+    # holes hold the previous sample so that they do not add crossings
+    er, em, et, rising = _waveform_edges(y if ok is None else _fill_holes(y, ok), l, m, h)
+
+    res['rise_time'] = _row_mean(er[rising], et[rising], count) * x_increment
+    res['fall_time'] = _row_mean(er[~rising], et[~rising], count) * x_increment
+
+    # period from edges of the same direction
+    p = er[2:] == er[:-2]
+    res['period'] = _row_mean(er[2:][p], (em[2:] - em[:-2])[p], count) * x_increment
+    with np.errstate(divide='ignore'):
+        res['frequency'] = 1 / res['period']
+
+    # widths from adjacent edges
+    p = er[1:] == er[:-1]
+    w = (em[1:] - em[:-1])
+    pos = p & rising[:-1]
+    neg = p & ~rising[:-1]
+    res['width_positive'] = _row_mean(er[1:][pos], w[pos], count) * x_increment
+    res['width_negative'] = _row_mean(er[1:][neg], w[neg], count) * x_increment
+    res['duty_cycle_positive'] = res['width_positive'] / res['period'] * 100
+    res['duty_cycle_negative'] = res['width_negative'] / res['period'] * 100
+
+    if 'voltage_cycle_average' not in functions and 'voltage_cycle_rms' not in functions:
+        return _measure_waveform_result(res, functions, single)
+
+    # cycle measurements over a whole number of periods, between the first
+    # and last rising edge
+    rr = er[rising]
+    rm = em[rising]
+    first = np.zeros(count, np.intp)
+    final = np.zeros(count, np.intp)
+    nr = np.bincount(rr, minlength=count)
+    if len(rr) > 0:
+        # rising edges are ordered by row, so the first and last of each row
+        # are at the row boundaries
+        end = np.cumsum(nr)
+        have = nr > 0
+        first[have] = np.ceil(rm[(end - nr)[have]])
+        final[have] = np.floor(rm[end[have] - 1]) + 1
+    s1 = np.zeros((count, points + 1))
+    s2 = np.zeros((count, points + 1))
+    rows = np.arange(count)
+    if ok is None:
+        n = (final - first).astype(float)
+    else:
+        y = np.where(ok, y, 0)
+        c = np.zeros((count, points + 1))
+        np.cumsum(ok, axis=1, out=c[:, 1:])
+        n = c[rows, final] - c[rows, first]
+    np.cumsum(y, axis=1, out=s1[:, 1:])
+    np.cumsum(y*y, axis=1, out=s2[:, 1:])
+    n[nr < 2] = np.nan
+    res['voltage_cycle_average'] = (s1[rows, final] - s1[rows, first]) / n
+    res['voltage_cycle_rms'] = np.sqrt((s2[rows, final] - s2[rows, first]) / n)
+
+    return _measure_waveform_result(res, functions, single)
+
+def _measure_waveform_result(res, functions, single):
+    if single:
+        return dict((f, float(res[f][0])) for f in functions)
+    return dict((f, res[f]) for f in functions)
+
+def measure_trace(trace, functions=None, low=10, middle=50, high=90):
+    """Compute waveform measurements from a TraceYT, or a list of TraceYT of equal length
+
+    See measure_waveform.
+    """
+    if isinstance(trace, ivi.TraceY):
+        return measure_waveform(trace.y, trace.x_increment, functions, low, middle, high)
+    return measure_waveform([t.y for t in trace], [t.x_increment for t in trace],
+            functions, low, middle, high)
+
+class WaveformStatistics(object):
+    """Streaming statistics over repeated waveform acquisitions
+
+    Traces are folded in one at a time with add(), or from an iterable with
+    update(), and only per point running statistics are kept, so memory does
+    not grow with the number of acquisitions.  Provides the point by point
+    mean, standard deviation and min/max envelope, and optionally a persistence
+    histogram of x_bins by y_bins counts over y values in histogram_range.
+    """
+    def __init__(self, histogram_bins=None, histogram_range=None):
+        self.histogram_bins = histogram_bins
+        self.histogram_range = histogram_range
+        if histogram_bins is not None and histogram_range is None:
+            raise ivi.ValueNotSupportedException()
+        self.reset()
+
+    def reset(self):
+        "Discard all accumulated data"
+        self.count = 0
+        self._template = None
+        self._mean = None
+        self._m2 = None
+        self._min = None
+        self._max = None
+        self._hist = None
+        self._hist_x = None
+
+    def _convert(self, trace):
+        if isinstance(trace, ivi.TraceY):
+            if self._template is None:
+                self._template = trace
+            y = trace.y
+        else:
+            y = np.asarray(trace, dtype=float)
+        if self._mean is not None and y.shape[-1] != len(self._mean):
+            raise ivi.ValueNotSupportedException()
+        return y
+
+    def add(self, trace):
+        """Fold in a TraceY/TraceYT or array of samples
+
+        A two dimensional array is treated as one acquisition per row.
+        """
+        y = self._convert(trace)
+        if y.ndim == 1:
+            y = y[None, :]
+        k = y.shape[0]
+        if k == 0:
+            return
+
+        if self._mean is None:
+            points = y.shape[1]
+            self._mean = np.zeros(points)
+            self._m2 = np.zeros(points)
+            self._min = np.full(points, np.inf)
+            self._max = np.full(points, -np.inf)
+            if self.histogram_bins is not None:
+                xb, yb = self.histogram_bins
+                self._hist = np.zeros(xb * yb, np.uint64)
+                self._hist_x = (np.arange(points) * xb // points) * yb
+
+        if k == 1:
+            # Welford update
+            y = y[0]
+            self.count += 1
+            delta = y - self._mean
+            self._mean += delta / self.count
+            self._m2 += delta * (y - self._mean)
+            np.minimum(self._min, y, out=self._min)
+            np.maximum(self._max, y, out=self._max)
+        else:
+            # merge statistics of the block (Chan et al.)
+            n = self.count
+            mean = y.mean(0)
+            delta = mean - self._mean
+            self.count += k
+            self._mean += delta * (k / float(self.count))
+            self._m2 += ((y - mean)**2).sum(0) + delta**2 * (n * k / float(self.count))
+            np.minimum(self._min, y.min(0), out=self._min)
+            np.maximum(self._max, y.max(0), out=self._max)
+
+        if self._hist is not None:
+            yb = self.histogram_bins[1]
+            lo, hi = self.histogram_range
+            yi = np.floor((y - lo) * (yb / float(hi - lo)))
+            ok = (yi >= 0) & (yi < yb)
+            ind = (self._hist_x + np.where(ok, yi, 0).astype(np.intp))[ok]
+            self._hist += np.bincount(ind, minlength=len(self._hist)).astype(np.uint64)
+
+    def update(self, traces):
+        """Fold in all traces from an iterable
+
+        With a waveform loop, the next acquisition is already running while a
+        trace is folded in, for example:
+
+        stats.update(t[0] for t in scope.measurement.read_waveform_loop('channel1', 1000))
+        """
+        for trace in traces:
+            self.add(trace)
+        return self
+
+    def acquire(self, fetch, count):
+        """Fold in count traces returned by calling fetch
+
+        Each call to fetch is made in a separate thread while the previous
+        trace is folded in, so the accumulation overlaps the next acquisition
+        and transfer.  Example:
+
+        stats.acquire(lambda: scope.channels[0].measurement.read_waveform(1000), 100)
+        """
+        result = list()
+
+        def worker():
+            try:
+                result.append(fetch())
+            except Exception as e:
+                result.append(e)
+
+        for i in range(count):
+            if i == 0:
+                worker()
+            else:
+                t.join()
+            trace = result.pop()
+            if isinstance(trace, Exception):
+                raise trace
+            if i < count - 1:
+                t = threading.Thread(target=worker)
+                t.daemon = True
+                t.start()
+            self.add(trace)
+        return self
+
+    def _trace(self, y):
+        if y is None:
+            return None
+        trace = ivi.TraceYT()
+        trace.y_increment = 1
+        trace.y_raw = y
+        if isinstance(self._template, ivi.TraceYT):
+            trace.x_increment = self._template.x_increment
+            trace.x_origin = self._template.x_origin
+            trace.x_reference = self._template.x_reference
+        return trace
+
+    @property
+    def mean(self):
+        "Point by point mean as a TraceYT"
+        return self._trace(None if self._mean is None else self._mean.copy())
+
+    @property
+    def variance(self):
+        "Point by point sample variance as a TraceYT"
+        if self._m2 is None or self.count < 2:
+            return None
+        return self._trace(self._m2 / (self.count - 1))
+
+    @property
+    def std(self):
+        "Point by point sample standard deviation as a TraceYT"
+        var = self.variance
+        if var is not None:
+            var.y_raw = np.sqrt(var.y_raw)
+        return var
+
+    @property
+    def min(self):
+        "Lower envelope as a TraceYT"
+        return self._trace(None if self._min is None else self._min.copy())
+
+    @property
+    def max(self):
+        "Upper envelope as a TraceYT"
+        return self._trace(None if self._max is None else self._max.copy())
+
+    @property
+    def histogram(self):
+        "Persistence histogram as an array of x_bins by y_bins counts"
+        if self._hist is None:
+            return None
+        return self._hist.reshape(self.histogram_bins).copy()
+
 class Base(ivi.IviContainer):
     "Base IVI methods for all oscilloscopes"
     
@@ -318,6 +750,14 @@ class Base(ivi.IviContainer):
                         end-user uses the low-level functions to optimize one or more aspects of
                         interaction with the instrument. Call the Error Query function at the
                         conclusion of the sequence to check the instrument status.
+                        
+                        The optional start and stop parameters select a window of the record by
+                        point index (zero based, stop exclusive), and max_points limits the
+                        number of points returned by decimating the window. Drivers use the
+                        native windowing and decimation of the instrument where available so
+                        that only the requested points are transferred, and fall back on
+                        windowing on the host otherwise. The time axis of the returned trace
+                        always refers to the selected points.
                         """, cls, grp, '4.3.13'))
         self._add_method('channels[].measurement.read_waveform',
                         self._measurement_read_waveform,
@@ -746,13 +1186,13 @@ class Base(ivi.IviContainer):
         self._set_trigger_type(type)
         self._set_trigger_holdoff(holdoff)
     
-    def _measurement_fetch_waveform(self, index):
+    def _measurement_fetch_waveform(self, index, start=None, stop=None, max_points=None):
         index = ivi.get_index(self._channel_name, index)
         data = list()
         return data
     
-    def _measurement_read_waveform(self, index, maximum_time):
-        return self._measurement_fetch_waveform(index)
+    def _measurement_read_waveform(self, index, maximum_time, start=None, stop=None, max_points=None):
+        return self._measurement_fetch_waveform(index, start, stop, max_points)
     
     def _measurement_initiate(self):
         pass
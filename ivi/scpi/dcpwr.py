@@ -24,6 +24,8 @@ THE SOFTWARE.
 
 """
 
+import numpy as np
+
 from .. import ivi
 from .. import dcpwr
 from .. import extra
@@ -340,6 +342,70 @@ class Base(common.IdnCommand, common.ErrorQuery, common.Reset, common.SelfTest,
             if self._output_count > 1:
                 self._write("instrument:nselect %d" % (index+1))
             self._write("source:voltage:protection:clear")
+    
+    def _output_configure_values(self, index, voltage=None, current=None, ovp=None, enabled=None):
+        "Check configure parameters against the output spec, return (voltage, current, ovp, enabled)"
+        spec = self._output_spec[index]
+        if voltage is not None:
+            voltage = float(voltage)
+            vmin, vmax = self._output_voltage_range(index)
+            if voltage < vmin or voltage > vmax:
+                raise ivi.OutOfRangeException()
+        if current is not None:
+            current = float(current)
+            if current < 0 or current > spec['current_max']:
+                raise ivi.OutOfRangeException()
+        if ovp is not None:
+            ovp = float(ovp)
+            vmin, vmax = sorted((0, spec['ovp_max']))
+            if ovp < vmin or ovp > vmax:
+                raise ivi.OutOfRangeException()
+        if enabled is not None:
+            enabled = bool(enabled)
+        return voltage, current, ovp, enabled
+    
+    def _output_configure_commands(self, index, voltage, current, ovp, enabled):
+        "Return commands setting the given values on an output"
+        cmd = list()
+        if self._output_count > 1:
+            cmd.append("instrument:nselect %d" % (index+1))
+        if ovp is not None:
+            cmd.append("source:voltage:protection:level %.6f" % ovp)
+        if current is not None:
+            cmd.append("source:current:level %.6f" % current)
+        if voltage is not None:
+            cmd.append("source:voltage:level %.6f" % voltage)
+        if enabled is not None:
+            cmd.append("output %s" % self._get_bool_str(enabled))
+        return cmd
+    
+    def _configure_outputs(self, items):
+        "Configure outputs from a list of (index, parameters) in a single write"
+        # check everything before sending anything
+        items = [(index, self._output_configure_values(index, **kwargs)) for index, kwargs in items]
+        if not self._driver_operation_simulate:
+            cmd = list()
+            for index, values in items:
+                cmd.extend(self._output_configure_commands(index, *values))
+            if cmd:
+                self._write(';:'.join(cmd))
+        
+        # update cache in bulk, enabling an output can affect the others
+        if any(values[3] is not None for index, values in items):
+            for k in range(self._output_count):
+                self._set_cache_valid(False, 'output_enabled', k)
+        for index, values in items:
+            for name, value in zip(('voltage_level', 'current_limit', 'ovp_limit', 'enabled'), values):
+                if value is not None:
+                    getattr(self, '_output_' + name)[index] = value
+                    self._set_cache_valid(True, 'output_' + name, index)
+    
+    def _output_configure(self, index, voltage=None, current=None, ovp=None, enabled=None):
+        index = ivi.get_index(self._output_name, index)
+        self._configure_outputs([(index, dict(voltage=voltage, current=current, ovp=ovp, enabled=enabled))])
+    
+    def _configure_many(self, settings):
+        self._configure_outputs(self._configure_many_settings(settings))
 
 class OCP(extra.dcpwr.OCP):
 
@@ -399,6 +465,39 @@ class OCP(extra.dcpwr.OCP):
             self._write("source:voltage:protection:clear")
             self._write("source:current:protection:clear")
 
+class List(extra.dcpwr.List):
+    "SCPI LIST subsystem, stepped by the transient system on each trigger"
+    
+    def _set_output_list_enabled(self, index, value):
+        index = ivi.get_index(self._output_name, index)
+        value = bool(value)
+        mode = 'list' if value else 'fixed'
+        if not self._driver_operation_simulate:
+            cmd = list()
+            if self._output_count > 1:
+                cmd.append("instrument:nselect %d" % (index+1))
+            cmd.append("source:voltage:mode %s" % mode)
+            cmd.append("source:current:mode %s" % mode)
+            self._write(';:'.join(cmd))
+        self._output_list_enabled[index] = value
+        # levels change as the list runs
+        self._set_cache_valid(False, 'output_voltage_level', index)
+        self._set_cache_valid(False, 'output_current_limit', index)
+    
+    def _output_list_load(self, index, voltage=None, current=None, dwell=None, count=1):
+        index = ivi.get_index(self._output_name, index)
+        voltage, current, dwell = self._output_list_validate(index, voltage, current, dwell, count)
+        if not self._driver_operation_simulate:
+            cmd = list()
+            if self._output_count > 1:
+                cmd.append("instrument:nselect %d" % (index+1))
+            cmd.append("list:voltage %s" % ','.join(np.char.mod('%.6f', voltage)))
+            cmd.append("list:current %s" % ','.join(np.char.mod('%.6f', current)))
+            cmd.append("list:dwell %s" % ','.join(np.char.mod('%.6g', dwell)))
+            cmd.append("list:count %d" % int(count))
+            self._write(';:'.join(cmd))
+        self._output_list_points[index] = len(dwell)
+
 class Trigger(dcpwr.Trigger):
     def _get_output_trigger_source(self, index):
         index = ivi.get_index(self._output_name, index)
@@ -516,3 +615,21 @@ class Measurement(dcpwr.Measurement):
                     self._write("instrument:nselect %d" % (index+1))
                 return float(self._ask("measure:current?"))
         return 0
+    
+    def _measurement_measure_all_commands(self, types):
+        "Return queries measuring types on every output, in order"
+        cmd = list()
+        for index in range(self._output_count):
+            if self._output_count > 1:
+                cmd.append("instrument:nselect %d" % (index+1))
+            cmd.extend("measure:%s?" % t for t in types)
+        return cmd
+    
+    def _measurement_measure_all(self, types=('voltage', 'current')):
+        types = self._measurement_measure_all_types(types)
+        if self._driver_operation_simulate:
+            return np.zeros((self._output_count, len(types)))
+        # all queries in one message, the responses come back separated by ';'
+        resp = self._ask(';:'.join(self._measurement_measure_all_commands(types)))
+        values = np.array(resp.replace(';', ',').split(','), dtype=float)
+        return values.reshape(self._output_count, len(types))
@@ -24,6 +24,8 @@ THE SOFTWARE.
 
 """
 
+import numpy as np
+
 from . import ivi
 
 # Exceptions
@@ -37,6 +39,167 @@ TraceType = set(['clear_write', 'maximum_hold', 'minimum_hold', 'video_average',
 VerticalScale = set(['linear', 'logarithmic'])
 AcquisitionStatus = set(['complete', 'in_progress', 'unknown'])
 
+def _trace_xy(trace):
+    "Return (x, y) arrays of a TraceY/TraceYT or array, x is the sample index for a TraceY or array"
+    if isinstance(trace, ivi.TraceYT):
+        return trace.x, trace.y
+    if isinstance(trace, ivi.TraceY):
+        y = trace.y
+    else:
+        y = np.asarray(trace, dtype=float)
+    return np.arange(y.shape[-1]), y
+
+def _x_index(x, value):
+    "Index of the point of axis x nearest to value"
+    return int(np.abs(x - value).argmin())
+
+def _window_tables(a, op):
+    "Array of op over the last 2**k elements up to each index, one row per k"
+    t = [a]
+    w = 1
+    while w < len(a):
+        p = t[-1]
+        q = p.copy()
+        q[w:] = op(p[w:], p[:-w])
+        t.append(q)
+        w *= 2
+    return np.array(t)
+
+def _peak_bases(v, seg):
+    """Lowest point back to the nearest higher peak for each peak
+
+    v are the peak heights and seg[i] the lowest point between peak i-1 and
+    peak i.  The nearest higher peak is found by binary lifting on a table of
+    running maxima, and the lowest point by a range minimum query, so the
+    search takes log2(len(v)) array operations.
+    """
+    n = len(v)
+    vmax = _window_tables(v, np.maximum)
+    # skip blocks of peaks that are not higher, largest blocks first
+    j = np.arange(n) - 1
+    for k in range(len(vmax)-1, -1, -1):
+        skip = (j >= 0) & (vmax[k, np.maximum(j, 0)] <= v)
+        j = np.where(skip, np.maximum(j - (1 << k), -1), j)
+    # minimum of seg[j+1..i] from two overlapping blocks of 2**k
+    i = np.arange(n)
+    k = np.floor(np.log2(i - j)).astype(int)
+    segmin = _window_tables(seg, np.minimum)
+    return np.minimum(segmin[k, i], segmin[k, j + (1 << k)])
+
+def find_peaks(y, count=None, excursion=6.0, threshold=None):
+    """Find peaks in trace data on the host
+
+    A peak is a local maximum that is at least excursion above the highest of
+    the lowest points on either side of it before a higher peak or the end of
+    the trace is reached, and at least threshold when threshold is given.
+    The index of a flat peak is its first sample.
+
+    Returns the indices of the count highest peaks, highest first.
+    """
+    y = np.asarray(y, dtype=float)
+    d = np.sign(np.diff(y))
+    nz = np.flatnonzero(d)
+    s = d[nz]
+    # local maxima where the slope changes from rising to falling, on
+    # plateaus the first sample after the rising step
+    ch = np.flatnonzero((s[:-1] > 0) & (s[1:] < 0))
+    peaks = nz[ch] + 1
+    if len(peaks) == 0:
+        return peaks
+
+    # lowest point between adjacent local maxima and the trace ends
+    seg = np.minimum.reduceat(y, np.concatenate(([0], peaks)))
+    v = y[peaks]
+
+    left = _peak_bases(v, seg[:-1])
+    right = _peak_bases(v[::-1], seg[:0:-1])[::-1]
+    ok = v - np.maximum(left, right) >= excursion
+    if threshold is not None:
+        ok &= v >= threshold
+    peaks = peaks[ok]
+    peaks = peaks[np.argsort(-y[peaks], kind='stable')]
+    if count is not None:
+        peaks = peaks[:count]
+    return peaks
+
+def peak_search(trace, count=1, excursion=6.0, threshold=None):
+    """Search for the count highest peaks of a trace
+
+    trace is a TraceY/TraceYT or an array of amplitudes; a list of traces or
+    a two dimensional array is searched trace by trace.  See find_peaks.
+
+    Returns a numpy record array with the fields index, x and y of the peaks,
+    highest first, or a list of them for several traces.  x is the frequency
+    for a TraceYT and the index otherwise.
+    """
+    if isinstance(trace, list) or (isinstance(trace, np.ndarray) and trace.ndim == 2):
+        return [peak_search(t, count, excursion, threshold) for t in trace]
+    x, y = _trace_xy(trace)
+    i = find_peaks(y, count, excursion, threshold)
+    return np.rec.fromarrays([i, x[i].astype(float), y[i]], names='index,x,y')
+
+def next_peak(trace, x, direction='lower', excursion=6.0, threshold=None):
+    """Find the peak next to the marker at x
+
+    direction 'lower' returns the highest peak below the marker amplitude,
+    'left' and 'right' the nearest peak to that side of the marker.
+
+    Returns (x, y) of the peak, or None if there is no such peak.
+    """
+    tx, y = _trace_xy(trace)
+    i = _x_index(tx, x)
+    peaks = find_peaks(y, None, excursion, threshold)
+    if direction == 'lower':
+        peaks = peaks[y[peaks] < y[i]]
+    elif direction == 'left':
+        peaks = peaks[peaks < i]
+        peaks = peaks[np.argsort(-peaks)]
+    elif direction == 'right':
+        peaks = peaks[peaks > i]
+        peaks = np.sort(peaks)
+    else:
+        raise ivi.ValueNotSupportedException()
+    if len(peaks) == 0:
+        return None
+    return tx[peaks[0]], y[peaks[0]]
+
+def delta_marker(trace, reference_x, x):
+    "Return (delta x, delta amplitude) of the marker at x relative to the marker at reference_x"
+    tx, y = _trace_xy(trace)
+    i = _x_index(tx, x)
+    r = _x_index(tx, reference_x)
+    return tx[i] - tx[r], y[..., i] - y[..., r]
+
+def band_power(trace, start, stop, resolution_bandwidth, noise_bandwidth=1.0):
+    """Integrate the power of a dBm trace between frequencies start and stop
+
+    The power of each point is scaled by the point spacing over the noise
+    bandwidth of the resolution filter, resolution_bandwidth times
+    noise_bandwidth.  Works on a two dimensional array of traces sharing the
+    same axis, returning one value per trace.
+
+    Returns the band power in dBm.
+    """
+    x, y = _trace_xy(trace)
+    m = (x >= min(start, stop)) & (x <= max(start, stop))
+    if len(x) < 2 or not m.any():
+        raise ivi.OutOfRangeException()
+    p = (10**(y[..., m] / 10)).sum(-1) * abs(x[1] - x[0]) / (resolution_bandwidth * noise_bandwidth)
+    return 10 * np.log10(p)
+
+def noise_marker(trace, x, resolution_bandwidth, width=5, noise_bandwidth=1.128):
+    """Noise density at x in dBm/Hz
+
+    Averages the power of width points around x and normalizes it to a 1 Hz
+    bandwidth using the noise bandwidth of the resolution filter,
+    resolution_bandwidth times noise_bandwidth.
+    """
+    tx, y = _trace_xy(trace)
+    i = _x_index(tx, x)
+    lo = max(0, i - width // 2)
+    p = (10**(y[..., lo:lo+width] / 10)).mean(-1)
+    return 10 * np.log10(p / (resolution_bandwidth * noise_bandwidth))
+
 class Base(ivi.IviContainer):
     "Base IVI methods for all spectrum analyzers"
     
@@ -30,6 +30,7 @@ from numpy import *
 
 from .. import ivi
 from .. import fgen
+from .. import extra
 
 StandardWaveformMapping = {
         'sine': 'sin',
@@ -42,7 +43,7 @@ StandardWaveformMapping = {
 
 class tektronixAWG2000(ivi.Driver, fgen.Base, fgen.StdFunc, fgen.ArbWfm,
                 fgen.ArbSeq, fgen.SoftwareTrigger, fgen.Burst,
-                fgen.ArbChannelWfm):
+                fgen.ArbChannelWfm, extra.fgen.ArbitraryWaveformCache):
     "Tektronix AWG2000 series arbitrary waveform generator driver"
     
     def __init__(self, *args, **kwargs):
@@ -57,11 +58,17 @@ class tektronixAWG2000(ivi.Driver, fgen.Base, fgen.StdFunc, fgen.ArbWfm,
         self._arbitrary_waveform_size_max = 256*1024
         self._arbitrary_waveform_size_min = 64
         self._arbitrary_waveform_quantum = 8
+        self._arbitrary_waveform_memory_size = 1024*1024
         
         self._arbitrary_sequence_number_sequences_max = 0
-        self._arbitrary_sequence_loop_count_max = 0
-        self._arbitrary_sequence_length_max = 0
-        self._arbitrary_sequence_length_min = 0
+        self._arbitrary_sequence_loop_count_max = 65536
+        self._arbitrary_sequence_length_max = 8000
+        self._arbitrary_sequence_length_min = 1
+        
+        # sequence handle -> waveform handles it plays
+        self._arbitrary_sequences = dict()
+        # content key -> sequence handle
+        self._arbitrary_sequence_cache = dict()
         
         self._catalog_names = list()
         
@@ -168,7 +175,7 @@ class tektronixAWG2000(ivi.Driver, fgen.Base, fgen.StdFunc, fgen.ArbWfm,
         if not self._driver_operation_simulate:
             self._write("*TST?")
             # wait for test to complete
-            time.sleep(60)
+            self._wait_for_response(60)
             code = int(self._read())
             if code != 0:
                 message = "Self test failed"
@@ -201,6 +208,24 @@ class tektronixAWG2000(ivi.Driver, fgen.Base, fgen.StdFunc, fgen.ArbWfm,
             l = [s.strip('"') for s in l]
             self._catalog = [l[i:i+3] for i in range(0, len(l), 3)]
             self._catalog_names = [l[0] for l in self._catalog]
+        self._set_cache_valid(True, 'catalog')
+    
+    def _get_catalog_names(self):
+        # the catalog is read once, then kept up to date as files are
+        # created and deleted
+        if not self._get_cache_valid('catalog'):
+            self._load_catalog()
+        return self._catalog_names
+    
+    def _arbitrary_waveform_exists(self, handle):
+        return handle in self._get_catalog_names()
+    
+    def _arbitrary_waveform_in_use(self):
+        # waveforms played by a sequence must stay in memory
+        in_use = set(self._output_arbitrary_waveform)
+        for handles in self._arbitrary_sequences.values():
+            in_use.update(handles)
+        return in_use
     
     def _get_output_operation_mode(self, index):
         index = ivi.get_index(self._output_name, index)
@@ -424,8 +449,7 @@ class tektronixAWG2000(ivi.Driver, fgen.Base, fgen.StdFunc, fgen.ArbWfm,
         if ext != 'wfm':
             raise ivi.ValueNotSupportedException()
         # waveform must exist on arb
-        self._load_catalog()
-        if value not in self._catalog_names:
+        if value not in self._get_catalog_names():
             raise ivi.ValueNotSupportedException()
         if not self._driver_operation_simulate:
             self._write(":ch%d:waveform \"%s\"" % (index+1, value))
@@ -458,25 +482,20 @@ class tektronixAWG2000(ivi.Driver, fgen.Base, fgen.StdFunc, fgen.ArbWfm,
         return self._arbitrary_waveform_quantum
     
     def _arbitrary_waveform_clear(self, handle):
-        pass
+        handle = str(handle).lower()
+        if handle in self._arbitrary_waveform_in_use():
+            raise fgen.WaveformInUseException()
+        self._arbitrary_waveform_delete(handle)
+    
+    def _arbitrary_waveform_delete(self, handle):
+        if not self._driver_operation_simulate:
+            self._write(":memory:delete \"%s\"" % handle)
+        if handle in self._get_catalog_names():
+            self._catalog_names.remove(handle)
+        self._arbitrary_waveform_cache_forget(handle)
     
     def _arbitrary_waveform_create(self, data):
-        y = None
-        x = None
-        if type(data) == list and type(data[0]) == float:
-            # list
-            y = array(data)
-        elif type(data) == ndarray and len(data.shape) == 1:
-            # 1D array
-            y = data
-        elif type(data) == ndarray and len(data.shape) == 2 and data.shape[0] == 1:
-            # 2D array, hieght 1
-            y = data[0]
-        elif type(data) == ndarray and len(data.shape) == 2 and data.shape[1] == 1:
-            # 2D array, width 1
-            y = data[:,0]
-        else:
-            x, y = ivi.get_sig(data)
+        x, y = fgen.get_waveform(data)
         
         if x is None:
             x = arange(0,len(y)) / 10e6
@@ -486,13 +505,24 @@ class tektronixAWG2000(ivi.Driver, fgen.Base, fgen.StdFunc, fgen.ArbWfm,
         
         xincr = ivi.rms(diff(x))
         
+        # clip at -1 and 1, scale to 12 bits, MSB first
+        block = fgen.build_waveform_block(y, ':curve ', bits=12, full_scale=(1 << 12) - 2)
+        
+        # reuse identical waveform if already uploaded
+        key = self._arbitrary_waveform_cache_key(block, 12, 'rp', 2, 'msb', xincr)
+        handle = self._arbitrary_waveform_cache_lookup(key)
+        if handle is not None:
+            return handle
+        
+        self._arbitrary_waveform_cache_reserve(len(y))
+        
         # get unused handle
-        self._load_catalog()
+        catalog = self._get_catalog_names()
         have_handle = False
         while not have_handle:
             self._arbitrary_waveform_n += 1
             handle = "w%04d.wfm" % self._arbitrary_waveform_n
-            have_handle = handle not in self._catalog_names
+            have_handle = handle not in catalog
         self._write(":data:destination \"%s\"" % handle)
         self._write(":wfmpre:bit_nr 12")
         self._write(":wfmpre:bn_fmt rp")
@@ -504,22 +534,10 @@ class tektronixAWG2000(ivi.Driver, fgen.Base, fgen.StdFunc, fgen.ArbWfm,
         self._write(":wfmpre:ymult %e" % (2/(1<<12)))
         self._write(":wfmpre:xincr %e" % xincr)
         
-        raw_data = b''
+        self._write_raw(block)
         
-        for f in y:
-            # clip at -1 and 1
-            if f > 1.0: f = 1.0
-            if f < -1.0: f = -1.0
-            
-            f = (f + 1) / 2
-            
-            # scale to 12 bits
-            i = int(f * ((1 << 12) - 2) + 0.5) & 0x000fffff
-            
-            # add to raw data, MSB first
-            raw_data = raw_data + struct.pack('>H', i)
-        
-        self._write_ieee_block(raw_data, ':curve ')
+        catalog.append(handle)
+        self._arbitrary_waveform_cache_store(key, handle, len(y))
         
         return handle
     
@@ -536,16 +554,85 @@ class tektronixAWG2000(ivi.Driver, fgen.Base, fgen.StdFunc, fgen.ArbWfm,
         return self._arbitrary_sequence_length_min
     
     def _arbitrary_clear_memory(self):
-        pass
+        # removes everything, including waveforms and sequences in use
+        for handle in list(self._arbitrary_sequences.keys()):
+            self._arbitrary_sequence_delete(handle)
+        for handle in self._arbitrary_waveform_handles():
+            self._arbitrary_waveform_delete(handle)
     
     def _arbitrary_sequence_clear(self, handle):
-        pass
+        handle = str(handle).lower()
+        if handle in self._output_arbitrary_waveform:
+            raise fgen.SequenceInUseException()
+        self._arbitrary_sequence_delete(handle)
+    
+    def _arbitrary_sequence_delete(self, handle):
+        if not self._driver_operation_simulate:
+            self._write(":memory:delete \"%s\"" % handle)
+        if handle in self._get_catalog_names():
+            self._catalog_names.remove(handle)
+        self._arbitrary_sequences.pop(handle, None)
+        for key in [k for k, v in self._arbitrary_sequence_cache.items() if v == handle]:
+            del self._arbitrary_sequence_cache[key]
     
     def _arbitrary_sequence_configure(self, index, handle, gain, offset):
-        pass
+        index = ivi.get_index(self._output_name, index)
+        handle = str(handle).lower()
+        if handle.split('.').pop() != 'seq' or handle not in self._get_catalog_names():
+            raise ivi.ValueNotSupportedException()
+        if not self._driver_operation_simulate:
+            self._write(":ch%d:waveform \"%s\"" % (index+1, handle))
+        self._output_arbitrary_waveform[index] = handle
+        self._set_cache_valid(True, 'output_arbitrary_waveform', index)
+        self._set_output_arbitrary_gain(index, gain)
+        self._set_output_arbitrary_offset(index, offset)
     
     def _arbitrary_sequence_create(self, handle_list, loop_count_list):
-        return "handle"
+        handle_list = [str(h).lower() for h in handle_list]
+        loop_count_list = [int(n) for n in loop_count_list]
+        
+        if len(handle_list) != len(loop_count_list):
+            raise ivi.ValueNotSupportedException()
+        if not self._arbitrary_sequence_length_min <= len(handle_list) <= self._arbitrary_sequence_length_max:
+            raise ivi.OutOfRangeException()
+        for n in loop_count_list:
+            if not 1 <= n <= self._arbitrary_sequence_loop_count_max:
+                raise ivi.OutOfRangeException()
+        catalog = self._get_catalog_names()
+        for h in handle_list:
+            if h.split('.').pop() != 'wfm' or h not in catalog:
+                raise ivi.ValueNotSupportedException()
+        
+        # sequence file, one line per step with waveform and repeat count
+        lines = ["MAGIC 3001", "LINES %d" % len(handle_list)]
+        lines.extend("\"%s\",%d" % (h, n) for h, n in zip(handle_list, loop_count_list))
+        raw_data = ('\r\n'.join(lines) + '\r\n').encode('utf-8')
+        
+        # reuse identical sequence if already uploaded
+        key = self._arbitrary_waveform_cache_key(raw_data, 'seq')
+        handle = self._arbitrary_sequence_cache.get(key)
+        if self._arbitrary_waveform_cache_enabled and handle in catalog:
+            return handle
+        
+        if (self._arbitrary_sequence_number_sequences_max > 0 and
+                len(self._arbitrary_sequences) >= self._arbitrary_sequence_number_sequences_max):
+            raise ivi.OutOfRangeException()
+        
+        # get unused handle
+        have_handle = False
+        while not have_handle:
+            self._arbitrary_sequence_n += 1
+            handle = "s%04d.seq" % self._arbitrary_sequence_n
+            have_handle = handle not in catalog
+        
+        self._write_ieee_block(raw_data, ':memory:data "%s",' % handle)
+        
+        catalog.append(handle)
+        self._arbitrary_sequences[handle] = handle_list
+        if self._arbitrary_waveform_cache_enabled:
+            self._arbitrary_sequence_cache[key] = handle
+        
+        return handle
     
     def send_software_trigger(self):
         if not self._driver_operation_simulate:
@@ -168,6 +168,8 @@ class tektronixBaseScope(scpi.common.IdnCommand, scpi.common.Reset, scpi.common.
                          scope.ContinuousAcquisition, scope.AverageAcquisition,
                          scope.TriggerModifier, scope.AutoSetup,
                          extra.common.Screenshot,
+                         extra.scope.WaveformPreambleCache, extra.scope.WaveformConversion,
+                         extra.scope.WaveformMeasurementBatch,
                          ivi.Driver):
     "Tektronix generic IVI oscilloscope driver"
 
@@ -485,12 +487,9 @@ class tektronixBaseScope(scpi.common.IdnCommand, scpi.common.Reset, scpi.common.
             self._write("diag:loop:option once")
             self._write("diag:state execute")
             # wait for test to complete
-            res = ''
-            while 1:
-                res = self._ask("diag:result:flag?").strip('"').lower()
-                if res != 'in progress':
-                    break
-                time.sleep(5)
+            res = self._ask_until("diag:result:flag?",
+                    lambda r: r.strip('"').lower() != 'in progress', 600, (0.5, 5))
+            res = res.strip('"').lower()
             code = 0 if res == 'pass' else 1
             if code != 0:
                 message = "Self test failed"
@@ -1288,7 +1287,7 @@ class tektronixBaseScope(scpi.common.IdnCommand, scpi.common.Reset, scpi.common.
     def _set_trigger_ac_line_slope(self, value):
         self._set_trigger_edge_slope(value)
 
-    def _measurement_fetch_waveform(self, index):
+    def _measurement_fetch_waveform(self, index, start=None, stop=None, max_points=None):
         index = ivi.get_index(self._channel_name, index)
 
         if self._driver_operation_simulate:
@@ -1297,14 +1296,17 @@ class tektronixBaseScope(scpi.common.IdnCommand, scpi.common.Reset, scpi.common.
         self._write(":data:source %s" % self._channel_name[index])
         self._write(":data:encdg fastest")
         self._write(":data:width 2")
-        self._write(":data:start 1")
-        self._write(":data:stop 1e10")
+        self._write(":data:start %d" % (int(start or 0) + 1))
+        if stop is None:
+            self._write(":data:stop 1e10")
+        else:
+            self._write(":data:stop %d" % int(stop))
 
 
         trace = ivi.TraceYT()
 
         # Read preamble
-        pre = self._ask(":wfmoutpre?").split(';')
+        pre = self._ask_for_waveform_preamble((index, start, stop), ":wfmoutpre?", ';')
 
 
         acq_format = pre[7].strip().upper()
@@ -1321,11 +1323,38 @@ class tektronixBaseScope(scpi.common.IdnCommand, scpi.common.Reset, scpi.common.
         trace.y_origin = float(pre[16])
 
         if acq_format != 'Y':
-            raise UnexpectedResponseException()
+            raise ivi.UnexpectedResponseException()
 
         if point_enc != 'BINARY':
-            raise UnexpectedResponseException()
+            raise ivi.UnexpectedResponseException()
+
+        if self._measurement_waveform_dtype is not None:
+            if point_fmt not in ('RP', 'RI', 'FP') or point_size not in (1, 2, 4):
+                raise ivi.UnexpectedResponseException()
+
+            if point_fmt == 'FP':
+                trace.y_increment = 1
+                trace.y_reference = 0
+                trace.y_origin = 0
+
+            # numpy handles the byte order, so no byteswap is needed
+            dtype = '%s%s%d' % ('<' if byte_order == 'LSB' else '>',
+                    {'RP': 'u', 'RI': 'i', 'FP': 'f'}[point_fmt], point_size)
+
+            self._write(":curve?")
+            self._read_waveform_block_converted(trace, dtype, points)
+            self._read_raw() # flush buffer
+        else:
+            self._measurement_fetch_curve(trace, points, point_size, point_fmt, byte_order)
+
+        # preamble describes the selected window, decimate on the host
+        start, stop, step = scope.get_waveform_window(len(trace.y_raw), None, None, max_points)
+        if step > 1:
+            scope.window_trace(trace, 0, None, step)
 
+        return trace
+
+    def _measurement_fetch_curve(self, trace, points, point_size, point_fmt, byte_order):
         # Read waveform data
         raw_data = self._ask_for_ieee_block(":curve?")
         self._read_raw() # flush buffer
@@ -1345,15 +1374,13 @@ class tektronixBaseScope(scpi.common.IdnCommand, scpi.common.Reset, scpi.common.
             trace.y_origin = 0
             trace.y_raw = array.array('f', raw_data[0:points*4])
         else:
-            raise UnexpectedResponseException()
+            raise ivi.UnexpectedResponseException()
 
         if (byte_order == 'LSB') != (sys.byteorder == 'little'):
             trace.y_raw.byteswap()
 
-        return trace
-
-    def _measurement_read_waveform(self, index, maximum_time):
-        return self._measurement_fetch_waveform(index)
+    def _measurement_read_waveform(self, index, maximum_time, start=None, stop=None, max_points=None):
+        return self._measurement_fetch_waveform(index, start, stop, max_points)
 
     def _measurement_initiate(self):
         if not self._driver_operation_simulate:
@@ -1410,7 +1437,7 @@ class tektronixBaseScope(scpi.common.IdnCommand, scpi.common.Reset, scpi.common.
         self._reference_level_middle = value
         self._set_cache_valid()
 
-    def _measurement_fetch_waveform_measurement(self, index, measurement_function, ref_channel = None):
+    def _measurement_waveform_measurement_setup(self, slot, index, measurement_function, ref_channel = None):
         index = ivi.get_index(self._channel_name, index)
         if index < self._analog_channel_count:
             if measurement_function not in MeasurementFunctionMapping:
@@ -1420,15 +1447,27 @@ class tektronixBaseScope(scpi.common.IdnCommand, scpi.common.Reset, scpi.common.
             if measurement_function not in MeasurementFunctionMappingDigital:
                 raise ivi.ValueNotSupportedException()
             func = MeasurementFunctionMappingDigital[measurement_function]
+        cmd = [":measurement:%s:type %s" % (slot, func),
+               ":measurement:%s:source1 %s" % (slot, self._channel_name[index])]
+        if measurement_function in ['ratio', 'phase', 'delay']:
+            if hasattr(ref_channel, 'name'):
+                ref_channel = ref_channel.name
+            ref_index = ivi.get_index(self._channel_name, ref_channel)
+            cmd.append(":measurement:%s:source2 %s" % (slot, self._channel_name[ref_index]))
+        return cmd
+
+    def _measurement_waveform_measurement_query(self, index, measurement_function, ref_channel = None):
+        # set up and read the immediate measurement, which leaves the numbered
+        # front panel measurements alone; commands are executed in order, so
+        # several of these can be chained in one message
+        cmd = self._measurement_waveform_measurement_setup('immed', index, measurement_function, ref_channel)
+        cmd.append(":measurement:immed:value?")
+        return ';'.join(cmd)
+
+    def _measurement_fetch_waveform_measurement(self, index, measurement_function, ref_channel = None):
+        query = self._measurement_waveform_measurement_query(index, measurement_function, ref_channel)
         if not self._driver_operation_simulate:
-            self._write(":measurement:immed:type %s" % func)
-            self._write(":measurement:immed:source1 %s" % self._channel_name[index])
-            if measurement_function in ['ratio', 'phase', 'delay']:
-                if hasattr(ref_channel, 'name'):
-                    ref_channel = ref_channel.name
-                ref_index = ivi.get_index(self._channel_name, ref_channel)
-                self._write(":measurement:immed:source2 %s" % self._channel_name[ref_index])
-            return float(self._ask(":measurement:immed:value?"))
+            return float(self._ask(query))
         return 0
 
     def _measurement_read_waveform_measurement(self, index, measurement_function, maximum_time):
@@ -147,7 +147,7 @@ class tektronixDPO7000(tektronixBaseScope):
         self._acquisition_number_of_points_minimum = value
         self._set_cache_valid()
 
-    def _measurement_fetch_waveform(self, index):
+    def _measurement_fetch_waveform(self, index, start=None, stop=None, max_points=None):
         index = ivi.get_index(self._channel_name, index)
 
         if self._driver_operation_simulate:
@@ -156,28 +156,16 @@ class tektronixDPO7000(tektronixBaseScope):
         self._write(":data:source %s" % self._channel_name[index])
         self._write(":data:encdg fastest")
         self._write(":data:width 2")
-        self._write(":data:start 1")
-        self._write(":data:stop 1e10")
+        self._write(":data:start %d" % (int(start or 0) + 1))
+        if stop is None:
+            self._write(":data:stop 1e10")
+        else:
+            self._write(":data:stop %d" % int(stop))
 
         trace = ivi.TraceYT()
 
         # Read preamble
-        pre = self._ask(":wfmoutpre?").split(';')
-        print "pre = ",self._ask("WFMOutpre?")
-        print "byt_nr", self._ask("WFMOUTpre:BYT_NR?")
-        print "bit_nr", self._ask("WFMOUTpre:BIT_NR?")
-        print "ENCDG", self._ask("WFMOUTpre:ENCDG?")
-        print "BNFMT", self._ask("WFMOUTpre:BN_FMT?")
-        print "BYTOR", self._ask("WFMOUTpre:BYT_OR?")
-        print "NRFMT", self._ask("WFMOUTpre:NR_PT?")
-        print "PTFMT", self._ask("WFMOUTpre:PT_FMT?")
-        print "XINC", self._ask("WFMOUTpre:XINCR?")
-        print "XZERO", self._ask("WFMOUTpre:XZERO?")
-        print "PTOFF", self._ask("WFMOUTpre:PT_OFF?")
-        print "YMULT", self._ask("WFMOUTpre:YMULT?")
-        print "YOFOF", self._ask("WFMOUTpre:YOFF?")
-        print "YZERO", self._ask("WFMOUTpre:YZERO?")
-        print "NR_nr", self._ask("WFMOUTpre:NR_FR?")
+        pre = self._ask_for_waveform_preamble((index, start, stop), ":wfmoutpre?", ';')
         acq_format = pre[7].strip().upper()
         points = int(pre[6])
         point_size = int(pre[0])
@@ -223,6 +211,11 @@ class tektronixDPO7000(tektronixBaseScope):
 
         trace.y_raw.byteswap()
 
+        # preamble describes the selected window, decimate on the host
+        start, stop, step = scope.get_waveform_window(len(trace.y_raw), None, None, max_points)
+        if step > 1:
+            scope.window_trace(trace, 0, None, step)
+
         return trace
 
     def _display_fetch_screenshot(self, format='png', invert=False):
@@ -488,32 +488,16 @@ class tektronixMDOAFG(fgen.Base, fgen.StdFunc, fgen.ArbWfm, fgen.ArbFrequency,
         self._set_output_standard_waveform_frequency(index, value)
 
     def _arbitrary_waveform_create_channel_waveform(self, index, data):
-        y = None
-        x = None
-        if type(data) == list and type(data[0]) == float:
-            # list
-            y = array(data)
-        elif type(data) == np.ndarray and len(data.shape) == 1:
-            # 1D array
-            y = data
-        elif type(data) == np.ndarray and len(data.shape) == 2 and data.shape[0] == 1:
-            # 2D array, hieght 1
-            y = data[0]
-        elif type(data) == np.ndarray and len(data.shape) == 2 and data.shape[1] == 1:
-            # 2D array, width 1
-            y = data[:,0]
-        else:
-            x, y = ivi.get_sig(data)
+        x, y = fgen.get_waveform(data)
 
         if len(y) % self._arbitrary_waveform_quantum != 0:
             raise ivi.ValueNotSupportedException()
 
-        # clip on [-1,1]
-        yc = y.clip(-1, 1)
-
-        raw_data = yc.astype('<f').tobytes()
+        # clip on [-1,1], little endian float
+        block = fgen.build_waveform_block(y, ':%s:arbitrary:emem:points ' % self._output_name[index],
+                encoding='float', byteorder='little')
 
         self._write(':%s:arbitrary:emem:points:encdg binary' % self._output_name[index])
-        self._write_ieee_block(raw_data, ':%s:arbitrary:emem:points ' % self._output_name[index])
+        self._write_raw(block)
 
         return self._output_name[index]
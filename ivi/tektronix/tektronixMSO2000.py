@@ -98,11 +98,11 @@ class tektronixMSO2000(tektronixDPO2000):
         self._trigger_edge_slope = slope
         self._set_cache_valid()
 
-    def _measurement_fetch_waveform(self, index):
+    def _measurement_fetch_waveform(self, index, start=None, stop=None, max_points=None):
         index = ivi.get_index(self._channel_name, index)
 
         if self._driver_operation_simulate:
-            return list()
+            return ivi.TraceYT()
 
         self._write(":wfmoutpre:encdg binary")
         if sys.byteorder == 'little':
@@ -114,33 +114,38 @@ class tektronixMSO2000(tektronixDPO2000):
         self._write(":wfmoutpre:pt_fmt y")
         self._write(":wfmoutpre:domain time")
         self._write(":data:source %s" % self._channel_name[index])
-        self._write(":data:start 1")
-        self._write(":data:stop 1e10")
+        self._write(":data:start %d" % (int(start or 0) + 1))
+        if stop is None:
+            self._write(":data:stop 1e10")
+        else:
+            self._write(":data:stop %d" % int(stop))
+
+        trace = ivi.TraceYT()
 
         # Read preamble
 
-        pre = self._ask(":wfmoutpre?").split(';')
+        pre = self._ask_for_waveform_preamble((index, start, stop), ":wfmoutpre?", ';')
 
-        format = pre[7].strip()
+        acq_format = pre[7].strip()
         points = int(pre[6])
-        xincr = float(pre[9])
-        xzero = float(pre[10])
-        ymult = float(pre[13])
-        yoff = float(pre[14])
-        yzero = int(float(pre[15]))
-
-        if type == 1:
-            raise scope.InvalidAcquisitionTypeException()
+        trace.x_increment = float(pre[9])
+        trace.x_origin = float(pre[10])
+        trace.y_increment = float(pre[13])
+        trace.y_reference = int(float(pre[14]))
+        trace.y_origin = float(pre[15])
 
-        if format != 'Y':
-            raise UnexpectedResponseException()
+        if acq_format != 'Y':
+            raise ivi.UnexpectedResponseException()
 
         # Read waveform data
         raw_data = self._ask_for_ieee_block(":curve?")
 
-        # Split out points and convert to time and voltage pairs
-        y_data = array.array('H', raw_data)
+        # Store in trace object
+        trace.y_raw = array.array('H', raw_data[0:points*2])
 
-        data = [((i * xincr) + xzero, ((y - yoff) * ymult) + yzero) for i, y in enumerate(y_data)]
+        # preamble describes the selected window, decimate on the host
+        start, stop, step = scope.get_waveform_window(len(trace.y_raw), None, None, max_points)
+        if step > 1:
+            scope.window_trace(trace, 0, None, step)
 
-        return data
+        return trace
@@ -0,0 +1,195 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014-2016 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import io
+import unittest
+
+import numpy as np
+
+import ivi
+from .. import tektronixAWG2021
+
+class VirtualAWG2000(object):
+    "Fake AWG2000 with a file catalog"
+    def __init__(self):
+        self.read_buffer = io.BytesIO()
+        self.write_count = 0
+        self.cmd_log = list()
+        self.catalog_queries = 0
+        self.files = {'setup.set': b''}
+        self.destination = None
+        self.waveform = ['', '']
+
+    def write_raw(self, data):
+        self.write_count += 1
+        if data.startswith(b':curve '):
+            self.cmd_log.append(':curve')
+            self.files[self.destination] = ivi.decode_ieee_block(data[7:])
+            return
+        if data.startswith(b':memory:data '):
+            name, block = data[13:].split(b',', 1)
+            self.cmd_log.append(':memory:data')
+            self.files[name.strip(b'"').decode()] = ivi.decode_ieee_block(block)
+            return
+        cmd = data.decode()
+        self.cmd_log.append(cmd)
+        l = cmd.lower().split(' ', 1)
+        if l[0] == '*idn?':
+            self.read_buffer = io.BytesIO(b'SONY/TEK,AWG2021,0,CF:91.1CT FV:1.00\n')
+        elif l[0] == ':memory:catalog:all?':
+            self.catalog_queries += 1
+            cat = ','.join('"%s","WFM",%d' % (k, len(v)) for k, v in self.files.items())
+            self.read_buffer = io.BytesIO((':MEMORY:CATALOG:ALL ' + cat + '\n').encode())
+        elif l[0] == ':data:destination':
+            self.destination = l[1].strip('"')
+        elif l[0] == ':memory:delete':
+            del self.files[l[1].strip('"')]
+        elif l[0].startswith(':ch') and l[0].endswith(':waveform'):
+            self.waveform[int(l[0][3])-1] = l[1].strip('"')
+
+    def read_raw(self, num=-1):
+        return self.read_buffer.read(num)
+
+    def clear(self):
+        pass
+
+
+class TestAWG2000WaveformCache(unittest.TestCase):
+
+    def setUp(self):
+        self.vawg = VirtualAWG2000()
+        self.awg = tektronixAWG2021(self.vawg)
+        t = np.arange(1024)
+        self.waveforms = [np.sin(t * 2 * np.pi * k / 1024) for k in range(1, 6)]
+
+    def test_reuse(self):
+        handles = [self.awg.arbitrary.waveform.create(w) for w in self.waveforms]
+        self.assertEqual(len(set(handles)), 5)
+        self.assertEqual(self.vawg.cmd_log.count(':curve'), 5)
+        # identical samples reuse the uploaded waveform
+        for k in range(3):
+            for w, h in zip(self.waveforms, handles):
+                self.assertEqual(self.awg.arbitrary.waveform.create(w.copy()), h)
+        self.assertEqual(self.vawg.cmd_log.count(':curve'), 5)
+        self.assertEqual(self.vawg.catalog_queries, 1)
+        code = np.frombuffer(self.vawg.files[handles[0]], '>u2')
+        self.assertEqual(code.max(), 4094)
+        self.assertEqual(code.min(), 0)
+
+    def test_catalog_tracking(self):
+        h = self.awg.arbitrary.waveform.create(self.waveforms[0])
+        self.awg.outputs[0].arbitrary.waveform = h
+        self.assertRaises(ivi.fgen.WaveformInUseException, self.awg.arbitrary.waveform.clear, h)
+        self.awg.outputs[0].arbitrary.waveform = self.awg.arbitrary.waveform.create(self.waveforms[1])
+        self.awg.arbitrary.waveform.clear(h)
+        self.assertNotIn(h, self.vawg.files)
+        # cleared waveforms are uploaded again
+        h2 = self.awg.arbitrary.waveform.create(self.waveforms[0])
+        self.assertIn(h2, self.vawg.files)
+        self.assertEqual(self.vawg.catalog_queries, 1)
+        self.assertRaises(ivi.ValueNotSupportedException, setattr,
+                self.awg.outputs[0].arbitrary, 'waveform', h)
+
+    def test_eviction(self):
+        self.awg._arbitrary_waveform_memory_size = 3 * 1024
+        handles = [self.awg.arbitrary.waveform.create(w) for w in self.waveforms[:3]]
+        self.awg.outputs[0].arbitrary.waveform = handles[0]
+        # touch the second waveform, the third is now least recently used
+        # apart from the one on the output
+        self.awg.arbitrary.waveform.create(self.waveforms[1])
+        h = self.awg.arbitrary.waveform.create(self.waveforms[3])
+        self.assertNotIn(handles[2], self.vawg.files)
+        self.assertIn(handles[0], self.vawg.files)
+        self.assertIn(handles[1], self.vawg.files)
+        self.assertIn(h, self.vawg.files)
+
+
+class TestAWG2000Sequence(unittest.TestCase):
+
+    def setUp(self):
+        self.vawg = VirtualAWG2000()
+        self.awg = tektronixAWG2021(self.vawg)
+        t = np.arange(1024)
+        self.waveforms = [np.sin(t * 2 * np.pi * k / 1024) for k in range(1, 4)]
+        self.handles = [self.awg.arbitrary.waveform.create(w) for w in self.waveforms]
+
+    def test_create(self):
+        s = self.awg.arbitrary.sequence.create(self.handles, [1, 10, 100])
+        self.assertEqual(s.split('.').pop(), 'seq')
+        self.assertEqual(self.vawg.cmd_log.count(':memory:data'), 1)
+        lines = self.vawg.files[s].decode().split()
+        self.assertEqual(lines[2:4], ['LINES', '3'])
+        self.assertEqual(lines[4:], ['"%s",%d' % (h, n) for h, n in zip(self.handles, [1, 10, 100])])
+        # identical sequence is not uploaded again
+        self.assertEqual(self.awg.arbitrary.sequence.create(self.handles, [1, 10, 100]), s)
+        self.assertEqual(self.vawg.cmd_log.count(':memory:data'), 1)
+        s2 = self.awg.arbitrary.sequence.create(self.handles[:2], [2, 2])
+        self.assertNotEqual(s2, s)
+        self.assertEqual(self.vawg.catalog_queries, 1)
+
+    def test_validation(self):
+        self.assertRaises(ivi.ValueNotSupportedException,
+                self.awg.arbitrary.sequence.create, self.handles, [1, 1])
+        self.assertRaises(ivi.OutOfRangeException,
+                self.awg.arbitrary.sequence.create, self.handles, [1, 0, 1])
+        self.assertRaises(ivi.OutOfRangeException,
+                self.awg.arbitrary.sequence.create, [], [])
+        self.assertRaises(ivi.ValueNotSupportedException,
+                self.awg.arbitrary.sequence.create, ['nothere.wfm'], [1])
+        self.assertRaises(ivi.ValueNotSupportedException,
+                self.awg.outputs[0].arbitrary.sequence.configure, self.handles[0], 1.0, 0.0)
+
+    def test_configure_clear(self):
+        s = self.awg.arbitrary.sequence.create(self.handles, [1, 2, 3])
+        self.awg.outputs[0].arbitrary.sequence.configure(s, 2.0, 0.5)
+        self.assertEqual(self.vawg.waveform[0], s)
+        self.assertEqual(self.awg.outputs[0].arbitrary.waveform, s)
+        self.assertIn(':ch1:amplitude %e' % 2.0, self.vawg.cmd_log)
+        # neither the sequence nor its waveforms can be cleared while playing
+        self.assertRaises(ivi.fgen.SequenceInUseException, self.awg.arbitrary.sequence.clear, s)
+        self.assertRaises(ivi.fgen.WaveformInUseException, self.awg.arbitrary.waveform.clear, self.handles[1])
+        self.assertIn(s, self.vawg.files)
+        self.awg.outputs[0].arbitrary.configure(self.handles[0], 1.0, 0.0)
+        self.awg.arbitrary.sequence.clear(s)
+        self.assertNotIn(s, self.vawg.files)
+        self.assertRaises(ivi.ValueNotSupportedException,
+                self.awg.outputs[0].arbitrary.sequence.configure, s, 1.0, 0.0)
+        self.awg.arbitrary.clear_memory()
+        self.assertEqual(list(self.vawg.files.keys()), ['setup.set'])
+
+    def test_eviction_keeps_sequence_waveforms(self):
+        self.awg._arbitrary_waveform_memory_size = 4 * 1024
+        s = self.awg.arbitrary.sequence.create(self.handles[:1], [5])
+        self.awg.arbitrary.waveform.create(-self.waveforms[0])
+        t = np.arange(1024)
+        h = self.awg.arbitrary.waveform.create(np.cos(t * 2 * np.pi / 1024))
+        self.assertIn(self.handles[0], self.vawg.files)
+        self.assertNotIn(self.handles[1], self.vawg.files)
+        self.assertIn(h, self.vawg.files)
+        self.assertIn(s, self.vawg.files)
+
+if __name__ == '__main__':
+    unittest.main()
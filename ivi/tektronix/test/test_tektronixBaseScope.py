@@ -0,0 +1,88 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014-2016 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import io
+import unittest
+
+import ivi
+from .. import tektronixDPO4034
+
+class VirtualDPO4000(object):
+    "Fake DPO4000 answering immediate measurements"
+    def __init__(self):
+        self.read_buffer = io.BytesIO()
+        self.write_count = 0
+        self.cmd_log = list()
+        self.immed = dict()
+        self.values = {('frequency', 'ch1'): 1e6, ('pk2pk', 'ch2'): 0.5,
+                ('phase', 'ch2'): 90.0}
+
+    def write_raw(self, data):
+        self.write_count += 1
+        resp = list()
+        for cmd in data.decode().split(';'):
+            cmd = cmd.strip().lstrip(':').lower()
+            self.cmd_log.append(cmd)
+            l = cmd.split(' ', 1)
+            if l[0] == '*idn?':
+                resp.append('TEKTRONIX,DPO4034,0,CF:91.1CT FV:v2.00')
+            elif l[0] in ('measurement:immed:type', 'measurement:immed:source1'):
+                self.immed[l[0].split(':')[-1]] = l[1]
+            elif l[0] == 'measurement:immed:value?':
+                resp.append('%E' % self.values[(self.immed['type'], self.immed['source1'])])
+        if resp:
+            self.read_buffer = io.BytesIO((';'.join(resp) + '\n').encode())
+
+    def read_raw(self, num=-1):
+        return self.read_buffer.read(num)
+
+    def clear(self):
+        pass
+
+
+class TestDPO4000Measurements(unittest.TestCase):
+
+    def setUp(self):
+        self.vsc = VirtualDPO4000()
+        self.sc = tektronixDPO4034(self.vsc)
+
+    def test_fetch_waveform_measurements(self):
+        self.vsc.write_count = 0
+        res = self.sc.measurement.fetch_waveform_measurements([('ch1', 'frequency'),
+                (1, 'voltage_peak_to_peak'), ('ch2', 'phase', 'ch1')])
+        # all measurements in one message
+        self.assertEqual(self.vsc.write_count, 1)
+        self.assertEqual(list(res.value), [1e6, 0.5, 90.0])
+        self.assertEqual(list(res.channel), ['ch1', 'ch2', 'ch2'])
+        self.assertIn('measurement:immed:source2 ch1', self.vsc.cmd_log)
+        # numbered front panel measurements are not touched
+        self.assertFalse([c for c in self.vsc.cmd_log if c.startswith('measurement:meas')])
+
+    def test_fetch_waveform_measurement(self):
+        self.assertEqual(self.sc.channels[1].measurement.fetch_waveform_measurement('voltage_peak_to_peak'), 0.5)
+
+if __name__ == '__main__':
+    unittest.main()
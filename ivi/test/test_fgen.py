@@ -0,0 +1,111 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014-2016 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+import ivi
+from ivi import fgen
+
+class TestGetWaveform(unittest.TestCase):
+
+    def test_inputs(self):
+        y = np.linspace(-1, 1, 16)
+        self.assertIsNone(fgen.get_waveform(y)[0])
+        self.assertTrue(np.shares_memory(fgen.get_waveform(y)[1], y))
+        self.assertTrue(np.shares_memory(fgen.get_waveform(y.reshape(1, 16))[1], y))
+        self.assertTrue(np.shares_memory(fgen.get_waveform(y.reshape(16, 1))[1], y))
+        self.assertTrue(np.shares_memory(fgen.get_waveform(memoryview(y))[1], y))
+        self.assertTrue(np.array_equal(fgen.get_waveform(list(y))[1], y))
+        self.assertTrue(np.array_equal(fgen.get_waveform(v for v in y)[1], y))
+        x, y2 = fgen.get_waveform(np.vstack((np.arange(16), y)))
+        self.assertTrue(np.array_equal(x, np.arange(16)))
+        self.assertTrue(np.array_equal(y2, y))
+
+    def test_memmap(self):
+        fd, name = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            m = np.memmap(name, dtype=float, mode='w+', shape=(200000,))
+            m[:] = np.sin(np.arange(200000) / 100.0)
+            x, y = fgen.get_waveform(m)
+            self.assertTrue(np.shares_memory(y, m))
+            codes = fgen.encode_waveform(y, 16, 'twos_complement', 'little')
+            self.assertTrue(np.array_equal(codes, np.rint(m * 32767)))
+            del m, x, y
+        finally:
+            os.remove(name)
+
+
+class TestEncodeWaveform(unittest.TestCase):
+
+    def test_offset(self):
+        y = np.array([-2, -1, 0, 1, 2])
+        self.assertEqual(fgen.encode_waveform(y, 12).tolist(), [0, 0, 2048, 4095, 4095])
+        self.assertEqual(fgen.encode_waveform(y, 12, full_scale=4094).tolist(), [0, 0, 2047, 4094, 4094])
+        self.assertEqual(fgen.encode_waveform(y, 14).tolist(), [0, 0, 8192, 16383, 16383])
+        self.assertEqual(fgen.encode_waveform(y, 16).dtype, np.dtype('>u2'))
+        self.assertEqual(fgen.encode_waveform([0.5], 14, byteorder='little').tobytes(), b'\xff\x2f')
+
+    def test_twos_complement(self):
+        y = np.array([-2, -1, 0, 0.5, 1])
+        self.assertEqual(fgen.encode_waveform(y, 14, 'twos_complement').tolist(), [-8191, -8191, 0, 4096, 8191])
+        self.assertEqual(fgen.encode_waveform([-1], 16, 'twos_complement').tobytes(), b'\x80\x01')
+
+    def test_float(self):
+        y = np.array([-2, 0.25, 2])
+        codes = fgen.encode_waveform(y, encoding='float', byteorder='little')
+        self.assertEqual(codes.dtype, np.dtype('<f4'))
+        self.assertEqual(codes.tolist(), [-1, 0.25, 1])
+
+    def test_out(self):
+        y = np.linspace(-1, 1, 100)
+        buf = bytearray(200)
+        codes = fgen.encode_waveform(y, 14, out=buf)
+        self.assertTrue(np.shares_memory(codes, np.frombuffer(buf, np.uint8)))
+        self.assertEqual(bytes(buf), fgen.encode_waveform(y, 14).tobytes())
+        self.assertRaises(ivi.ValueNotSupportedException, fgen.encode_waveform, y, 17)
+        self.assertRaises(ivi.ValueNotSupportedException, fgen.encode_waveform, y, 14, 'gray')
+
+    def test_block(self):
+        y = np.linspace(-1, 1, 100)
+        block = fgen.build_waveform_block(y, ':curve ', bits=12)
+        self.assertTrue(block.startswith(b':curve #800000200'))
+        self.assertEqual(ivi.decode_ieee_block(bytes(block)), fgen.encode_waveform(y, 12).tobytes())
+
+    def test_block_formats(self):
+        y = np.sin(np.arange(1 << 17) * 2 * np.pi / 1000)
+        for kwargs, size in [(dict(bits=12), 2), (dict(bits=14, byteorder='little'), 2),
+                (dict(bits=16, encoding='twos_complement'), 2),
+                (dict(encoding='float', byteorder='little'), 4)]:
+            block = fgen.build_waveform_block(y, ':data ', **kwargs)
+            self.assertEqual(len(ivi.decode_ieee_block(bytes(block))), len(y) * size)
+
+if __name__ == '__main__':
+    unittest.main()
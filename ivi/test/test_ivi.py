@@ -24,8 +24,13 @@ THE SOFTWARE.
 
 """
 
+import io
+import threading
+import time
 import unittest
 
+import numpy as np
+
 import ivi
 
 class TestIndex(unittest.TestCase):
@@ -57,5 +62,229 @@ class TestIndex(unittest.TestCase):
         self.assertRaises(ivi.SelectorRangeException, ivi.get_index, self.index_dict, 100);
         self.assertRaises(ivi.SelectorNameException, ivi.get_index, self.index_dict, 'bad_item');
 
+class TestTraceDecimation(unittest.TestCase):
+
+    def setUp(self):
+        self.trace = ivi.TraceYT()
+        self.trace.x_increment = 1e-9
+        self.trace.x_origin = -1e-3
+        self.trace.y_increment = 0.01
+        self.trace.y_reference = 128
+        y = (np.arange(2000000) % 200).astype(np.uint8)
+        y[1234567] = 255
+        self.trace.y_raw = y
+
+    def test_min_max(self):
+        x, ymin, ymax = self.trace.decimate(2000)
+        self.assertEqual(len(x), 2000)
+        self.assertAlmostEqual(x[1], -1e-3 + 1000e-9)
+        self.assertAlmostEqual(ymin[0], -1.28)
+        self.assertAlmostEqual(ymax[0], 0.71)
+        self.assertAlmostEqual(ymax.max(), 1.27)
+        self.assertTrue(np.array_equal(ymax, self.trace.y.reshape(2000, -1).max(1)))
+
+    def test_lttb(self):
+        y = np.full(2000000, 128, np.uint8)
+        y[1234567] = 255
+        y[1500000:] = 0
+        self.trace.y_raw = y
+        x, y = self.trace.decimate(500, 'lttb')
+        self.assertEqual(len(x), 500)
+        self.assertEqual(x[0], self.trace.x[0])
+        self.assertEqual(x[-1], self.trace.x[-1])
+        # the spike survives the reduction
+        self.assertAlmostEqual(y.max(), 1.27)
+        self.assertAlmostEqual(y.min(), -1.28)
+        self.assertTrue(np.all(np.diff(x) > 0))
+
+    def test_cache(self):
+        r = self.trace.decimate(100)
+        self.assertTrue(('min_max', 100) in self.trace._decimation_cache)
+        self.assertTrue(np.array_equal(self.trace.decimate(100)[2], r[2]))
+        self.trace.y_raw = np.zeros(1000, np.uint8)
+        self.assertEqual(self.trace._decimation_cache, dict())
+        self.assertEqual(self.trace.decimate(100)[2].max(), -1.28)
+        # short records are returned in full
+        x, y = self.trace.decimate(5000, 'lttb')
+        self.assertEqual(len(y), 1000)
+        self.assertRaises(ivi.ValueNotSupportedException, self.trace.decimate, 100, 'bogus')
+
+class TestSpectrum(unittest.TestCase):
+
+    def setUp(self):
+        # 1 V peak sine at 1 MHz sampled at 100 MSa/s, on bin 100
+        self.n = 10000
+        self.t = np.arange(self.n) * 1e-8
+        self.y = np.sin(2*np.pi*1e6*self.t)
+
+    def test_sine_level(self):
+        for window in ivi.SpectrumWindows:
+            f, s = ivi.spectrum(self.y, 1e-8, window, 'dBV')
+            self.assertEqual(len(f), self.n // 2 + 1)
+            self.assertAlmostEqual(f[s.argmax()], 1e6)
+            self.assertAlmostEqual(s.max(), 20*np.log10(1/np.sqrt(2)), 6)
+        f, s = ivi.spectrum(self.y, 1e-8, units='dBm')
+        self.assertAlmostEqual(s.max(), 10*np.log10(0.5/50/1e-3), 6)
+        f, s = ivi.spectrum(self.y + 0.25, 1e-8, 'rectangular', 'V')
+        self.assertAlmostEqual(s[0], 0.25)
+
+    def test_average(self):
+        rng = np.random.RandomState(0)
+        y = self.y + rng.normal(0, 0.1, (2, 16, self.n))
+        f, s = ivi.spectrum(y, 1e-8, units='W', average=True)
+        self.assertEqual(s.shape, (2, self.n // 2 + 1))
+        self.assertAlmostEqual(s[0, 100], 0.5/50, 3)
+        # averaged noise floor is smoother than a single record
+        f, s1 = ivi.spectrum(y[0, 0], 1e-8, units='W')
+        self.assertLess(np.std(s[0, 200:]), np.std(s1[200:]))
+
+    def test_trace(self):
+        trace = ivi.TraceYT()
+        trace.x_increment = 1e-8
+        trace.y_increment = 0.01
+        trace.y_reference = 128
+        trace.y_origin = 0.5
+        trace.y_raw = np.round(self.y * 100 + 128).astype(np.uint8)
+        spec = trace.spectrum(units='V')
+        f, s = ivi.spectrum(trace.y, 1e-8, units='V')
+        self.assertTrue(np.allclose(spec.y, s))
+        self.assertTrue(np.allclose(spec.x, f))
+        f, s = ivi.spectrum([trace, trace], units='V', average=True)
+        self.assertTrue(np.allclose(spec.y, s))
+
+    def test_tables_cached(self):
+        ivi.spectrum(self.y, 1e-8)
+        w = ivi.ivi._spectrum_window(self.n, 'hann', np.float64)
+        f = ivi.ivi._spectrum_frequency(self.n, 1e-8)
+        ivi.spectrum(self.y * 2, 1e-8)
+        self.assertIs(ivi.ivi._spectrum_window(self.n, 'hann', np.float64), w)
+        self.assertIs(ivi.ivi._spectrum_frequency(self.n, 1e-8), f)
+        self.assertIsNot(ivi.ivi._spectrum_window(self.n, 'hann', np.float32), w)
+        self.assertRaises(ivi.ValueNotSupportedException, ivi.spectrum, self.y, 1e-8, 'bogus')
+        self.assertRaises(ivi.ValueNotSupportedException, ivi.spectrum, self.y, 1e-8, 'hann', 'bogus')
+
+class VirtualBusy(object):
+    "Fake instrument that stays busy for a number of polls"
+    def __init__(self, busy, serial_poll=True):
+        self.busy = busy
+        self.polls = 0
+        self.cmd_log = list()
+        self.serial_poll = serial_poll
+        self.read_buffer = io.BytesIO()
+
+    def write_raw(self, data):
+        cmd = data.decode().lower()
+        self.cmd_log.append(cmd)
+        if cmd == '*esr?':
+            self.polls += 1
+            self.read_buffer = io.BytesIO(b'0\n' if self.polls <= self.busy else b'1\n')
+        elif cmd == 'busy?':
+            self.polls += 1
+            self.read_buffer = io.BytesIO(b'1\n' if self.polls <= self.busy else b'0\n')
+
+    def read_raw(self, num=-1):
+        return self.read_buffer.read(num)
+
+    def read_stb(self):
+        if not self.serial_poll:
+            raise NotImplementedError()
+        self.polls += 1
+        return 0 if self.polls <= self.busy else 0x10
+
+
+class TestCompletionWait(unittest.TestCase):
+
+    def test_wait_until(self):
+        d = ivi.Driver(VirtualBusy(0))
+        calls = list()
+        def condition():
+            calls.append(time.time())
+            return len(calls) > 5 and 'done'
+        self.assertEqual(d._wait_until(condition, 5, (0.001, 0.004)), 'done')
+        self.assertEqual(len(calls), 6)
+        self.assertRaises(ivi.MaxTimeoutExceededException, d._wait_until, lambda: False, 0.02)
+
+    def test_wait_for_stb(self):
+        v = VirtualBusy(3)
+        d = ivi.Driver(v)
+        self.assertEqual(d._wait_for_stb(0x10, 5, (0.001, 0.001)), 0x10)
+        self.assertEqual(v.polls, 4)
+        v.polls = -1000000
+        self.assertRaises(ivi.MaxTimeoutExceededException, d._wait_for_stb, 0x10, 0.02)
+
+    def test_wait_for_opc(self):
+        v = VirtualBusy(2)
+        d = ivi.Driver(v)
+        d._wait_for_opc(5, (0.001, 0.001))
+        self.assertEqual(v.cmd_log, ['*opc', '*esr?', '*esr?', '*esr?'])
+
+    def test_wait_for_response(self):
+        v = VirtualBusy(3)
+        d = ivi.Driver(v)
+        t = time.time()
+        d._wait_for_response(5, (0.001, 0.001))
+        self.assertLess(time.time() - t, 1)
+        # polls once to detect serial poll support
+        self.assertEqual(v.polls, 4)
+        v = VirtualBusy(3, False)
+        d = ivi.Driver(v)
+        t = time.time()
+        d._wait_for_response(0.05)
+        self.assertGreaterEqual(time.time() - t, 0.05)
+
+    def test_ask_until(self):
+        v = VirtualBusy(3)
+        d = ivi.Driver(v)
+        self.assertEqual(d._ask_until('busy?', lambda r: r == '0', 5, (0.001, 0.001)), '0')
+        self.assertEqual(v.cmd_log, ['busy?'] * 4)
+
+class VirtualBlock(object):
+    "Fake instrument returning an IEEE block of 16 bit codes"
+    def __init__(self, codes):
+        self.read_buffer = io.BytesIO(ivi.build_ieee_block(np.asarray(codes, '<i2').tobytes()))
+
+    def write_raw(self, data):
+        pass
+
+    def read_raw(self, num=-1):
+        return self.read_buffer.read(num)
+
+
+class TestThreadedRead(unittest.TestCase):
+
+    def test_iter_threaded(self):
+        self.assertEqual(list(ivi.iter_threaded(range(100))), list(range(100)))
+        def fail():
+            yield 1
+            raise ivi.IOException()
+        self.assertRaises(ivi.IOException, list, ivi.iter_threaded(fail()))
+
+    def test_iter_threaded_close(self):
+        stopped = threading.Event()
+        def endless():
+            try:
+                while True:
+                    yield 0
+            finally:
+                stopped.set()
+        it = ivi.iter_threaded(endless())
+        next(it)
+        it.close()
+        # producer is stopped instead of blocking on the full queue
+        self.assertTrue(stopped.wait(5))
+
+    def test_read_ieee_block_array(self):
+        codes = np.arange(-5000, 5000)
+        d = ivi.Driver(VirtualBlock(codes))
+        y = d._read_ieee_block_array('<i2', 0.5, 0, 1.0, chunk_size=1000)
+        self.assertTrue(np.array_equal(y, codes * 0.5 + 1.0))
+
+    def test_read_ieee_block_array_error(self):
+        count = threading.active_count()
+        d = ivi.Driver(VirtualBlock(np.zeros(100000)))
+        # conversion fails on the first chunk, the reader has to stop
+        self.assertRaises(TypeError, d._read_ieee_block_array, '<i2', 'bogus', chunk_size=100)
+        self.assertEqual(threading.active_count(), count)
+
 if __name__ == '__main__':
     unittest.main()
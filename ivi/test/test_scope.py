@@ -0,0 +1,174 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014-2016 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import array
+import unittest
+
+import numpy as np
+
+import ivi
+from ivi import scope
+
+class TestWaveformWindow(unittest.TestCase):
+
+    def test_get_waveform_window(self):
+        self.assertEqual(scope.get_waveform_window(1000), (0, 1000, 1))
+        self.assertEqual(scope.get_waveform_window(1000, 100, 200), (100, 200, 1))
+        self.assertEqual(scope.get_waveform_window(1000, 100, 5000), (100, 1000, 1))
+        self.assertEqual(scope.get_waveform_window(1000, max_points=100), (0, 1000, 10))
+        self.assertEqual(scope.get_waveform_window(1000, max_points=300), (0, 1000, 4))
+        self.assertEqual(scope.get_waveform_window(1000, 0, 50, max_points=100), (0, 50, 1))
+        self.assertRaises(ivi.OutOfRangeException, scope.get_waveform_window, 1000, -1)
+        self.assertRaises(ivi.OutOfRangeException, scope.get_waveform_window, 1000, 2000)
+        self.assertRaises(ivi.OutOfRangeException, scope.get_waveform_window, 1000, 0, None, 0)
+
+    def test_window_trace(self):
+        trace = ivi.TraceYT()
+        trace.x_increment = 1e-9
+        trace.x_origin = -5e-7
+        trace.x_reference = 10
+        trace.y_raw = array.array('H', range(1000))
+        x = trace.x
+
+        scope.window_trace(trace, 100, 500, 4)
+
+        self.assertEqual(len(trace), 100)
+        self.assertEqual(list(trace.y_raw), list(range(100, 500, 4)))
+        for a, b in zip(trace.x, x[100:500:4]):
+            self.assertAlmostEqual(a, b)
+
+class TestMeasureWaveform(unittest.TestCase):
+
+    def setUp(self):
+        # 1 kHz, 30 % duty cycle pulse with 16 us 10-90 % edges, and a 1 kHz sine
+        t = np.arange(100000) * 1e-6
+        pulse = (np.arange(100000) % 1000 < 300).astype(float)
+        self.pulse = np.convolve(pulse, np.ones(20) / 20, 'same')
+        self.sine = np.sin(2 * np.pi * 1e3 * t)
+
+    def test_pulse(self):
+        r = scope.measure_waveform(self.pulse, 1e-6)
+        self.assertEqual(set(r), scope.MeasurementFunction)
+        self.assertAlmostEqual(r['voltage_high'], 1)
+        self.assertAlmostEqual(r['voltage_low'], 0)
+        self.assertAlmostEqual(r['rise_time'], 16e-6)
+        self.assertAlmostEqual(r['fall_time'], 16e-6)
+        self.assertAlmostEqual(r['frequency'], 1e3, 3)
+        self.assertAlmostEqual(r['width_positive'], 300e-6, 9)
+        self.assertAlmostEqual(r['duty_cycle_positive'], 30, 3)
+        self.assertAlmostEqual(r['duty_cycle_negative'], 70, 3)
+        self.assertAlmostEqual(r['voltage_cycle_average'], 0.3, 3)
+
+    def test_multichannel(self):
+        r = scope.measure_waveform([self.pulse, self.sine, np.zeros(100000)], 1e-6,
+                ['period', 'voltage_high', 'voltage_rms', 'rise_time'])
+        self.assertEqual(r['period'].shape, (3,))
+        self.assertAlmostEqual(r['period'][1], 1e-3)
+        self.assertAlmostEqual(r['voltage_high'][1], 1)
+        self.assertAlmostEqual(r['voltage_rms'][1], np.sqrt(0.5))
+        self.assertAlmostEqual(r['rise_time'][1], 2 * np.arcsin(0.8) / (2 * np.pi * 1e3))
+        self.assertTrue(np.isnan(r['period'][2]))
+        self.assertRaises(ivi.ValueNotSupportedException, scope.measure_waveform, self.sine,
+                1e-6, ['bogus'])
+
+    def test_measure_trace(self):
+        trace = ivi.TraceYT()
+        trace.x_increment = 1e-6
+        trace.y_increment = 1e-3
+        trace.y_raw = (self.sine * 1000).astype(np.int16)
+        r = scope.measure_trace(trace, ['frequency', 'amplitude'])
+        self.assertAlmostEqual(r['frequency'], 1e3)
+        self.assertAlmostEqual(r['amplitude'], 2, 2)
+        r = scope.measure_trace([trace, trace], ['frequency'])
+        self.assertEqual(len(r['frequency']), 2)
+
+    def test_holes(self):
+        y = self.pulse.copy()
+        y[500] = np.nan
+        y[2290:2310] = np.nan
+        r = scope.measure_waveform(y, 1e-6)
+        self.assertAlmostEqual(r['voltage_high'], 1)
+        self.assertAlmostEqual(r['voltage_low'], 0)
+        self.assertAlmostEqual(r['voltage_max'], 1)
+        self.assertAlmostEqual(r['frequency'], 1e3, 3)
+        self.assertAlmostEqual(r['duty_cycle_positive'], 30, 1)
+        self.assertAlmostEqual(r['voltage_cycle_average'], 0.3, 3)
+        r = scope.measure_waveform([y, np.full(100000, np.nan)], 1e-6,
+                ['frequency', 'amplitude', 'voltage_rms'])
+        self.assertAlmostEqual(r['frequency'][0], 1e3, 3)
+        self.assertTrue(np.all(np.isnan([r[f][1] for f in r])))
+
+        trace = ivi.TraceYT()
+        trace.x_increment = 1e-6
+        trace.y_increment = 1e-3
+        trace.y_hole = -32768
+        trace.y_raw = (self.sine * 1000).astype(np.int16)
+        trace.y_raw[250] = -32768
+        r = scope.measure_trace(trace, ['frequency', 'amplitude'])
+        self.assertAlmostEqual(r['frequency'], 1e3)
+        self.assertAlmostEqual(r['amplitude'], 2, 2)
+
+class TestWaveformStatistics(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.data = np.sin(np.linspace(0, 6, 500)) + rng.normal(0, 0.1, (200, 500))
+
+    def test_statistics(self):
+        stats = scope.WaveformStatistics((50, 20), (-2, 2))
+        for y in self.data[:150]:
+            stats.add(y)
+        # blocks are merged
+        stats.add(self.data[150:])
+        self.assertEqual(stats.count, 200)
+        self.assertTrue(np.allclose(stats.mean.y, self.data.mean(0)))
+        self.assertTrue(np.allclose(stats.std.y, self.data.std(0, ddof=1)))
+        self.assertTrue(np.array_equal(stats.min.y, self.data.min(0)))
+        self.assertTrue(np.array_equal(stats.max.y, self.data.max(0)))
+        hist = stats.histogram
+        self.assertEqual(hist.shape, (50, 20))
+        self.assertEqual(hist.sum(), self.data.size)
+        self.assertEqual(hist[0].sum(), 200 * 10)
+
+    def test_acquire_traces(self):
+        traces = list()
+        for y in self.data[:20]:
+            trace = ivi.TraceYT()
+            trace.x_increment = 1e-6
+            trace.y_increment = 1e-3
+            trace.y_raw = np.round(y * 1000).astype(np.int16)
+            traces.append(trace)
+        it = iter(traces)
+        stats = scope.WaveformStatistics()
+        stats.acquire(lambda: next(it), 20)
+        self.assertEqual(stats.count, 20)
+        self.assertEqual(stats.mean.x_increment, 1e-6)
+        self.assertTrue(np.allclose(stats.mean.y, np.array([t.y for t in traces]).mean(0)))
+        self.assertRaises(ivi.ValueNotSupportedException, stats.add, np.zeros(10))
+        self.assertRaises(StopIteration, stats.acquire, lambda: next(it), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014-2016 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import unittest
+
+import numpy as np
+
+import ivi
+from ivi import specan
+
+class TestMarkers(unittest.TestCase):
+
+    def setUp(self):
+        # -90 dBm noise floor with tones at 200, 300 and 420 MHz on a 1001
+        # point 100-500 MHz trace
+        rng = np.random.RandomState(1)
+        self.trace = ivi.TraceYT()
+        self.trace.x_origin = 100e6
+        self.trace.x_increment = 400e3
+        self.trace.y_increment = 1
+        self.trace.y_raw = -90 + rng.uniform(-2, 2, 1001)
+        for f, a in [(200e6, -20), (300e6, -40), (420e6, -30)]:
+            i = int((f - 100e6) / 400e3)
+            self.trace.y_raw[i-2:i+3] = a - np.array([12, 3, 0, 3, 12])
+
+    def test_peak_search(self):
+        peaks = specan.peak_search(self.trace, 3)
+        self.assertEqual(list(peaks.x), [200e6, 420e6, 300e6])
+        self.assertEqual(list(peaks.y), [-20, -30, -40])
+        peaks = specan.peak_search(self.trace, 10, threshold=-35)
+        self.assertEqual(len(peaks), 2)
+        # noise peaks do not pass a 6 dB excursion
+        self.assertEqual(len(specan.peak_search(self.trace, None)), 3)
+        self.assertTrue(len(specan.peak_search(self.trace, None, 0)) > 100)
+
+    def test_peak_search_batch(self):
+        y = np.array([self.trace.y, self.trace.y[::-1]])
+        peaks = specan.peak_search(y, 2)
+        self.assertEqual(list(peaks[0].index), [250, 800])
+        self.assertEqual(list(peaks[1].index), [750, 200])
+
+    def test_find_peaks_prominence(self):
+        # the small ripple next to the large peak does not hide it
+        y = np.array([0, 1, 0.5, 1.5, 1, 20, 0, 0, 3, 0])
+        self.assertEqual(list(specan.find_peaks(y, excursion=2)), [5, 8])
+        self.assertEqual(list(specan.find_peaks(y, excursion=0.4)), [5, 8, 3, 1])
+
+    def test_find_peaks_plateau(self):
+        # flat peaks are reported at their first sample
+        y = np.array([0, 2, 2, 2, 0, 1, 1, 0])
+        self.assertEqual(list(specan.find_peaks(y, excursion=0.5)), [1, 5])
+        # a flat top at the end of the trace is not a peak
+        self.assertEqual(list(specan.find_peaks([0, 1, 1], excursion=0)), [])
+
+    def test_find_peaks_nested(self):
+        # bases are taken back to the nearest higher peak on each side
+        y = np.array([0, 5, 1, 3, 2, 4, 0, 10, 0])
+        self.assertEqual(list(specan.find_peaks(y, excursion=0)), [7, 1, 5, 3])
+        self.assertEqual(list(specan.find_peaks(y, excursion=1.5)), [7, 1, 5])
+        self.assertEqual(list(specan.find_peaks(y, excursion=4)), [7, 1])
+
+    def test_markers(self):
+        self.assertEqual(specan.next_peak(self.trace, 200e6), (420e6, -30))
+        self.assertEqual(specan.next_peak(self.trace, 420e6, 'left'), (300e6, -40))
+        self.assertEqual(specan.next_peak(self.trace, 420e6, 'right'), None)
+        dx, dy = specan.delta_marker(self.trace, 200e6, 300e6)
+        self.assertAlmostEqual(dx, 100e6)
+        self.assertAlmostEqual(dy, -20)
+
+    def test_power(self):
+        # single tone: band power with a one point wide filter is the tone power
+        p = specan.band_power(self.trace, 199.9e6, 200.1e6, 400e3)
+        self.assertAlmostEqual(p, -20, 2)
+        # flat noise floor at -90 dBm in 400 kHz
+        y = np.full(1001, -90.0)
+        n = specan.noise_marker(y, 500, 400e3, noise_bandwidth=1)
+        self.assertAlmostEqual(n, -90 - 10 * np.log10(400e3))
+        self.assertEqual(specan.band_power(np.array([y, y + 10]), 0, 1000, 1).shape, (2,))
+
+if __name__ == '__main__':
+    unittest.main()